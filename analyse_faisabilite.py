@@ -0,0 +1,262 @@
+import sys
+import time
+from collections import defaultdict, deque
+
+
+class _FlowNetwork:
+    """Réseau de flot (Edmonds-Karp) sur quelques centaines de sommets."""
+    
+    def __init__(self, n):
+        self.capacity = [defaultdict(int) for _ in range(n)]
+    
+    def add_edge(self, u, v, capacity):
+        self.capacity[u][v] += capacity
+        self.capacity[v][u] += 0
+    
+    def max_flow(self, source, sink):
+        flow = 0
+        while True:
+            parent = {source: None}
+            queue = deque([source])
+            while queue and sink not in parent:
+                u = queue.popleft()
+                for v, c in self.capacity[u].items():
+                    if c > 0 and v not in parent:
+                        parent[v] = u
+                        queue.append(v)
+            if sink not in parent:
+                return flow
+            
+            # Capacité résiduelle du chemin trouvé, puis augmentation
+            path = []
+            v = sink
+            while parent[v] is not None:
+                path.append((parent[v], v))
+                v = parent[v]
+            pushed = min(self.capacity[u][v] for u, v in path)
+            for u, v in path:
+                self.capacity[u][v] -= pushed
+                self.capacity[v][u] += pushed
+            flow += pushed
+    
+    def reachable(self, source):
+        """Sommets accessibles depuis la source dans le réseau résiduel (côté source de la coupe min)."""
+        seen = {source}
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            for v, c in self.capacity[u].items():
+                if c > 0 and v not in seen:
+                    seen.add(v)
+                    queue.append(v)
+        return seen
+
+
+def room_domains(rooms, subjects, class_info, room_compatibility):
+    """Salles candidates (identifiants) de chaque séance.
+    
+    Une salle est écartée si sa capacité est inférieure à l'effectif de la
+    classe, si son bâtiment est exclu pour la classe, ou si son type n'est pas
+    compatible avec le type du cours. Le calcul est fait une fois par couple
+    (classe, type de cours).
+    """
+    domains_by_key = {}
+    domains = []
+    for s in subjects:
+        key = (s['class'], s.get('kind', ''))
+        if key not in domains_by_key:
+            info = class_info.get(s['class'], {})
+            enrollment = info.get('enrollment', 0)
+            excluded = info.get('excluded_buildings', set())
+            allowed_types = room_compatibility.get(key[1])
+            domains_by_key[key] = [
+                r_id for r_id, r in enumerate(rooms)
+                if r['capacity'] >= enrollment
+                and r['building'] not in excluded
+                and (allowed_types is None or r['type'] in allowed_types)
+            ]
+        domains.append(domains_by_key[key])
+    return domains
+
+
+def session_groups(subjects):
+    """Séances d'une même matière (au moins deux), dans l'ordre CM puis TD."""
+    groups = defaultdict(list)
+    for s_id, s in enumerate(subjects):
+        groups[s.get('group', ('seule', s_id))].append(s_id)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+class CapacityView:
+    """Vue des données suffisante pour analyze(), construite sans le générateur.
+    
+    Expose les mêmes attributs que TimetableGenerator (séances, classes,
+    enseignants, salles candidates, créneaux): la vérification des données
+    analyse la faisabilité sans importer OR-Tools, pandas ni numpy.
+    """
+    
+    def __init__(self, dataset, days, periods):
+        self.rooms = dataset.room_records()
+        self.subjects = dataset.subject_records()
+        self.classes = dataset.class_names()
+        self.lecturers = dataset.lecturers
+        self.subjects_by_class = dataset.subjects_by_class
+        self.subject_lecturer = dataset.subject_lecturer
+        self.days = list(days)
+        self.n_slots = len(days) * len(periods)
+        self.session_groups = session_groups(self.subjects)
+        self.room_domains = room_domains(self.rooms, self.subjects, dataset.class_info(), dataset.room_compatibility)
+        self.blocked_room_slots = set()
+        self.blocked_lecturer_slots = set()
+    
+    @classmethod
+    def from_dataset(cls, dataset):
+        from exportation import DAYS, PERIODS
+        
+        return cls(dataset, DAYS, PERIODS)
+
+
+class FeasibilityReport:
+    """Résultat de l'analyse: liste des dépassements de capacité détectés.
+    
+    Chaque problème est un dictionnaire avec son type ('classe', 'enseignant',
+    'salles', 'matiere' ou 'seances'), les éléments concernés, la demande
+    (nombre de cours) et la capacité (nombre de créneaux ou de jours disponibles).
+    """
+    
+    def __init__(self):
+        self.issues = []
+        self.analysis_time = 0.0
+    
+    @property
+    def feasible(self):
+        return not self.issues
+    
+    def add(self, kind, names, demand, capacity, subjects=()):
+        self.issues.append({
+            'type': kind,
+            'names': list(names),
+            'demand': demand,
+            'capacity': capacity,
+            'subjects': list(subjects),
+        })
+    
+    def to_dict(self):
+        return {'feasible': self.feasible, 'analysis_time': self.analysis_time, 'issues': self.issues}
+    
+    def print(self):
+        if self.feasible:
+            print(f"Analyse de faisabilité: aucun dépassement de capacité ({self.analysis_time * 1000:.1f} ms)")
+            return
+        print(f"Analyse de faisabilité: {len(self.issues)} dépassement(s) de capacité "
+              f"({self.analysis_time * 1000:.1f} ms)")
+        labels = {
+            'classe': "Classe", 'enseignant': "Enseignant", 'salles': "Salles", 'matiere': "Matière sans salle",
+            'seances': "Séances de",
+        }
+        for issue in self.issues:
+            unit = 'jours' if issue['type'] == 'seances' else 'créneaux disponibles'
+            print(f"  {labels[issue['type']]} {', '.join(issue['names'])}: "
+                  f"{issue['demand']} cours pour {issue['capacity']} {unit}")
+            if issue['subjects'] and issue['type'] in ('salles', 'matiere'):
+                shown = issue['subjects'][:10]
+                more = f" (+{len(issue['subjects']) - len(shown)})" if len(issue['subjects']) > len(shown) else ''
+                print(f"    matières concernées: {', '.join(shown)}{more}")
+
+
+def analyze(generator):
+    """Détecter les dépassements de capacité avant toute construction de modèle.
+    
+    Vérifie la charge de chaque classe et de chaque enseignant (un cours par
+    créneau), les matières sans salle compatible, puis la capacité des salles:
+    un flot maximal matières -> salles (capacité d'une salle = nombre de
+    créneaux où elle n'est pas bloquée) est calculé sur les ensembles distincts
+    de salles candidates. Si le flot ne couvre pas tous les cours, la coupe
+    minimale donne exactement le groupe de salles sur-demandé.
+    """
+    start = time.perf_counter()
+    report = FeasibilityReport()
+    n_slots = generator.n_slots
+    
+    def label(s_id):
+        s = generator.subjects[s_id]
+        session = f" {s['session']}" if s.get('session') else ''
+        return f"{s['code']}{session} ({s['class']})"
+    
+    # Charge par classe et par enseignant: au plus un cours par créneau
+    for c_id, subject_ids in enumerate(generator.subjects_by_class):
+        if len(subject_ids) > n_slots:
+            report.add('classe', [generator.classes[c_id]], len(subject_ids), n_slots,
+                       [label(s_id) for s_id in subject_ids])
+    by_lecturer = defaultdict(list)
+    for s_id, l_id in enumerate(generator.subject_lecturer):
+        if l_id >= 0:
+            by_lecturer[l_id].append(s_id)
+    lecturer_blocked = defaultdict(int)
+    for l_id, _ in generator.blocked_lecturer_slots:
+        lecturer_blocked[l_id] += 1
+    for l_id, subject_ids in sorted(by_lecturer.items()):
+        capacity = n_slots - lecturer_blocked[l_id]
+        if len(subject_ids) > capacity:
+            report.add('enseignant', [generator.lecturers[l_id]], len(subject_ids), capacity,
+                       [label(s_id) for s_id in subject_ids])
+    
+    # Séances d'une même matière: au plus une par jour
+    n_days = len(generator.days)
+    for members in getattr(generator, 'session_groups', []):
+        if len(members) > n_days:
+            s = generator.subjects[members[0]]
+            report.add('seances', [f"{s['code']} ({s['class']})"], len(members), n_days,
+                       [label(s_id) for s_id in members])
+    
+    # Matières sans aucune salle candidate
+    empty = [s_id for s_id, domain in enumerate(generator.room_domains) if not domain]
+    if empty:
+        report.add('matiere', sorted({generator.subjects[s_id]['class'] for s_id in empty}),
+                   len(empty), 0, [label(s_id) for s_id in empty])
+    
+    # Capacité des salles: flot source -> ensembles de salles candidates -> salles -> puits
+    blocked = defaultdict(int)
+    for r_id, _ in generator.blocked_room_slots:
+        blocked[r_id] += 1
+    domains = defaultdict(list)
+    for s_id, domain in enumerate(generator.room_domains):
+        if domain:
+            domains[tuple(domain)].append(s_id)
+    domain_list = list(domains)
+    n_rooms = len(generator.rooms)
+    source = 0
+    sink = 1 + len(domain_list) + n_rooms
+    network = _FlowNetwork(sink + 1)
+    for d, domain in enumerate(domain_list):
+        network.add_edge(source, 1 + d, len(domains[domain]))
+        for r_id in domain:
+            # Capacité non limitante: les salles voisines d'un ensemble restent du même côté de la coupe
+            network.add_edge(1 + d, 1 + len(domain_list) + r_id, len(domains[domain]))
+    for r_id in range(n_rooms):
+        network.add_edge(1 + len(domain_list) + r_id, sink, n_slots - blocked[r_id])
+    
+    demand = sum(len(subject_ids) for subject_ids in domains.values())
+    if network.max_flow(source, sink) < demand:
+        side = network.reachable(source)
+        tight_domains = [domain_list[d] for d in range(len(domain_list)) if 1 + d in side]
+        tight_rooms = sorted({r_id for domain in tight_domains for r_id in domain})
+        report.add(
+            'salles', [generator.rooms[r_id]['num'] for r_id in tight_rooms],
+            sum(len(domains[domain]) for domain in tight_domains),
+            sum(n_slots - blocked[r_id] for r_id in tight_rooms),
+            [label(s_id) for domain in tight_domains for s_id in domains[domain]]
+        )
+    
+    report.analysis_time = time.perf_counter() - start
+    return report
+
+
+if __name__ == "__main__":
+    from generateur import TimetableGenerator
+    
+    rooms_file = sys.argv[1] if len(sys.argv) > 1 else 'rooms.json'
+    subjects_file = sys.argv[2] if len(sys.argv) > 2 else 'subjects.json'
+    report = analyze(TimetableGenerator(rooms_file, subjects_file))
+    report.print()
+    sys.exit(0 if report.feasible else 1)
@@ -0,0 +1,358 @@
+import argparse
+import csv
+import os
+import sys
+
+import numpy as np
+
+from exportation import DAYS, PERIODS, PERIOD_WEIGHTS
+
+# Charge journalière d'un enseignant à partir de laquelle la journée est comptée comme chargée
+HEAVY_DAY = 4
+
+# Colonnes du tableau récapitulatif: une ligne par solution
+SUMMARY_COLUMNS = [
+    'solution', 'cours', 'objectif', 'utilisation_salles', 'salles_utilisees', 'remplissage_moyen',
+    'charge_max_enseignant', 'charge_moyenne_enseignant', 'journees_chargees', 'trous_classes',
+    'trous_max', 'usage_soir', 'conflits',
+]
+
+
+class SolutionAnalytics:
+    """Occupation et charge d'une ou plusieurs solutions, sous forme de tableaux numpy denses.
+    
+    rooms, lecturers et classes ont la forme (solutions, entités, jours,
+    périodes) et comptent les cours de chaque salle, enseignant ou classe à
+    chaque créneau. Les entités sont communes à toutes les solutions (réunion
+    des noms, complétée par le jeu de données s'il est fourni): les scénarios
+    se comparent élément par élément et toutes les mesures sont calculées en
+    une fois pour le lot entier.
+    """
+    
+    def __init__(self, solutions, names=None, dataset=None, period_weights=PERIOD_WEIGHTS,
+                 days=DAYS, periods=PERIODS):
+        self.names = list(names) if names is not None else [f"solution_{i + 1}" for i in range(len(solutions))]
+        self.days = list(days)
+        self.periods = list(periods)
+        self.period_weights = np.asarray(period_weights)
+        
+        # Entités: noms de toutes les solutions, complétés par les données (salles et classes sans cours)
+        assignments = [(i, a) for i, solution in enumerate(solutions) for a in solution['assignments']]
+        room_names = {a['room'] for _, a in assignments}
+        class_names = {a['class'] for _, a in assignments}
+        lecturer_names = {a['lecturer'] for _, a in assignments if a['lecturer']}
+        if dataset is not None:
+            room_names.update(r['num'] for r in dataset.room_records())
+            class_names.update(dataset.class_names())
+            lecturer_names.update(dataset.lecturers)
+        self.room_names = sorted(room_names)
+        self.class_names = sorted(class_names)
+        self.lecturer_names = sorted(lecturer_names)
+        
+        # Une colonne entière par attribut des affectations, toutes solutions confondues
+        room_ids = {name: i for i, name in enumerate(self.room_names)}
+        class_ids = {name: i for i, name in enumerate(self.class_names)}
+        lecturer_ids = {name: i for i, name in enumerate(self.lecturer_names)}
+        n = len(assignments)
+        self.solution_id = np.fromiter((i for i, _ in assignments), np.int64, n)
+        self.room_id = np.fromiter((room_ids[a['room']] for _, a in assignments), np.int64, n)
+        self.class_id = np.fromiter((class_ids[a['class']] for _, a in assignments), np.int64, n)
+        self.lecturer_id = np.fromiter((lecturer_ids.get(a['lecturer'], -1) for _, a in assignments), np.int64, n)
+        self.day = np.fromiter((a['day'] for _, a in assignments), np.int64, n)
+        self.period = np.fromiter((a['period'] for _, a in assignments), np.int64, n)
+        
+        self.n_solutions = len(solutions)
+        self.rooms = self._counts(self.room_id, len(self.room_names))
+        self.classes = self._counts(self.class_id, len(self.class_names))
+        self.lecturers = self._counts(self.lecturer_id, len(self.lecturer_names))
+        
+        # Capacités et effectifs (NaN si inconnus: sans données, ou effectif non renseigné)
+        self.capacity = np.full(len(self.room_names), np.nan)
+        self.enrollment = np.full(len(self.class_names), np.nan)
+        if dataset is not None:
+            for r in dataset.room_records():
+                self.capacity[room_ids[r['num']]] = r['capacity'] or np.nan
+            for name, info in dataset.class_info().items():
+                self.enrollment[class_ids[name]] = info.get('enrollment') or np.nan
+    
+    def _counts(self, entity_id, n_entities):
+        """Nombre de cours par (solution, entité, jour, période), en un seul comptage."""
+        shape = (self.n_solutions, n_entities, len(self.days), len(self.periods))
+        known = entity_id >= 0
+        flat = np.ravel_multi_index(
+            (self.solution_id[known], entity_id[known], self.day[known], self.period[known]), shape
+        )
+        return np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape).astype(np.int32)
+    
+    # Mesures, calculées pour toutes les solutions à la fois
+    
+    def room_utilisation(self):
+        """Part des créneaux où chaque salle est occupée: (solutions, salles)."""
+        return (self.rooms > 0).mean(axis=(2, 3))
+    
+    def slot_utilisation(self):
+        """Part des salles occupées à chaque créneau: (solutions, jours, périodes)."""
+        if not self.room_names:
+            return np.zeros((self.n_solutions, len(self.days), len(self.periods)))
+        return (self.rooms > 0).mean(axis=1)
+    
+    def fill_ratios(self):
+        """Effectif de la classe rapporté à la capacité de la salle, pour chaque affectation."""
+        return self.enrollment[self.class_id] / self.capacity[self.room_id]
+    
+    def _per_solution_mean(self, values, solution_id):
+        known = ~np.isnan(values)
+        total = np.bincount(solution_id[known], weights=values[known], minlength=self.n_solutions)
+        count = np.bincount(solution_id[known], minlength=self.n_solutions)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return total / count
+    
+    def room_fill(self):
+        """Remplissage moyen de chaque salle: (solutions, salles), NaN si inconnu ou salle inutilisée."""
+        ratios = self.fill_ratios()
+        known = ~np.isnan(ratios)
+        shape = (self.n_solutions, len(self.room_names))
+        flat = np.ravel_multi_index((self.solution_id[known], self.room_id[known]), shape)
+        total = np.bincount(flat, weights=ratios[known], minlength=int(np.prod(shape))).reshape(shape)
+        count = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return total / count
+    
+    def lecturer_daily_load(self):
+        """Nombre de cours de chaque enseignant par jour: (solutions, enseignants, jours)."""
+        return self.lecturers.sum(axis=3)
+    
+    def class_gaps(self):
+        """Périodes libres entre le premier et le dernier cours de chaque journée: (solutions, classes, jours)."""
+        busy = self.classes > 0
+        n_periods = len(self.periods)
+        first = busy.argmax(axis=3)
+        last = n_periods - 1 - busy[..., ::-1].argmax(axis=3)
+        span = np.where(busy.any(axis=3), last - first + 1, 0)
+        return span - busy.sum(axis=3)
+    
+    def evening_penalty(self):
+        """Pénalité de chaque période: 0 pour la mieux pondérée, 1 pour la moins bien pondérée."""
+        spread = self.period_weights.max() - self.period_weights.min()
+        if not spread:
+            return np.zeros_like(self.period_weights)
+        return (self.period_weights.max() - self.period_weights) / spread
+    
+    def evening_usage(self):
+        """Part pondérée des cours en fin de journée, par solution (0: tous à la meilleure période)."""
+        per_period = self.classes.sum(axis=(1, 2))
+        return per_period @ self.evening_penalty() / np.maximum(per_period.sum(axis=1), 1)
+    
+    def objective(self):
+        """Valeur de l'objectif des périodes de chaque solution."""
+        return self.classes.sum(axis=(1, 2)) @ self.period_weights
+    
+    def conflicts(self):
+        """Cours en trop (même classe, enseignant ou salle au même créneau), par solution."""
+        return sum(np.maximum(counts - 1, 0).sum(axis=(1, 2, 3))
+                   for counts in (self.rooms, self.classes, self.lecturers))
+    
+    # Tableaux
+    
+    def summary(self):
+        """Une ligne de mesures par solution (voir SUMMARY_COLUMNS)."""
+        load = self.lecturer_daily_load()
+        worked = load > 0
+        gaps = self.class_gaps()
+        courses = self.classes.sum(axis=(1, 2, 3))
+        columns = {
+            'solution': self.names,
+            'cours': courses,
+            'objectif': self.objective(),
+            'utilisation_salles': self.room_utilisation().mean(axis=1) if self.room_names else np.zeros(self.n_solutions),
+            'salles_utilisees': (self.rooms.sum(axis=(2, 3)) > 0).sum(axis=1),
+            'remplissage_moyen': self._per_solution_mean(self.fill_ratios(), self.solution_id),
+            'charge_max_enseignant': load.max(axis=(1, 2)) if self.lecturer_names else np.zeros(self.n_solutions),
+            'charge_moyenne_enseignant': load.sum(axis=(1, 2)) / np.maximum(worked.sum(axis=(1, 2)), 1),
+            'journees_chargees': (load >= HEAVY_DAY).sum(axis=(1, 2)),
+            'trous_classes': gaps.sum(axis=(1, 2)),
+            'trous_max': gaps.max(axis=(1, 2)) if self.class_names else np.zeros(self.n_solutions),
+            'usage_soir': self.evening_usage(),
+            'conflits': self.conflicts(),
+        }
+        return [
+            {name: _plain(columns[name][i]) for name in SUMMARY_COLUMNS}
+            for i in range(self.n_solutions)
+        ]
+    
+    def _table(self, entity_key, entity_names, columns):
+        """Lignes (solution, entité) d'un tableau, à partir de colonnes de forme (solutions, entités)."""
+        lists = {name: values if isinstance(values, list) else _as_lists(values) for name, values in columns.items()}
+        return [
+            {'solution': self.names[i], entity_key: entity, **{name: rows[i][e] for name, rows in lists.items()}}
+            for i in range(self.n_solutions) for e, entity in enumerate(entity_names)
+        ]
+    
+    def room_table(self):
+        capacity = [None if c != c else int(c) for c in self.capacity.tolist()]
+        return self._table('salle', self.room_names, {
+            'capacite': [capacity] * self.n_solutions,
+            'cours': self.rooms.sum(axis=(2, 3)),
+            'utilisation': self.room_utilisation(),
+            'remplissage_moyen': self.room_fill(),
+        })
+    
+    def lecturer_table(self):
+        load = self.lecturer_daily_load()
+        return self._table('enseignant', self.lecturer_names, {
+            'cours': load.sum(axis=2),
+            'jours_travailles': (load > 0).sum(axis=2),
+            'charge_max': load.max(axis=2, initial=0),
+            **{day: load[:, :, d] for d, day in enumerate(self.days)},
+        })
+    
+    def class_table(self):
+        gaps = self.class_gaps()
+        per_period = self.classes.sum(axis=2)
+        courses = per_period.sum(axis=2)
+        return self._table('classe', self.class_names, {
+            'cours': courses,
+            'trous': gaps.sum(axis=2),
+            'trous_max_jour': gaps.max(axis=2, initial=0),
+            'usage_soir': per_period @ self.evening_penalty() / np.maximum(courses, 1),
+        })
+    
+    def write_tables(self, output_dir):
+        """Écrire le récapitulatif et les tableaux par salle, enseignant et classe en CSV."""
+        os.makedirs(output_dir, exist_ok=True)
+        files = []
+        for name, rows in (('resume', self.summary()), ('salles', self.room_table()),
+                           ('enseignants', self.lecturer_table()), ('classes', self.class_table())):
+            filename = os.path.join(output_dir, f"analyse_{name}.csv")
+            _write_csv(rows, filename)
+            files.append(filename)
+        return files
+    
+    def print_summary(self):
+        rows = self.summary()
+        cells = [[_format(row[name]) for name in SUMMARY_COLUMNS] for row in rows]
+        widths = [max([len(name)] + [len(r[j]) for r in cells]) for j, name in enumerate(SUMMARY_COLUMNS)]
+        print('  '.join(name.rjust(w) for name, w in zip(SUMMARY_COLUMNS, widths)))
+        for r in cells:
+            print('  '.join(value.rjust(w) for value, w in zip(r, widths)))
+    
+    # Cartes de chaleur
+    
+    def heatmaps(self, output_dir, index=0):
+        """Écrire les cartes de chaleur d'une solution: créneaux, salles, enseignants et classes."""
+        from matplotlib.figure import Figure
+        
+        os.makedirs(output_dir, exist_ok=True)
+        name = self.names[index]
+        slot_labels = [f"{day[:3]} {p + 1}" for day in self.days for p in range(len(self.periods))]
+        n_slots = len(slot_labels)
+        maps = [
+            ('creneaux', "Part des salles occupées", self.slot_utilisation()[index].T,
+             self.periods, self.days),
+            ('salles', "Occupation des salles", self.rooms[index].reshape(len(self.room_names), n_slots),
+             self.room_names, slot_labels),
+            ('enseignants', "Cours par jour et par enseignant", self.lecturer_daily_load()[index],
+             self.lecturer_names, self.days),
+            ('classes', "Périodes libres entre deux cours", self.class_gaps()[index],
+             self.class_names, self.days),
+        ]
+        
+        files = []
+        for key, title, values, row_labels, column_labels in maps:
+            if not len(row_labels):
+                continue
+            fig = Figure(figsize=(max(6, 0.35 * len(column_labels) + 3), min(60, max(4, 0.22 * len(row_labels) + 2))))
+            ax = fig.subplots()
+            image = ax.imshow(values, aspect='auto', cmap='YlOrRd', interpolation='nearest')
+            ax.set_title(f"{title} - {name}")
+            ax.set_xticks(np.arange(len(column_labels)))
+            ax.set_xticklabels(column_labels, rotation=90 if len(column_labels) > 10 else 0, fontsize=8)
+            # Au-delà de 100 lignes (solutions de toute une faculté), les libellés ne sont plus lisibles
+            if len(row_labels) <= 100:
+                ax.set_yticks(np.arange(len(row_labels)))
+                ax.set_yticklabels(row_labels, fontsize=7)
+            fig.colorbar(image, ax=ax)
+            fig.tight_layout()
+            filename = os.path.join(output_dir, f"{name}_{key}.png")
+            fig.savefig(filename, dpi=100)
+            files.append(filename)
+        return files
+
+
+def _plain(value):
+    """Valeur numpy convertie en nombre Python (None pour NaN), pour le CSV."""
+    value = value.item() if hasattr(value, 'item') else value
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def _as_lists(values):
+    """Tableau numpy (solutions, entités) en listes Python, NaN devenant None."""
+    if values.dtype.kind != 'f':
+        return values.tolist()
+    return [[None if x != x else x for x in row] for row in values.tolist()]
+
+
+def _format(value):
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
+
+
+def _write_csv(rows, filename):
+    tmp_file = f"{filename}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(rows[0]) if rows else [])
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_file, filename)
+
+
+def solution_names(files):
+    """Noms courts des solutions (nom du fichier sans extension), rendus uniques."""
+    names = []
+    for filename in files:
+        name = os.path.splitext(os.path.basename(filename))[0]
+        names.append(name if name not in names else f"{name}_{len(names) + 1}")
+    return names
+
+
+def analyze_files(solution_files, dataset=None, output_dir='output/analyse', heatmaps=True):
+    """Analyser un lot de fichiers de solution: récapitulatif affiché, tableaux CSV et cartes de chaleur."""
+    from solution_binaire import read_solution
+    
+    solutions = [read_solution(filename) for filename in solution_files]
+    analytics = SolutionAnalytics(solutions, solution_names(solution_files), dataset)
+    analytics.print_summary()
+    files = analytics.write_tables(output_dir)
+    if heatmaps:
+        for i in range(analytics.n_solutions):
+            files += analytics.heatmaps(output_dir, i)
+    print(f"Analyse écrite dans {output_dir}/ ({len(files)} fichiers)")
+    return analytics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Occupation des salles et charge des enseignants et des classes")
+    parser.add_argument('solutions', nargs='*', default=['output/timetable_solution.json'],
+                        help="Fichiers de solution (JSON ou .edtb), comparés entre eux")
+    parser.add_argument('--salles', default='rooms.json', help="Capacités et salles inutilisées")
+    parser.add_argument('--matieres', default='subjects.json', help="Effectifs et classes sans cours")
+    parser.add_argument('--sortie', default='output/analyse')
+    parser.add_argument('--sans-cartes', action='store_true', help="Ne pas dessiner les cartes de chaleur")
+    args = parser.parse_args(argv)
+    
+    from donnees import DataError, load_dataset
+    try:
+        dataset = load_dataset(args.salles, args.matieres)
+    except (OSError, DataError) as error:
+        print(f"Données non utilisées ({error}): capacités et effectifs inconnus")
+        dataset = None
+    analyze_files(args.solutions, dataset, args.sortie, not args.sans_cartes)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,292 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+# Taille actuelle des données réelles: 4 niveaux x 2 semestres, ~8 matières par classe, 16 salles
+BASE_LEVELS = 4
+BASE_SUBJECTS_PER_CLASS = 8
+BASE_LECTURERS = 45
+BASE_ROOMS = 16
+
+DEFAULT_SCALES = [1, 2, 5, 10, 20, 50, 100]
+BUILDINGS = ['AMPHI', 'EXTENSION 1', 'EXTENSION 2', 'BLOC PEDAGOGIQUE']
+
+
+def generate_instance(output_dir, levels, subjects_per_class, lecturers, sharing_ratio, rooms,
+                      semesters=2, seed=0):
+    """Écrire des fichiers rooms.json et subjects.json synthétiques au format existant.
+    
+    Chaque classe (niveau, semestre) dispose d'un groupe d'enseignants qui lui
+    est propre; avec la probabilité sharing_ratio, une matière est confiée à un
+    enseignant tiré dans l'ensemble des enseignants, ce qui couple les classes.
+    """
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    
+    room_list = []
+    for i in range(rooms):
+        building = BUILDINGS[i % len(BUILDINGS)]
+        capacity = rng.choice([1000, 500, 250]) if building == 'AMPHI' else rng.randint(36, 156)
+        room_list.append({
+            'num': f"R{i:04d}",
+            'capacite': str(capacity),
+            'batiment': building,
+            'filier': 'INFO'
+        })
+    
+    names = [f"ENSEIGNANT {i:04d}" for i in range(lecturers)]
+    n_classes = levels * semesters
+    niveau = {}
+    class_index = 0
+    for level in range(1, levels + 1):
+        niveau[str(level)] = {}
+        for semester in range(1, semesters + 1):
+            own = names[class_index::n_classes] or names
+            subjects = []
+            for j in range(subjects_per_class):
+                pool = names if rng.random() < sharing_ratio else own
+                subjects.append({
+                    'name': f"MATIERE {level}.{semester}.{j}",
+                    'code': f"SYN{level}{semester}{j:02d}",
+                    'credit': rng.choice([3, 6]),
+                    'category': 'Fundamental',
+                    'Course Lecturer': [rng.choice(pool), ''],
+                    'Assitant lecturer': [rng.choice(names), '']
+                })
+            niveau[str(level)][f"s{semester}"] = {'subjects': subjects}
+            class_index += 1
+    
+    rooms_file = os.path.join(output_dir, 'rooms.json')
+    subjects_file = os.path.join(output_dir, 'subjects.json')
+    with open(rooms_file, 'w', encoding='utf-8') as file:
+        json.dump({'Informatique': room_list}, file, ensure_ascii=False, indent=2)
+    with open(subjects_file, 'w', encoding='utf-8') as file:
+        json.dump({'niveau': niveau}, file, ensure_ascii=False, indent=2)
+    return rooms_file, subjects_file
+
+
+def scaled_parameters(scale, sharing_ratio=0.3):
+    """Paramètres d'une instance scale fois plus grande que les données actuelles."""
+    return {
+        'levels': BASE_LEVELS * scale,
+        'subjects_per_class': BASE_SUBJECTS_PER_CLASS,
+        'lecturers': BASE_LECTURERS * scale,
+        'sharing_ratio': sharing_ratio,
+        'rooms': BASE_ROOMS * scale,
+    }
+
+
+def _run_case(case, queue):
+    """Exécuter un cas de test dans un processus neuf et renvoyer ses mesures."""
+    import resource
+    import instrumentation
+    from generateur import TimetableGenerator
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        rooms_file, subjects_file = generate_instance(tmp, seed=case['seed'], **case['parameters'])
+        start = time.perf_counter()
+        generator = TimetableGenerator(rooms_file, subjects_file)
+        load_time = time.perf_counter() - start
+        
+        generator.time_limit = case['time_limit']
+        generator.num_workers = case['num_workers']
+        generator.log_search = False
+        # Réglages par défaut: les rapports restent comparables d'une machine à l'autre
+        generator.solver_profile = None
+        start = time.perf_counter()
+        solved = generator.solve(case['mode'], use_cache=False)
+        total_time = time.perf_counter() - start
+    
+    # Mesures de la phase de recherche principale selon le mode (la dernière en cas de repli)
+    if 'solve' in generator.stats:
+        build, search = generator.stats['build_indexed_model'], generator.stats['solve']
+    elif 'solve_slots' in generator.stats:
+        build, search = generator.stats['build_slot_model'], generator.stats['solve_slots']
+    elif 'lns' in generator.stats:
+        build, search = {}, generator.stats['lns']
+    else:
+        build = search = generator.stats.get('decomposition', {})
+    queue.put({
+        'scale': case['scale'],
+        'mode': case['mode'],
+        'subjects': len(generator.subjects),
+        'rooms': len(generator.rooms),
+        'load_time': load_time,
+        'build_time': build.get('build_time'),
+        'variables': build.get('variables'),
+        'constraints': build.get('constraints'),
+        'first_solution_time': search.get('first_solution_time'),
+        'extraction_time': instrumentation.get_report().phases.get('extraction', {}).get('time'),
+        'objective': generator.solution['objective_value'] if solved else None,
+        'status': search.get('status'),
+        'solve_time': search.get('solve_time'),
+        'total_time': total_time,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+
+def run_benchmark(scales=DEFAULT_SCALES, modes=('two_phase',), time_limit=60, num_workers=8,
+                  sharing_ratio=0.3, seed=0, output_dir='benchmarks'):
+    """Mesurer la construction et la résolution pour chaque échelle et chaque mode.
+    
+    Chaque cas s'exécute dans un processus neuf pour isoler le pic de mémoire.
+    Les résultats sont écrits en JSON (avec la version du générateur et la
+    machine) et en CSV dans output_dir, pour comparer les versions entre elles.
+    """
+    import multiprocessing
+    from generateur import GENERATOR_VERSION
+    
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for scale in scales:
+        for mode in modes:
+            case = {
+                'scale': scale,
+                'mode': mode,
+                'parameters': scaled_parameters(scale, sharing_ratio),
+                'seed': seed,
+                'time_limit': time_limit,
+                'num_workers': num_workers,
+            }
+            queue = ctx.Queue()
+            process = ctx.Process(target=_run_case, args=(case, queue))
+            process.start()
+            process.join(time_limit * 10 + 600)
+            if process.is_alive():
+                process.terminate()
+                result = {'scale': scale, 'mode': mode, 'status': 'TIMEOUT'}
+            elif process.exitcode != 0:
+                result = {'scale': scale, 'mode': mode, 'status': f'ERREUR (code {process.exitcode})'}
+            else:
+                result = queue.get()
+            results.append(result)
+            print(f"x{scale:<4} {mode:<11} {result.get('status')}: "
+                  f"construction {_fmt(result.get('build_time'))} s, "
+                  f"1re solution {_fmt(result.get('first_solution_time'))} s, "
+                  f"résolution {_fmt(result.get('solve_time'))} s, "
+                  f"extraction {_fmt(result.get('extraction_time'), 3)} s, "
+                  f"{result.get('variables')} variables, {_fmt(result.get('peak_rss_mb'), 0)} Mo")
+    
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    base = os.path.join(output_dir, f"benchmark_{GENERATOR_VERSION}_{stamp}")
+    with open(f"{base}.json", 'w', encoding='utf-8') as file:
+        json.dump({
+            'generator_version': GENERATOR_VERSION,
+            'date': stamp,
+            'machine': {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count()},
+            'settings': {'time_limit': time_limit, 'num_workers': num_workers, 'sharing_ratio': sharing_ratio, 'seed': seed},
+            'results': results
+        }, file, ensure_ascii=False, indent=2)
+    
+    columns = sorted({key for result in results for key in result})
+    with open(f"{base}.csv", 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(results)
+    
+    print(f"Résultats sauvegardés dans {base}.json et {base}.csv")
+    return results
+
+
+def compare_reports(reference_file, candidate_file):
+    """Comparer deux rapports de benchmark (rapport candidat / rapport de référence)."""
+    with open(reference_file, 'r', encoding='utf-8') as file:
+        reference = json.load(file)
+    with open(candidate_file, 'r', encoding='utf-8') as file:
+        candidate = json.load(file)
+    
+    by_case = {(r['scale'], r['mode']): r for r in reference['results']}
+    metrics = ['build_time', 'first_solution_time', 'solve_time', 'extraction_time', 'peak_rss_mb']
+    print(f"{reference['generator_version']} -> {candidate['generator_version']} (ratio candidat / référence)")
+    print(f"{'Cas':<18}" + ''.join(f"{m:>22}" for m in metrics))
+    for result in candidate['results']:
+        ref = by_case.get((result['scale'], result['mode']))
+        if not ref:
+            continue
+        ratios = []
+        for metric in metrics:
+            if result.get(metric) and ref.get(metric):
+                ratios.append(f"{result[metric] / ref[metric]:>22.2f}")
+            else:
+                ratios.append(f"{'-':>22}")
+        print(f"{'x' + str(result['scale']) + ' ' + result['mode']:<18}" + ''.join(ratios))
+
+
+def measure_commands(seed=0):
+    """Mesurer la durée de chaque sous-commande de main.py, interpréteur compris.
+    
+    Chaque sous-commande est lancée dans un processus neuf sur une instance
+    synthétique à l'échelle 1, pour vérifier que les commandes légères (check,
+    info) ne chargent pas le solveur ni les bibliothèques de dessin.
+    """
+    import subprocess
+    
+    main_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        rooms_file, subjects_file = generate_instance(tmp, seed=seed, **scaled_parameters(1))
+        common = ['--salles', rooms_file, '--matieres', subjects_file, '--sortie', tmp, '--temps']
+        commands = [
+            ['check'],
+            ['solve', '--mode', 'two_phase', '--temps-limite', '30', '--sans-cache'],
+            ['info'],
+            ['export'],
+            ['render'],
+        ]
+        for command in commands:
+            start = time.perf_counter()
+            completed = subprocess.run([sys.executable, main_file, *command, *common],
+                                       capture_output=True, text=True, cwd=tmp)
+            elapsed = time.perf_counter() - start
+            summary = completed.stdout.strip().splitlines()[-1] if completed.stdout.strip() else ''
+            results.append({'command': command[0], 'time': elapsed, 'returncode': completed.returncode})
+            print(f"{command[0]:<8} {elapsed:>7.3f} s  {summary}")
+    return results
+
+
+def _fmt(value, digits=2):
+    return '-' if value is None else f"{value:.{digits}f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de mise à l'échelle du générateur d'emplois du temps")
+    parser.add_argument('--echelles', type=int, nargs='+', default=DEFAULT_SCALES,
+                        help="Facteurs d'échelle par rapport aux données actuelles")
+    parser.add_argument('--modes', nargs='+', default=['two_phase'],
+                        choices=['joint', 'two_phase', 'decomposed', 'lns'])
+    parser.add_argument('--temps-limite', type=float, default=60)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--partage', type=float, default=0.3,
+                        help="Proportion de matières confiées à un enseignant partagé")
+    parser.add_argument('--graine', type=int, default=0)
+    parser.add_argument('--sortie', default='benchmarks')
+    parser.add_argument('--generer', metavar='REPERTOIRE',
+                        help="Écrire seulement une instance synthétique (échelle = première valeur de --echelles)")
+    parser.add_argument('--comparer', nargs=2, metavar=('REFERENCE', 'CANDIDAT'),
+                        help="Comparer deux rapports JSON de benchmark")
+    parser.add_argument('--commandes', action='store_true',
+                        help="Mesurer le temps de démarrage et d'exécution de chaque sous-commande de main.py")
+    args = parser.parse_args(argv)
+    
+    if args.commandes:
+        measure_commands(args.graine)
+    elif args.comparer:
+        compare_reports(*args.comparer)
+    elif args.generer:
+        files = generate_instance(args.generer, seed=args.graine,
+                                  **scaled_parameters(args.echelles[0], args.partage))
+        print(f"Instance écrite: {', '.join(files)}")
+    else:
+        run_benchmark(args.echelles, args.modes, args.temps_limite, args.threads,
+                      args.partage, args.graine, args.sortie)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
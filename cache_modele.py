@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+import zlib
+from array import array
+
+# Répertoire et taille maximale par défaut du cache des modèles
+CACHE_DIR = '.cache_modeles'
+MAX_CACHE_BYTES = 200 * 1024 * 1024  # 200 Mo
+
+
+class ModelCache:
+    """Cache disque des modèles CP-SAT construits, indexé par le contenu des données.
+    
+    Chaque entrée contient le modèle (format texte protobuf compressé) et la
+    correspondance variable -> (matière, salle, créneau) de la table de
+    variables. La clé est une empreinte des données normalisées, du
+    constructeur utilisé et de la version du générateur: toute modification de
+    rooms.json, subjects.json ou des poids produit une nouvelle entrée.
+    """
+    
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+    
+    def key(self, generator, builder):
+        """Calculer la clé d'un modèle à partir des données normalisées du générateur."""
+        from generateur import GENERATOR_VERSION
+        
+        normalized = {
+            'version': GENERATOR_VERSION,
+            'builder': builder,
+            'days': generator.days,
+            'periods': generator.periods,
+            'period_weights': generator.period_weights,
+            'rooms': [dict(r) for r in generator.rooms],
+            'subjects': [dict(s) for s in generator.subjects],
+            'room_domains': generator.room_domains,
+            'blocked_room_slots': sorted(generator.blocked_room_slots),
+            'blocked_lecturer_slots': sorted(generator.blocked_lecturer_slots),
+        }
+        payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.modele")
+    
+    def load(self, key):
+        """Charger une entrée du cache, ou None si elle est absente ou illisible."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                entry = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        
+        # Marquer l'entrée comme récemment utilisée pour l'éviction
+        os.utime(path)
+        entry['model'] = zlib.decompress(entry['model']).decode('utf-8')
+        return entry
+    
+    def store(self, key, model, table):
+        """Enregistrer un modèle et sa table de variables, puis appliquer la limite de taille."""
+        os.makedirs(self.directory, exist_ok=True)
+        entry = {
+            'model': zlib.compress(str(model.Proto()).encode('utf-8'), 1),
+            'subject': array('i', table.subject),
+            'room': array('i', table.room),
+            'slot': array('i', table.slot),
+        }
+        # Fichier temporaire propre à l'appel: deux processus peuvent enregistrer la même clé
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._evict()
+    
+    def _entries(self):
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.modele'):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+    
+    def _evict(self):
+        """Supprimer les entrées les moins récemment utilisées au-delà de max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+    
+    def clear(self):
+        """Vider le cache."""
+        for _, _, name in self._entries():
+            os.remove(os.path.join(self.directory, name))
+
+
+if __name__ == "__main__":
+    cache = ModelCache()
+    if '--vider' in sys.argv:
+        cache.clear()
+        print(f"Cache des modèles vidé ({cache.directory})")
+    else:
+        entries = cache._entries()
+        print(f"{len(entries)} modèle(s) en cache, {sum(s for _, s, _ in entries) / 1024 / 1024:.1f} Mo")
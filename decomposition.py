@@ -0,0 +1,254 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from generateur import TimetableGenerator
+
+
+class _UnionFind:
+    """Union-find sur des identifiants entiers."""
+    
+    def __init__(self, n):
+        self.parent = list(range(n))
+    
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+    
+    def union(self, i, j):
+        self.parent[self.find(i)] = self.find(j)
+    
+    def groups(self):
+        groups = {}
+        for i in range(len(self.parent)):
+            groups.setdefault(self.find(i), []).append(i)
+        return list(groups.values())
+
+
+def _partition_rooms(generator, components):
+    """Réserver des salles disjointes à chaque composante.
+    
+    Une composante de k classes peut avoir jusqu'à k cours simultanés: elle doit
+    recevoir au moins k salles, dont au moins une salle candidate pour chacune
+    de ses matières. Les salles les moins demandées sont attribuées en premier, puis
+    les salles restantes sont réparties entre les composantes qui peuvent les
+    utiliser. Retourne la liste des salles par composante, ou l'indice d'une
+    composante impossible à servir.
+    """
+    # Ensembles distincts de salles candidates des matières de chaque composante
+    subject_domains = [
+        {frozenset(generator.room_domains[s_id]) for c_id in comp for s_id in generator.subjects_by_class[c_id]}
+        for comp in components
+    ]
+    component_domains = [set().union(*domains) for domains in subject_domains]
+    
+    demand = {}
+    for domain in component_domains:
+        for r_id in domain:
+            demand[r_id] = demand.get(r_id, 0) + 1
+    
+    reserved = [set() for _ in components]
+    taken = set()
+    order = sorted(range(len(components)), key=lambda i: len(component_domains[i]))
+    for i in order:
+        for domain in sorted(subject_domains[i], key=len):
+            if not domain or domain & reserved[i]:
+                continue
+            free = sorted(domain - taken, key=lambda r: demand[r])
+            if not free:
+                return i
+            reserved[i].add(free[0])
+            taken.add(free[0])
+        free = sorted(component_domains[i] - taken, key=lambda r: demand[r])
+        missing = len(components[i]) - len(reserved[i])
+        if missing > len(free):
+            return i
+        for r_id in free[:max(missing, 0)]:
+            reserved[i].add(r_id)
+            taken.add(r_id)
+    
+    # Salles restantes: à la composante qui en a le moins par classe
+    for r_id in sorted(set(demand) - taken):
+        claimants = [i for i in range(len(components)) if r_id in component_domains[i]]
+        best = min(claimants, key=lambda i: len(reserved[i]) / len(components[i]))
+        reserved[best].add(r_id)
+    return reserved
+
+
+def find_components(generator):
+    """Découper le problème en composantes indépendantes de classes.
+    
+    Le graphe de conflits relie deux classes qui partagent un enseignant. Ses
+    composantes connexes reçoivent ensuite des salles disjointes; lorsqu'une
+    composante ne peut pas être servie, elle est fusionnée avec les composantes
+    qui convoitent les mêmes salles. Retourne une liste de couples
+    (identifiants de classes, identifiants de salles).
+    """
+    uf = _UnionFind(len(generator.classes))
+    first_class = {}
+    for s_id, l_id in enumerate(generator.subject_lecturer):
+        if l_id < 0:
+            continue
+        c_id = generator.subject_class[s_id]
+        if l_id in first_class:
+            uf.union(c_id, first_class[l_id])
+        else:
+            first_class[l_id] = c_id
+    
+    while True:
+        components = [sorted(group) for group in uf.groups()]
+        reserved = _partition_rooms(generator, components)
+        if not isinstance(reserved, int):
+            return list(zip(components, [sorted(r) for r in reserved]))
+        if len(components) == 1:
+            return [(components[0], list(range(len(generator.rooms))))]
+        
+        # Fusionner la composante bloquée avec celles qui partagent ses salles candidates
+        blocked = components[reserved]
+        blocked_rooms = {
+            r_id for c_id in blocked for s_id in generator.subjects_by_class[c_id]
+            for r_id in generator.room_domains[s_id]
+        }
+        for comp in components:
+            comp_rooms = {
+                r_id for c_id in comp for s_id in generator.subjects_by_class[c_id]
+                for r_id in generator.room_domains[s_id]
+            }
+            if comp is not blocked and comp_rooms & blocked_rooms:
+                uf.union(comp[0], blocked[0])
+
+
+def _shares_rooms(generator, components):
+    """Vrai si une salle est candidate pour des matières de deux composantes.
+    
+    Dans ce cas le partage des salles restreint le problème complet: la
+    solution fusionnée n'est pas prouvée optimale même si chaque composante l'est.
+    """
+    seen = set()
+    for class_ids, _ in components:
+        rooms = {
+            r_id for c_id in class_ids for s_id in generator.subjects_by_class[c_id]
+            for r_id in generator.room_domains[s_id]
+        }
+        if rooms & seen:
+            return True
+        seen |= rooms
+    return False
+
+
+def _solve_component(task):
+    """Résoudre une composante dans un processus de travail."""
+    start = time.perf_counter()
+    generator = TimetableGenerator.from_records(
+        task['rooms'], task['subjects'], task['classes'],
+        task['class_info'], task['room_compatibility'], task['department']
+    )
+    generator.num_workers = task['num_workers']
+    generator.time_limit = task['time_limit']
+    generator.log_search = False
+    # Réglage hérité du générateur complet, threads exceptés (répartis entre les composantes)
+    generator.solver_profile = None
+    generator.solver_parameters = task['solver_parameters']
+    for room_num, slot in task['blocked']:
+        generator.block_room_slot(room_num, slot)
+    for lecturer, slot in task['blocked_lecturers']:
+        generator.block_lecturer_slot(lecturer, slot)
+    
+    solved = generator.solve(task['mode'], previous_solution=task['previous'], use_cache=False)
+    return {
+        'solution': generator.solution if solved else None,
+        'solve_time': time.perf_counter() - start,
+        'stats': generator.stats,
+    }
+
+
+def solve_decomposed(generator, mode='two_phase', max_processes=None, placements=()):
+    """Résoudre chaque composante indépendante dans un pool de processus et fusionner.
+    
+    La solution fusionnée est stockée dans generator.solution, avec la taille et
+    le temps de résolution de chaque composante. Elle n'est dite optimale que si
+    chaque composante l'est et qu'aucune salle n'est candidate pour deux
+    composantes (sinon le partage des salles restreint le problème). placements
+    (triplets matière, salle, créneau d'une solution précédente) sont transmis
+    à chaque composante comme point de départ. Retourne False si une
+    composante n'a pas pu être résolue.
+    """
+    start = time.perf_counter()
+    components = find_components(generator)
+    restricted = _shares_rooms(generator, components)
+    previous = generator._solution_dict('previous', 0, placements)['assignments']
+    processes = min(max_processes or os.cpu_count() or 1, len(components))
+    num_workers = max(1, generator.num_workers // processes)
+    
+    tasks = []
+    for class_ids, room_ids in components:
+        room_nums = {generator.rooms[r_id]['num'] for r_id in room_ids}
+        classes = [generator.classes[c_id] for c_id in class_ids]
+        class_names = set(classes)
+        tasks.append({
+            'rooms': [generator.rooms[r_id] for r_id in room_ids],
+            'subjects': [generator.subjects[s_id] for c_id in class_ids for s_id in generator.subjects_by_class[c_id]],
+            'classes': classes,
+            'class_info': {c: generator.class_info[c] for c in classes if c in generator.class_info},
+            'room_compatibility': generator.room_compatibility,
+            'department': generator.department,
+            'blocked': [
+                (generator.rooms[r_id]['num'], t) for r_id, t in generator.blocked_room_slots
+                if generator.rooms[r_id]['num'] in room_nums
+            ],
+            # Enseignants indisponibles: ignorés par les composantes où ils n'enseignent pas
+            'blocked_lecturers': [(generator.lecturers[l_id], t) for l_id, t in generator.blocked_lecturer_slots],
+            'mode': mode,
+            # Affectations précédentes de la composante (celles des autres salles sont ignorées à la lecture)
+            'previous': {'assignments': [a for a in previous if a['class'] in class_names]} if previous else None,
+            'num_workers': num_workers,
+            'solver_parameters': {
+                name: value for name, value in generator.solver_parameters.items() if name != 'num_search_workers'
+            },
+            'time_limit': generator.time_limit,
+        })
+    
+    print(f"Décomposition en {len(components)} composante(s):")
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        results = list(pool.map(_solve_component, tasks))
+    
+    report = []
+    for task, result in zip(tasks, results):
+        report.append({
+            'classes': task['classes'],
+            'subjects': len(task['subjects']),
+            'rooms': len(task['rooms']),
+            'solve_time': result['solve_time'],
+            'status': result['solution']['status'] if result['solution'] else 'failed',
+        })
+        print(f"  {', '.join(task['classes'])}: {len(task['subjects'])} matières, "
+              f"{len(task['rooms'])} salles, {report[-1]['status']} en {result['solve_time']:.2f} s")
+    
+    built = [
+        stats for result in results
+        for name, stats in result['stats'].items() if name.startswith('build_')
+    ]
+    failed = any(result['solution'] is None for result in results)
+    optimal = not failed and not restricted and all(r['solution']['status'] == 'optimal' for r in results)
+    generator.stats['decomposition'] = {
+        'status': 'FAILED' if failed else ('OPTIMAL' if optimal else 'FEASIBLE'),
+        'rooms_restricted': restricted,
+        'solve_time': time.perf_counter() - start,
+        'variables': sum(stats['variables'] for stats in built),
+        'constraints': sum(stats['constraints'] for stats in built),
+        'components': report,
+    }
+    if failed:
+        return False
+    
+    solutions = [result['solution'] for result in results]
+    generator.solution = {
+        'status': 'optimal' if optimal else 'feasible',
+        'objective_value': sum(s['objective_value'] for s in solutions),
+        'components': report,
+        'assignments': [a for s in solutions for a in s['assignments']]
+    }
+    print(f"Temps total de la résolution décomposée: {time.perf_counter() - start:.2f} s")
+    return True
@@ -0,0 +1,285 @@
+import sys
+import time
+from collections import defaultdict
+
+from ortools.sat.python import cp_model
+
+import instrumentation
+
+# Groupes de contraintes activés par une hypothèse, dans l'ordre où le noyau est réduit
+GROUPS = ('classe', 'enseignant', 'salle', 'cours')
+
+
+def _solve_under(model, assumptions, time_limit):
+    """Chercher une solution quelconque sous des hypothèses; renvoie (solveur, statut)."""
+    model.ClearAssumptions()
+    model.AddAssumptions(assumptions)
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    # CP-SAT ne gère les hypothèses qu'avec une recherche séquentielle
+    solver.parameters.num_search_workers = 1
+    # Seule la faisabilité compte: l'objectif éventuel du modèle est ignoré
+    solver.parameters.stop_after_first_solution = True
+    # Contraintes conditionnelles linéarisées: la relaxation réfute un dépassement dès que les
+    # hypothèses sont posées. Presolve, sondage et symétries, qui ne peuvent rien fixer tant que
+    # les hypothèses restent libres, coûtaient l'essentiel de chaque résolution courte
+    solver.parameters.linearization_level = 2
+    solver.parameters.cp_model_presolve = False
+    solver.parameters.cp_model_probing_level = 0
+    solver.parameters.symmetry_level = 0
+    return solver, solver.Solve(model)
+
+
+def shrink_core(model, core, step_time=2.0, deadline=None):
+    """Réduire un ensemble d'hypothèses incompatibles à un noyau minimal, par suppression.
+    
+    Chaque hypothèse est retirée à tour de rôle: si le reste est encore
+    infaisable, elle n'est pas nécessaire et le noyau est remplacé par les
+    hypothèses suffisantes de cette résolution (souvent beaucoup moins
+    nombreuses); sinon elle est conservée. Une résolution sans réponse en
+    step_time secondes, ou l'échéance deadline (perf_counter) dépassée, laisse
+    l'hypothèse en place: le noyau reste incompatible mais n'est plus garanti
+    minimal. Renvoie (noyau, minimal, nombre de résolutions).
+    """
+    core = list(core)
+    minimal = True
+    solves = 0
+    i = 0
+    while i < len(core):
+        if deadline is not None and time.perf_counter() > deadline:
+            return core, False, solves
+        candidate = core[:i] + core[i + 1:]
+        solver, status = _solve_under(model, candidate, step_time)
+        solves += 1
+        if status == cp_model.INFEASIBLE:
+            # Les hypothèses déjà reconnues nécessaires (avant i) figurent dans tout sous-noyau
+            sufficient = set(solver.SufficientAssumptionsForInfeasibility())
+            core = [literal for literal in candidate if literal.Index() in sufficient] or candidate
+        else:
+            if status != cp_model.OPTIMAL and status != cp_model.FEASIBLE:
+                minimal = False
+            i += 1
+    return core, minimal, solves
+
+
+class Diagnosis:
+    """Résultat du diagnostic: statut et noyau de contraintes incompatibles.
+    
+    Chaque élément du noyau est un dictionnaire avec son type ('classe',
+    'enseignant', 'salle' ou 'cours'), son nom et les cours du noyau concernés;
+    pour une classe, un enseignant ou une salle, 'slots' est le nombre de
+    créneaux où l'un de ces cours peut avoir lieu.
+    """
+    
+    def __init__(self):
+        self.status = 'inconnu'
+        self.core = []
+        self.minimal = False
+        self.solves = 0
+        self.groups = 0
+        self.diagnosis_time = 0.0
+    
+    @property
+    def feasible(self):
+        return self.status == 'faisable'
+    
+    def to_dict(self):
+        return {
+            'status': self.status, 'minimal': self.minimal, 'solves': self.solves, 'groups': self.groups,
+            'diagnosis_time': self.diagnosis_time, 'core': self.core,
+        }
+    
+    def print(self):
+        if self.status == 'faisable':
+            print(f"Diagnostic: tous les cours peuvent être programmés ({self.diagnosis_time:.2f} s); "
+                  f"l'échec vient du temps de résolution, pas d'une incompatibilité")
+            return
+        if self.status == 'inconnu':
+            print(f"Diagnostic: aucune réponse dans le temps imparti ({self.diagnosis_time:.2f} s)")
+            return
+        quality = 'minimal' if self.minimal else 'non garanti minimal'
+        print(f"Diagnostic: {len(self.core)} contrainte(s) incompatibles sur {self.groups} "
+              f"(noyau {quality}, {self.solves} résolution(s), {self.diagnosis_time:.2f} s)")
+        courses = [item['name'] for item in self.core if item['type'] == 'cours']
+        labels = {
+            'classe': "Classe {} (un cours par créneau)",
+            'enseignant': "Enseignant {} (un cours par créneau)",
+            'salle': "Salle {} (un cours par créneau)",
+        }
+        for item in self.core:
+            if item['type'] in labels:
+                print(f"  {labels[item['type']].format(item['name'])}: "
+                      f"{len(item['subjects'])} cours ci-dessous pour {item['slots']} créneau(x) possible(s)")
+        if courses:
+            shown = courses[:15]
+            more = f" (+{len(courses) - len(shown)})" if len(courses) > len(shown) else ''
+            print(f"  Cours à programmer ({len(courses)}): {', '.join(shown)}{more}")
+        print("  Retirer l'une de ces contraintes (un cours, une salle de plus, un autre enseignant) "
+              "lève cette incompatibilité")
+
+
+def build_diagnosis_model(generator, subject_ids=None):
+    """Modèle de faisabilité dont chaque groupe de contraintes dépend d'une hypothèse.
+    
+    Mêmes variables que le modèle complet. La non-superposition des cours d'une
+    classe, d'un enseignant ou d'une salle, et l'obligation de programmer chaque
+    cours, ne s'appliquent que si leur littéral d'hypothèse est vrai; les autres
+    contraintes (une séance au plus une fois, séances d'une matière sur des
+    jours différents) restent toujours actives. Renvoie (modèle, table,
+    hypothèses) où hypothèses est une liste de (littéral, type, identifiant).
+    
+    Avec subject_ids, seuls ces cours (et les autres séances de leurs matières)
+    figurent dans le modèle: toutes les contraintes ne font que limiter les cours
+    programmés, une solution du modèle réduit reste donc une solution du modèle
+    complet (les autres cours non programmés), et inversement.
+    """
+    if subject_ids is not None:
+        subject_ids = set(subject_ids)
+        for members in generator.session_groups:
+            if subject_ids.intersection(members):
+                subject_ids.update(members)
+        subject_ids = sorted(subject_ids)
+    model = cp_model.CpModel()
+    table = generator._joint_table(model, subject_ids=subject_ids)
+    literals = table.literals
+    assumptions = []
+    
+    def group(kind, key, all_lists):
+        lists = [indexes for indexes in all_lists if len(indexes) > 1]
+        if not lists:
+            return
+        literal = model.NewBoolVar(f'{kind}_{key}')
+        for indexes in lists:
+            model.AddAtMostOne([literals[k] for k in indexes]).OnlyEnforceIf(literal)
+        # Redondante mais décisive: sans elle, un simple dépassement (31 cours pour 30
+        # créneaux) est un problème des pigeons que le solveur ne réfute pas en une minute
+        model.Add(
+            sum(literals[k] for per_slot in all_lists for k in per_slot) <= sum(1 for per_slot in all_lists if per_slot)
+        ).OnlyEnforceIf(literal)
+        assumptions.append((literal, kind, key))
+    
+    for c_id, per_slot in enumerate(table.by_class_slot):
+        group('classe', c_id, per_slot)
+    for l_id, per_slot in enumerate(table.by_lecturer_slot):
+        group('enseignant', l_id, per_slot)
+    for r_id, per_slot in enumerate(table.by_room_slot):
+        group('salle', r_id, per_slot)
+    
+    for s_id in (range(len(generator.subjects)) if subject_ids is None else subject_ids):
+        indexes = table.by_subject[s_id]
+        if len(indexes) > 1:
+            model.AddAtMostOne([literals[k] for k in indexes])
+        literal = model.NewBoolVar(f'cours_{s_id}')
+        if indexes:
+            model.AddBoolOr([literals[k] for k in indexes]).OnlyEnforceIf(literal)
+        else:
+            # Cours sans variable (aucune salle compatible ou disponible): jamais programmable
+            model.AddBoolOr([literal.Not()])
+        assumptions.append((literal, 'cours', s_id))
+    
+    n_periods = len(generator.periods)
+    for members in generator.session_groups:
+        if subject_ids is not None and members[0] not in subject_ids:
+            continue
+        by_day = defaultdict(list)
+        for s_id in members:
+            for k in table.by_subject[s_id]:
+                by_day[table.slot[k] // n_periods].append(k)
+        for indexes in by_day.values():
+            if len(indexes) > 1:
+                model.AddAtMostOne([literals[k] for k in indexes])
+        generator._break_session_symmetry(model, table, members)
+    
+    return model, table, assumptions
+
+
+def diagnose(generator, time_limit=60, step_time=2.0):
+    """Expliquer pourquoi tous les cours ne peuvent pas être programmés ensemble.
+    
+    Une première résolution, avec toutes les hypothèses, dit si un emploi du
+    temps complet existe; s'il n'existe pas, le solveur fournit un ensemble
+    suffisant d'hypothèses incompatibles, réduit ensuite par shrink_core en
+    résolutions courtes (step_time secondes chacune). Le tout est borné par
+    time_limit secondes.
+    """
+    start = time.perf_counter()
+    deadline = start + time_limit
+    result = Diagnosis()
+    
+    with instrumentation.phase('diagnostic_construction'):
+        model, table, assumptions = build_diagnosis_model(generator)
+    result.groups = len(assumptions)
+    by_index = {literal.Index(): (kind, key) for literal, kind, key in assumptions}
+    
+    with instrumentation.phase('diagnostic_resolution'):
+        solver, status = _solve_under(model, [literal for literal, _, _ in assumptions], time_limit)
+    result.solves = 1
+    if status == cp_model.INFEASIBLE:
+        result.status = 'infaisable'
+        sufficient = set(solver.SufficientAssumptionsForInfeasibility())
+        core = [by_index[index] for index in sufficient if index in by_index]
+        with instrumentation.phase('diagnostic_reduction'):
+            # Réduction sur le modèle restreint aux cours du noyau: quelques dizaines de
+            # variables par cours au lieu du modèle complet à chaque résolution
+            model, table, assumptions = build_diagnosis_model(
+                generator, [key for kind, key in core if kind == 'cours']
+            )
+            wanted = set(core)
+            literals = [literal for literal, kind, key in assumptions if (kind, key) in wanted]
+            by_index = {literal.Index(): (kind, key) for literal, kind, key in assumptions}
+            literals, result.minimal, solves = shrink_core(model, literals, step_time, deadline)
+        result.solves += solves
+        result.core = _describe(generator, [by_index[literal.Index()] for literal in literals])
+    elif status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
+        result.status = 'faisable'
+    
+    result.diagnosis_time = time.perf_counter() - start
+    return result
+
+
+def _describe(generator, core):
+    """Traduire un noyau de (type, identifiant) en classes, enseignants, salles et cours nommés."""
+    def label(s_id):
+        s = generator.subjects[s_id]
+        session = f" {s['session']}" if s.get('session') else ''
+        return f"{s['code']}{session} ({s['class']})"
+    
+    def slots(s_id):
+        l_id = generator.subject_lecturer[s_id]
+        return {
+            t for r_id in generator.room_domains[s_id] for t in range(generator.n_slots)
+            if (r_id, t) not in generator.blocked_room_slots and (l_id, t) not in generator.blocked_lecturer_slots
+        }
+    
+    courses = [key for kind, key in core if kind == 'cours']
+    items = []
+    for kind, key in core:
+        if kind == 'classe':
+            name = generator.classes[key]
+            subjects = [s_id for s_id in courses if generator.subject_class[s_id] == key]
+        elif kind == 'enseignant':
+            name = generator.lecturers[key]
+            subjects = [s_id for s_id in courses if generator.subject_lecturer[s_id] == key]
+        elif kind == 'salle':
+            name = generator.rooms[key]['num']
+            subjects = [s_id for s_id in courses if key in generator.room_domains[s_id]]
+        else:
+            name = label(key)
+            subjects = [key]
+        item = {'type': kind, 'name': name, 'subjects': [label(s_id) for s_id in subjects]}
+        if kind != 'cours':
+            # Créneaux où au moins un de ces cours peut avoir lieu (salles candidates non bloquées)
+            item['slots'] = len(set().union(*(slots(s_id) for s_id in subjects)))
+        items.append(item)
+    items.sort(key=lambda item: GROUPS.index(item['type']))
+    return items
+
+
+if __name__ == "__main__":
+    from generateur import TimetableGenerator
+    
+    rooms_file = sys.argv[1] if len(sys.argv) > 1 else 'rooms.json'
+    subjects_file = sys.argv[2] if len(sys.argv) > 2 else 'subjects.json'
+    result = diagnose(TimetableGenerator(rooms_file, subjects_file))
+    result.print()
+    sys.exit(1 if result.status == 'infaisable' else 0)
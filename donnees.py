@@ -0,0 +1,537 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+from array import array
+from collections import defaultdict
+from collections.abc import Mapping
+
+# Version du format normalisé: toute modification invalide les instantanés existants
+DATASET_VERSION = '1'
+SNAPSHOT_SUFFIX = '.donnees'
+# Répertoire privé et taille maximale des instantanés de données (voir load_dataset)
+SNAPSHOT_DIR = '.cache_donnees'
+MAX_SNAPSHOT_BYTES = 50 * 1024 * 1024  # 50 Mo
+
+# Nombre maximal d'erreurs affichées dans le message d'une DataError
+_MAX_SHOWN_ERRORS = 20
+
+
+class DataError(ValueError):
+    """Fichier de données invalide; errors contient toutes les erreurs détectées."""
+    
+    def __init__(self, filename, errors):
+        self.filename = filename
+        self.errors = list(errors)
+        shown = '\n'.join(f"  - {error}" for error in self.errors[:_MAX_SHOWN_ERRORS])
+        more = len(self.errors) - _MAX_SHOWN_ERRORS
+        if more > 0:
+            shown += f"\n  ... et {more} autre(s)"
+        super().__init__(f"{filename}: {len(self.errors)} erreur(s)\n{shown}")
+
+
+class StringPool:
+    """Table des chaînes internées: chaque chaîne n'est stockée qu'une fois et désignée par son indice."""
+    
+    __slots__ = ('strings', 'ids')
+    
+    def __init__(self, strings=()):
+        self.strings = list(strings)
+        self.ids = {value: i for i, value in enumerate(self.strings)}
+    
+    def intern(self, value):
+        i = self.ids.get(value)
+        if i is None:
+            i = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return i
+    
+    def __getitem__(self, i):
+        return self.strings[i]
+    
+    def __len__(self):
+        return len(self.strings)
+
+
+class Table:
+    """Table en colonnes: un array('i') par colonne, les colonnes textuelles contenant des indices de chaînes."""
+    
+    __slots__ = ('pool', 'keys', 'string_keys', 'columns')
+    
+    def __init__(self, pool, int_keys, string_keys, columns=None):
+        self.pool = pool
+        self.keys = list(int_keys) + list(string_keys)
+        self.string_keys = frozenset(string_keys)
+        self.columns = columns or {key: array('i') for key in self.keys}
+    
+    def __len__(self):
+        return len(self.columns[self.keys[0]])
+    
+    def append(self, values):
+        """Ajouter une ligne à partir d'un dictionnaire; les chaînes sont internées."""
+        for key in self.keys:
+            value = values[key]
+            self.columns[key].append(self.pool.intern(value) if key in self.string_keys else value)
+        return len(self) - 1
+    
+    def value(self, row, key):
+        value = self.columns[key][row]
+        return self.pool[value] if key in self.string_keys else value
+    
+    def records(self):
+        return [Record(self, row) for row in range(len(self))]
+
+
+class Record(Mapping):
+    """Vue en lecture seule d'une ligne de table, utilisable comme un dictionnaire.
+    
+    Sérialisée (pickle) en simple dictionnaire: les processus de travail
+    reçoivent les valeurs sans la table entière.
+    """
+    
+    __slots__ = ('_table', '_row')
+    
+    def __init__(self, table, row):
+        self._table = table
+        self._row = row
+    
+    def __getitem__(self, key):
+        if key not in self._table.columns:
+            raise KeyError(key)
+        return self._table.value(self._row, key)
+    
+    def __iter__(self):
+        return iter(self._table.keys)
+    
+    def __len__(self):
+        return len(self._table.keys)
+    
+    def __reduce__(self):
+        return (dict, (dict(self),))
+    
+    def __repr__(self):
+        return repr(dict(self))
+
+
+# Colonnes des tables normalisées (entières, puis textuelles)
+ROOM_COLUMNS = (['capacity'], ['num', 'building', 'department', 'type'])
+SUBJECT_COLUMNS = (
+    ['credits', 'group'],
+    ['name', 'code', 'class', 'lecturer', 'assistant', 'kind', 'session', 'session_kind'],
+)
+CLASS_COLUMNS = (['enrollment'], ['name', 'level', 'semester'])
+
+
+class Dataset:
+    """Salles, séances et classes d'un département, normalisées et validées.
+    
+    Les chaînes (numéros de salles, codes, noms, enseignants...) sont internées
+    dans un StringPool partagé et les tables stockées en colonnes. rooms,
+    subjects et classes sont les tables; room_records() et subject_records()
+    en donnent des vues utilisables comme des dictionnaires. Les index
+    (identifiants des classes et des enseignants, séances par classe) sont
+    calculés au chargement.
+    """
+    
+    def __init__(self, department):
+        self.department = department
+        self.pool = StringPool()
+        self.rooms = Table(self.pool, *ROOM_COLUMNS)
+        self.subjects = Table(self.pool, *SUBJECT_COLUMNS)
+        self.classes = Table(self.pool, *CLASS_COLUMNS)
+        self.excluded_buildings = {}  # classe -> bâtiments exclus
+        self.room_compatibility = {}  # type de cours -> types de salles autorisés
+        self.warnings = []
+    
+    # Chargement et validation des fichiers JSON
+    
+    def _load_rooms(self, data, filename):
+        errors = []
+        if not isinstance(data, dict):
+            raise DataError(filename, ["le fichier doit contenir un objet {département: [salles]}"])
+        if self.department not in data:
+            raise DataError(filename, [
+                f"département '{self.department}' absent (départements: {', '.join(data) or 'aucun'})"
+            ])
+        rooms = data[self.department]
+        if not isinstance(rooms, list):
+            raise DataError(filename, [f"{self.department}: une liste de salles est attendue"])
+        
+        seen = set()
+        for i, room in enumerate(rooms):
+            before = len(errors)
+            where = f"{self.department}[{i}]"
+            if not isinstance(room, dict):
+                errors.append(f"{where}: un objet est attendu")
+                continue
+            num = str(room.get('num', '')).strip()
+            where = f"{where} ({num or 'sans numéro'})"
+            if not num:
+                errors.append(f"{where}: 'num' manquant")
+            elif num in seen:
+                errors.append(f"{where}: numéro de salle en double")
+            seen.add(num)
+            capacity = _to_int(room.get('capacite'))
+            if capacity is None or capacity < 0:
+                errors.append(f"{where}: 'capacite' doit être un entier positif (reçu {room.get('capacite')!r})")
+            building = room.get('batiment')
+            if not isinstance(building, str) or not building:
+                errors.append(f"{where}: 'batiment' manquant")
+            if len(errors) > before:
+                continue
+            self.rooms.append({
+                'num': num,
+                'capacity': capacity,
+                'building': building,
+                'department': str(room.get('filier', '')),
+                'type': str(room.get('type', building)),
+            })
+        if errors:
+            raise DataError(filename, errors)
+    
+    def _load_subjects(self, data, filename):
+        errors = []
+        if not isinstance(data, dict) or not isinstance(data.get('niveau'), dict):
+            raise DataError(filename, ["clé 'niveau' manquante ou invalide"])
+        
+        compatibility = data.get('compatibilite_salles', {})
+        if not isinstance(compatibility, dict) or not all(isinstance(v, list) for v in compatibility.values()):
+            errors.append("'compatibilite_salles' doit associer à chaque type de cours une liste de types de salles")
+        else:
+            self.room_compatibility = {kind: set(room_types) for kind, room_types in compatibility.items()}
+        
+        # Nombre de séances hebdomadaires (cours magistraux et TD) selon les crédits
+        sessions = data.get('seances', {})
+        sessions_by_credit = sessions.get('par_credit', {}) if isinstance(sessions, dict) else None
+        if not isinstance(sessions_by_credit, dict):
+            errors.append("'seances.par_credit' doit être un objet {crédits: {cours, td}}")
+            sessions_by_credit = {}
+        
+        # Préfixe des classes: explicite dans le fichier, sinon dérivé du département
+        prefix = data.get('prefixe', self.department[:4].upper())
+        
+        for level, level_data in data['niveau'].items():
+            if not isinstance(level_data, dict):
+                errors.append(f"niveau.{level}: un objet {{semestre: ...}} est attendu")
+                continue
+            for semester, semester_data in level_data.items():
+                where = f"niveau.{level}.{semester}"
+                if not isinstance(semester_data, dict):
+                    errors.append(f"{where}: un objet est attendu")
+                    continue
+                class_name = f"{prefix}{level}{semester}"
+                enrollment = _to_int(semester_data.get('effectif', 0))
+                if enrollment is None or enrollment < 0:
+                    errors.append(f"{where}: 'effectif' doit être un entier positif")
+                    enrollment = 0
+                excluded = semester_data.get('batiments_exclus', [])
+                if not isinstance(excluded, list):
+                    errors.append(f"{where}: 'batiments_exclus' doit être une liste")
+                    excluded = []
+                self.classes.append({'name': class_name, 'level': str(level), 'semester': str(semester),
+                                     'enrollment': enrollment})
+                self.excluded_buildings[class_name] = frozenset(excluded)
+                
+                subjects = semester_data.get('subjects', [])
+                if not isinstance(subjects, list):
+                    errors.append(f"{where}: 'subjects' doit être une liste")
+                    continue
+                codes = set()
+                for i, subject in enumerate(subjects):
+                    self._load_subject(subject, f"{where}.subjects[{i}]", class_name, sessions_by_credit,
+                                       codes, errors)
+        if errors:
+            raise DataError(filename, errors)
+    
+    def _load_subject(self, subject, where, class_name, sessions_by_credit, codes, errors):
+        if not isinstance(subject, dict):
+            errors.append(f"{where}: un objet est attendu")
+            return
+        name = subject.get('name', '')
+        if isinstance(name, list):
+            name = next((n for n in name if n), '')
+        if not name:
+            # Les cours sans nom sont ignorés, comme auparavant
+            self.warnings.append(f"{where}: matière sans nom ignorée")
+            return
+        
+        code = subject.get('code', '')
+        where = f"{where} ({code or name})"
+        if not isinstance(code, str) or not code:
+            errors.append(f"{where}: 'code' manquant")
+            return
+        if code in codes:
+            self.warnings.append(f"{where}: code {code} présent plusieurs fois dans {class_name}")
+        codes.add(code)
+        credits = _to_int(subject.get('credit', 0))
+        if credits is None:
+            errors.append(f"{where}: 'credit' doit être un entier (reçu {subject.get('credit')!r})")
+            return
+        
+        defaults = sessions_by_credit.get(str(credits), {})
+        n_lectures = _to_int(subject.get('seances', defaults.get('cours', 1)))
+        n_tutorials = _to_int(subject.get('seances_td', defaults.get('td', 0)))
+        if n_lectures is None or n_tutorials is None or n_lectures < 0 or n_tutorials < 0:
+            errors.append(f"{where}: 'seances' et 'seances_td' doivent être des entiers positifs")
+            return
+        if n_lectures + n_tutorials == 0:
+            errors.append(f"{where}: aucune séance hebdomadaire")
+            return
+        
+        # Clé historiquement mal orthographiée ('Assitant lecturer'), l'orthographe correcte est aussi acceptée
+        record = {
+            'name': name,
+            'code': code,
+            'credits': credits,
+            'class': class_name,
+            'lecturer': _first_name(subject.get('Course Lecturer', '')),
+            'assistant': _first_name(subject.get('Assitant lecturer', subject.get('Assistant lecturer', ''))),
+            'kind': str(subject.get('type', '')),
+        }
+        self._add_sessions(record, n_lectures, n_tutorials, subject.get('type_td'))
+    
+    def _add_sessions(self, record, n_lectures, n_tutorials, tutorial_kind=None):
+        """Une ligne par séance hebdomadaire d'une matière.
+        
+        Les cours magistraux (CM) sont donnés par l'enseignant principal, les TD
+        par l'assistant (à défaut par l'enseignant principal), dans les salles
+        compatibles avec tutorial_kind s'il est précisé. Toutes les séances d'une
+        matière partagent le même numéro de groupe. Une matière à séance unique
+        garde une étiquette de séance vide.
+        """
+        group = len(self.subjects)
+        single = n_lectures == 1 and n_tutorials == 0
+        for i in range(n_lectures):
+            self.subjects.append(dict(record, group=group, session='' if single else f"CM{i + 1}",
+                                      session_kind='CM'))
+        for i in range(n_tutorials):
+            self.subjects.append(dict(
+                record, group=group, session=f"TD{i + 1}", session_kind='TD',
+                lecturer=record['assistant'] or record['lecturer'],
+                kind=str(tutorial_kind) if tutorial_kind is not None else record['kind']
+            ))
+    
+    def _build_indexes(self):
+        """Index de recherche: identifiants des salles, classes et enseignants, séances par classe."""
+        rooms = self.rooms.columns
+        subjects = self.subjects.columns
+        self.room_ids = {self.pool[num]: r_id for r_id, num in enumerate(rooms['num'])}
+        
+        # Classes triées par nom (ordre des feuilles et des identifiants du générateur)
+        names = [self.pool[i] for i in self.classes.columns['name']]
+        self.class_order = sorted(range(len(names)), key=lambda i: names[i])
+        self.class_ids = {names[i]: c_id for c_id, i in enumerate(self.class_order)}
+        class_of_string = {self.pool.ids[name]: c_id for name, c_id in self.class_ids.items()}
+        self.subject_class = array('i', (class_of_string[i] for i in subjects['class']))
+        
+        empty = self.pool.ids.get('')
+        self.lecturers = sorted({self.pool[i] for i in subjects['lecturer'] if i != empty})
+        lecturer_of_string = {self.pool.ids[name]: l_id for l_id, name in enumerate(self.lecturers)}
+        self.lecturer_ids = {name: l_id for l_id, name in enumerate(self.lecturers)}
+        self.subject_lecturer = array('i', (lecturer_of_string.get(i, -1) for i in subjects['lecturer']))
+        
+        self.subjects_by_class = [[] for _ in self.class_ids]
+        for s_id, c_id in enumerate(self.subject_class):
+            self.subjects_by_class[c_id].append(s_id)
+        self.subjects_by_code = defaultdict(list)
+        for s_id, code in enumerate(subjects['code']):
+            self.subjects_by_code[self.pool[code]].append(s_id)
+    
+    # Accès pour le générateur, le vérificateur et le visualiseur
+    
+    def room_records(self):
+        """Salles sous forme de vues dictionnaire (num, capacity, building, department, type)."""
+        return self.rooms.records()
+    
+    def subject_records(self):
+        """Séances sous forme de vues dictionnaire (name, code, class, lecturer, session...)."""
+        return self.subjects.records()
+    
+    def class_names(self):
+        """Noms des classes, triés."""
+        return sorted(self.class_ids, key=self.class_ids.get)
+    
+    def class_info(self):
+        """Effectif et bâtiments exclus de chaque classe."""
+        columns = self.classes.columns
+        return {
+            self.pool[columns['name'][i]]: {
+                'enrollment': columns['enrollment'][i],
+                'excluded_buildings': set(self.excluded_buildings[self.pool[columns['name'][i]]]),
+            }
+            for i in range(len(self.classes))
+        }
+    
+    def subject_codes(self):
+        """Codes des matières, dans l'ordre du fichier (sans doublons)."""
+        return list(self.subjects_by_code)
+    
+    # Instantané binaire
+    
+    def _snapshot(self, key):
+        return {
+            'version': DATASET_VERSION,
+            'key': key,
+            'department': self.department,
+            'strings': self.pool.strings,
+            'rooms': self.rooms.columns,
+            'subjects': self.subjects.columns,
+            'classes': self.classes.columns,
+            'excluded_buildings': self.excluded_buildings,
+            'room_compatibility': self.room_compatibility,
+            'warnings': self.warnings,
+        }
+    
+    @classmethod
+    def _from_snapshot(cls, snapshot):
+        dataset = cls(snapshot['department'])
+        dataset.pool = StringPool(snapshot['strings'])
+        dataset.rooms = Table(dataset.pool, *ROOM_COLUMNS, snapshot['rooms'])
+        dataset.subjects = Table(dataset.pool, *SUBJECT_COLUMNS, snapshot['subjects'])
+        dataset.classes = Table(dataset.pool, *CLASS_COLUMNS, snapshot['classes'])
+        dataset.excluded_buildings = snapshot['excluded_buildings']
+        dataset.room_compatibility = snapshot['room_compatibility']
+        dataset.warnings = snapshot['warnings']
+        dataset._build_indexes()
+        return dataset
+
+
+def _to_int(value):
+    """Entier à partir d'un entier ou d'une chaîne (« 150 »), sinon None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            return None
+    return None
+
+
+def _first_name(value):
+    """Premier nom d'un champ enseignant (chaîne ou liste de noms)."""
+    if isinstance(value, list):
+        return str(value[0]) if value else ''
+    return str(value or '')
+
+
+def snapshot_path(key, directory=SNAPSHOT_DIR):
+    """Chemin de l'instantané binaire d'une clé de contenu, dans le répertoire des instantanés."""
+    return os.path.join(directory, f"{key}{SNAPSHOT_SUFFIX}")
+
+
+def _write_snapshot(snapshot, path):
+    """Écrire un instantané de façon atomique, par un fichier temporaire propre à l'appelant.
+    
+    Plusieurs processus (départements, composantes, réglage) peuvent écrire le
+    même instantané en même temps: chacun écrit son fichier puis le renomme.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    _evict_snapshots(directory)
+
+
+def _evict_snapshots(directory, max_bytes=MAX_SNAPSHOT_BYTES):
+    """Supprimer les instantanés les moins récemment utilisés au-delà de max_bytes."""
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith(SNAPSHOT_SUFFIX):
+            try:
+                stat = os.stat(os.path.join(directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+        total -= size
+
+
+def _read(filename):
+    with open(filename, 'rb') as file:
+        return file.read()
+
+
+def _parse(content, filename):
+    try:
+        return json.loads(content)
+    except ValueError as error:
+        raise DataError(filename, [f"JSON invalide: {error}"]) from None
+
+
+def load_dataset(rooms_file, subjects_file, department='Informatique', use_snapshot=True,
+                 snapshot_dir=SNAPSHOT_DIR):
+    """Lire, valider et normaliser les fichiers de salles et de matières d'un département.
+    
+    Chaque fichier est lu une seule fois. Le résultat est enregistré dans un
+    instantané binaire (pickle) de snapshot_dir, nommé par l'empreinte du
+    contenu des deux fichiers: tant qu'il ne change pas, les données sont
+    rechargées sans relire le JSON. Les instantanés ne sont lus que dans ce
+    répertoire privé, où seul le programme les écrit (comme les caches des
+    modèles et des rendus). Lève DataError (avec la liste des erreurs) si les
+    données sont invalides, OSError si un fichier est illisible.
+    """
+    rooms_content = _read(rooms_file)
+    subjects_content = _read(subjects_file)
+    digest = hashlib.sha256(f"{DATASET_VERSION}\0{department}\0".encode('utf-8'))
+    digest.update(rooms_content)
+    digest.update(b'\0')
+    digest.update(subjects_content)
+    key = digest.hexdigest()
+    
+    path = snapshot_path(key, snapshot_dir)
+    if use_snapshot:
+        try:
+            with open(path, 'rb') as file:
+                snapshot = pickle.load(file)
+            if snapshot.get('version') == DATASET_VERSION and snapshot.get('key') == key:
+                # Marquer l'instantané comme récemment utilisé pour l'éviction
+                os.utime(path)
+                return Dataset._from_snapshot(snapshot)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError):
+            pass
+    
+    dataset = Dataset(department)
+    dataset._load_rooms(_parse(rooms_content, rooms_file), rooms_file)
+    dataset._load_subjects(_parse(subjects_content, subjects_file), subjects_file)
+    dataset._build_indexes()
+    
+    if use_snapshot:
+        try:
+            _write_snapshot(dataset._snapshot(key), path)
+        except OSError as error:
+            print(f"Instantané des données non écrit ({path}): {error}")
+    return dataset
+
+
+if __name__ == "__main__":
+    # Validation et création de l'instantané: python3 donnees.py rooms.json subjects.json [département]
+    rooms_file = sys.argv[1] if len(sys.argv) > 1 else 'rooms.json'
+    subjects_file = sys.argv[2] if len(sys.argv) > 2 else 'subjects.json'
+    try:
+        dataset = load_dataset(rooms_file, subjects_file, *sys.argv[3:4])
+    except DataError as error:
+        print(f"Données invalides: {error}")
+        sys.exit(1)
+    for warning in dataset.warnings:
+        print(f"Attention: {warning}")
+    print(f"{len(dataset.rooms)} salles, {len(dataset.subjects)} séances, {len(dataset.class_ids)} classes, "
+          f"{len(dataset.lecturers)} enseignants, {len(dataset.pool)} chaînes distinctes")
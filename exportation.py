@@ -0,0 +1,184 @@
+import csv
+import os
+import re
+from collections import defaultdict
+
+import instrumentation
+
+DAYS = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi']
+PERIODS = ['7h00-9h55', '10h05-12h55', '13h05-15h55', '16h05-18h55', '19h05-21h55']
+# Poids des périodes dans l'objectif (favorisant celles du matin)
+PERIOD_WEIGHTS = [5, 4, 3, 2, 1]
+
+# Colonnes de l'export tabulaire (CSV et Parquet): une ligne par affectation
+COLUMNS = ['class', 'day', 'period', 'day_name', 'period_name', 'subject_code',
+           'subject_name', 'session', 'room', 'lecturer']
+
+# Caractères interdits dans un nom de feuille Excel (31 caractères au plus)
+_SHEET_FORBIDDEN = re.compile(r'[\[\]:*?/\\]')
+
+
+def _subject_label(assignment):
+    """Code et nom de la matière, suivis de la séance (CM2, TD1...) s'il y en a plusieurs."""
+    label = f"{assignment['subject_code']} - {assignment['subject_name']}"
+    return f"{label} ({assignment['session']})" if assignment.get('session') else label
+
+
+def class_cell(assignment):
+    """Contenu d'une cellule de l'emploi du temps d'une classe."""
+    return (
+        f"{_subject_label(assignment)}\n"
+        f"Salle: {assignment['room']}\n"
+        f"Prof: {assignment['lecturer']}"
+    )
+
+
+def lecturer_cell(assignment):
+    """Contenu d'une cellule de l'emploi du temps d'un enseignant."""
+    return (
+        f"{_subject_label(assignment)}\n"
+        f"Classe: {assignment['class']}\n"
+        f"Salle: {assignment['room']}"
+    )
+
+
+def room_cell(assignment):
+    """Contenu d'une cellule de l'emploi du temps d'une salle."""
+    return (
+        f"{_subject_label(assignment)}\n"
+        f"Classe: {assignment['class']}\n"
+        f"Prof: {assignment['lecturer']}"
+    )
+
+
+def group_assignments(assignments, key):
+    """Affectations groupées par classe, salle ou enseignant (clé vide ignorée)."""
+    groups = defaultdict(list)
+    for assignment in assignments:
+        if assignment.get(key):
+            groups[assignment[key]].append(assignment)
+    return groups
+
+
+def grid_rows(assignments, cell, days=DAYS, periods=PERIODS):
+    """Lignes (période, cellules par jour) d'une grille d'emploi du temps, en-tête non compris."""
+    grid = [[None] * len(days) for _ in periods]
+    for assignment in assignments:
+        grid[assignment['period']][assignment['day']] = cell(assignment)
+    return [[periods[p]] + grid[p] for p in range(len(periods))]
+
+
+def _sheet_name(name, used):
+    """Nom de feuille Excel valide et unique dans le classeur."""
+    base = _SHEET_FORBIDDEN.sub('_', str(name)).strip("'")[:31] or 'Feuille'
+    sheet_name = base
+    suffix = 1
+    while sheet_name.lower() in used:
+        suffix += 1
+        sheet_name = f"{base[:31 - len(str(suffix)) - 1]}~{suffix}"
+    used.add(sheet_name.lower())
+    return sheet_name
+
+
+def write_grid_workbook(groups, cell, filename, names=None, days=DAYS, periods=PERIODS):
+    """Écrire une feuille par groupe en mode flux (openpyxl write_only).
+    
+    Les lignes sont envoyées au fichier au fur et à mesure: la mémoire utilisée
+    ne dépend pas du nombre de feuilles.
+    """
+    from openpyxl import Workbook
+    
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+    workbook = Workbook(write_only=True)
+    used = set()
+    for name in names if names is not None else sorted(groups):
+        sheet = workbook.create_sheet(_sheet_name(name, used))
+        sheet.append([None] + list(days))
+        for row in grid_rows(groups.get(name, ()), cell, days, periods):
+            sheet.append(row)
+    workbook.save(filename)
+    return filename
+
+
+def write_excel(assignments, output_dir, classes=None):
+    """Classeur Excel avec une feuille par classe (emplois_du_temps.xlsx)."""
+    return write_grid_workbook(
+        group_assignments(assignments, 'class'), class_cell,
+        f"{output_dir}/emplois_du_temps.xlsx", names=classes
+    )
+
+
+def write_lecturers(assignments, output_dir, classes=None):
+    """Classeur Excel avec une feuille par enseignant."""
+    return write_grid_workbook(
+        group_assignments(assignments, 'lecturer'), lecturer_cell,
+        f"{output_dir}/emplois_du_temps_enseignants.xlsx"
+    )
+
+
+def write_rooms(assignments, output_dir, classes=None):
+    """Classeur Excel avec une feuille par salle."""
+    return write_grid_workbook(
+        group_assignments(assignments, 'room'), room_cell,
+        f"{output_dir}/emplois_du_temps_salles.xlsx"
+    )
+
+
+def _records(assignments):
+    for a in assignments:
+        yield [a['class'], a['day'], a['period'], DAYS[a['day']], PERIODS[a['period']],
+               a['subject_code'], a['subject_name'], a.get('session', ''), a['room'], a['lecturer']]
+
+
+def write_csv(assignments, output_dir, classes=None):
+    """Une ligne par affectation, écrite en flux (emplois_du_temps.csv)."""
+    os.makedirs(output_dir, exist_ok=True)
+    filename = f"{output_dir}/emplois_du_temps.csv"
+    with open(filename, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        writer.writerows(_records(assignments))
+    return filename
+
+
+def write_parquet(assignments, output_dir, classes=None):
+    """Format colonnaire pour l'analyse (emplois_du_temps.parquet, nécessite pyarrow)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("Export Parquet ignoré: pyarrow n'est pas installé (pip install pyarrow)")
+        return None
+    
+    os.makedirs(output_dir, exist_ok=True)
+    columns = list(zip(*_records(assignments))) or [()] * len(COLUMNS)
+    table = pa.table({name: list(values) for name, values in zip(COLUMNS, columns)})
+    filename = f"{output_dir}/emplois_du_temps.parquet"
+    pq.write_table(table, filename)
+    return filename
+
+
+# Formats disponibles, sélectionnables en ligne de commande
+FORMATS = {
+    'excel': write_excel,
+    'csv': write_csv,
+    'enseignants': write_lecturers,
+    'salles': write_rooms,
+    'parquet': write_parquet,
+}
+
+
+def export_solution(assignments, output_dir, formats=('excel',), classes=None):
+    """Écrire les emplois du temps dans les formats demandés, directement depuis les affectations.
+    
+    classes fixe l'ordre (et la présence, même sans cours) des feuilles par
+    classe; par défaut, les classes présentes dans les affectations, triées.
+    """
+    written = []
+    for name in formats:
+        with instrumentation.phase(f"export_{name}"):
+            filename = FORMATS[name](assignments, output_dir, classes)
+        if filename:
+            written.append(filename)
+            print(f"Emplois du temps sauvegardés dans {filename}")
+    return written
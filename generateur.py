@@ -1,95 +1,483 @@
 import json
 from ortools.sat.python import cp_model
-import pandas as pd
 import os
+import sys
+import tempfile
+import threading
+import time
+from array import array
 from collections import defaultdict
 
+import instrumentation
+from analyse_faisabilite import analyze, room_domains, session_groups
+from cache_modele import ModelCache
+from donnees import load_dataset
+from exportation import DAYS, PERIODS, PERIOD_WEIGHTS, class_cell, export_solution, group_assignments, grid_rows
+from reglage_solveur import PROFILE_FILE, apply_parameters, profile_parameters
+from solution_binaire import read_solution
+
+# Version du générateur, prise en compte dans la clé du cache des modèles
+GENERATOR_VERSION = '1.3'
+
+
+class VariableTable:
+    """Table plate des variables de décision du modèle indexé.
+
+    La variable k correspond au triplet (subject[k], room[k], slot[k]) où les
+    matières, salles et créneaux sont désignés par leurs identifiants entiers
+    (room[k] vaut -1 dans le modèle des créneaux, qui ne choisit pas de salle).
+    Les listes d'index précalculées donnent directement les variables d'une
+    matière, ou d'une classe, d'un enseignant, d'une salle à un créneau donné.
+    Les variables sont créées dans l'ordre de la table: k est aussi leur index
+    dans le modèle et dans le vecteur solution de la réponse du solveur.
+    """
+
+    __slots__ = ('literals', 'subject', 'room', 'slot', 'by_subject',
+                 'by_class_slot', 'by_lecturer_slot', 'by_room_slot')
+
+    def __init__(self, n_subjects, n_classes, n_lecturers, n_rooms, n_slots):
+        self.literals = []
+        self.subject = array('i')
+        self.room = array('i')
+        self.slot = array('i')
+        self.by_subject = [[] for _ in range(n_subjects)]
+        self.by_class_slot = [[[] for _ in range(n_slots)] for _ in range(n_classes)]
+        self.by_lecturer_slot = [[[] for _ in range(n_slots)] for _ in range(n_lecturers)]
+        self.by_room_slot = [[[] for _ in range(n_slots)] for _ in range(n_rooms)]
+
+    def __len__(self):
+        return len(self.literals)
+
+    def add(self, literal, subject_id, room_id, slot, class_id, lecturer_id):
+        """Enregistrer une variable et l'ajouter aux listes d'index."""
+        k = len(self.literals)
+        self.literals.append(literal)
+        self.subject.append(subject_id)
+        self.room.append(room_id)
+        self.slot.append(slot)
+        self.by_subject[subject_id].append(k)
+        self.by_class_slot[class_id][slot].append(k)
+        if lecturer_id >= 0:
+            self.by_lecturer_slot[lecturer_id][slot].append(k)
+        if room_id >= 0:
+            self.by_room_slot[room_id][slot].append(k)
+        return k
+
+
+class SolutionProgress(cp_model.CpSolverSolutionCallback):
+    """Enregistrer le temps écoulé, l'objectif et la borne de chaque solution trouvée.
+    
+    listener, s'il est fourni, est appelé avec le callback à chaque solution
+    (par exemple pour écrire les solutions intermédiaires).
+    """
+    
+    def __init__(self, listener=None):
+        super().__init__()
+        self.start = time.perf_counter()
+        self.last_improvement = None
+        self.history = []
+        self.listener = listener
+    
+    def on_solution_callback(self):
+        self.last_improvement = time.perf_counter()
+        self.history.append((
+            self.last_improvement - self.start, self.ObjectiveValue(), self.BestObjectiveBound()
+        ))
+        if self.listener:
+            self.listener(self)
+
+
+def _write_json_atomic(data, filename):
+    """Écrire un fichier JSON de façon atomique (fichier temporaire puis renommage).
+    
+    Le fichier temporaire est propre à chaque appel: des écrivains concurrents
+    (solutions intermédiaires, serveur, départements) ne mélangent pas leurs écritures.
+    """
+    directory = os.path.dirname(filename) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_file = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(filename)}.", suffix='.tmp')
+    try:
+        # mkstemp crée le fichier en lecture pour son seul propriétaire
+        os.chmod(tmp_file, 0o644)
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, filename)
+    except BaseException:
+        os.unlink(tmp_file)
+        raise
+
+
 class TimetableGenerator:
-    def __init__(self, rooms_file, subjects_file):
-        """Initialiser le générateur d'emploi du temps avec les fichiers de données."""
-        self.days = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi']
-        self.periods = ['7h00-9h55', '10h05-12h55', '13h05-15h55', '16h05-18h55', '19h05-21h55']
+    def __init__(self, rooms_file, subjects_file, department='Informatique'):
+        """Initialiser le générateur d'emploi du temps avec les fichiers de données.
+        
+        Seules les salles du département indiqué (clé de rooms.json) sont chargées.
+        Les fichiers sont validés et normalisés par donnees.load_dataset, qui lève
+        DataError si les données sont invalides.
+        """
+        with instrumentation.phase('chargement'):
+            dataset = load_dataset(rooms_file, subjects_file, department)
+        self._init_from_dataset(dataset)
+    
+    @classmethod
+    def from_dataset(cls, dataset):
+        """Créer un générateur à partir d'un jeu de données déjà chargé (voir donnees.py)."""
+        generator = cls.__new__(cls)
+        generator._init_from_dataset(dataset)
+        return generator
+    
+    def _init_from_dataset(self, dataset):
+        self._init_settings(dataset.department)
+        self.dataset = dataset
+        self.rooms = dataset.room_records()
+        self.subjects = dataset.subject_records()
+        self.classes = dataset.class_names()
+        self.class_info = dataset.class_info()
+        self.room_compatibility = dataset.room_compatibility
+        with instrumentation.phase('chargement'):
+            self._build_indexes()
+        
+        print(f"Nombre de salles chargées: {len(self.rooms)}")
+        print(f"Nombre de matières chargées: {len(self.subjects)}")
+        print(f"Classes trouvées: {', '.join(self.classes)}")
+    
+    @classmethod
+    def from_records(cls, rooms, subjects, classes, class_info=None, room_compatibility=None,
+                     department='Informatique'):
+        """Créer un générateur à partir de données déjà chargées, sans lire de fichiers."""
+        generator = cls.__new__(cls)
+        generator._init_settings(department)
+        generator.dataset = None
+        generator.rooms = rooms
+        generator.subjects = subjects
+        generator.classes = classes
+        generator.class_info = class_info or {}
+        generator.room_compatibility = room_compatibility or {}
+        generator._build_indexes()
+        return generator
+    
+    def _init_settings(self, department):
+        """Initialiser les paramètres communs à tous les modes de chargement."""
+        self.department = department
+        self.days = list(DAYS)
+        self.periods = list(PERIODS)
         # Poids des périodes (favorisant celles du matin)
-        self.period_weights = [5, 4, 3, 2, 1]  # p1 a plus de poids, p5 a moins de poids
+        self.period_weights = list(PERIOD_WEIGHTS)  # p1 a plus de poids, p5 a moins de poids
+        
+        # Paramètres du solveur
+        self.time_limit = 300  # 5 minutes maximum
+        self.num_workers = 8  # Utiliser plus de threads
+        self.log_search = True  # Activer les logs
+        # Profil de réglage (voir reglage_solveur.py), lu à chaque résolution; None pour l'ignorer
+        self.solver_profile = PROFILE_FILE
+        self.solver_parameters = {}  # paramètres CP-SAT supplémentaires, par nom de champ
         
-        self.rooms = self._load_rooms(rooms_file)
-        self.subjects, self.classes = self._load_subjects(subjects_file)
+        # Mode « anytime »: fichier des solutions intermédiaires et critères d'arrêt anticipé
+        self.anytime_file = None
+        self.gap_limit = None  # écart relatif objectif/borne en dessous duquel on s'arrête
+        self.stall_time = None  # secondes sans amélioration avant l'arrêt
+        
+        # Couples (salle, créneau) et (enseignant, créneau) indisponibles, par exemple
+        # occupés par un autre département
+        self.blocked_room_slots = set()
+        self.blocked_lecturer_slots = set()
         
         self.solution = None
         self.timetable = None
+        # Mesures de la dernière résolution (construction et recherche, par phase)
+        self.stats = {}
+    
+    def _build_indexes(self):
+        """Attribuer des identifiants entiers aux classes, enseignants et créneaux."""
+        # Un créneau t correspond au jour t // len(periods) et à la période t % len(periods)
+        self.n_slots = len(self.days) * len(self.periods)
+        self.class_ids = {c: i for i, c in enumerate(self.classes)}
+        self.lecturers = sorted({s['lecturer'] for s in self.subjects if s['lecturer']})
+        self.lecturer_ids = {l: i for i, l in enumerate(self.lecturers)}
         
-        print(f"Nombre de salles chargées: {len(self.rooms)}")
-        print(f"Nombre de matières chargées: {len(self.subjects)}")
-        print(f"Classes trouvées: {', '.join(self.classes)}")
+        self.subject_class = array('i', (self.class_ids[s['class']] for s in self.subjects))
+        self.subject_lecturer = array('i', (self.lecturer_ids.get(s['lecturer'], -1) for s in self.subjects))
+        self.subjects_by_class = [[] for _ in self.classes]
+        for s_id, c_id in enumerate(self.subject_class):
+            self.subjects_by_class[c_id].append(s_id)
+        
+        # Séances d'une même matière (au moins deux), dans l'ordre CM puis TD
+        self.session_groups = session_groups(self.subjects)
+        
+        self._build_room_domains()
     
-    def _load_rooms(self, filename):
-        """Charger les données des salles depuis le fichier JSON."""
-        try:
-            with open(filename, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-            
-            info_rooms = []
-            for department, rooms in data.items():
-                if department == "Informatique":
-                    for room in rooms:
-                        info_rooms.append({
-                            'num': room['num'],
-                            'capacity': int(room['capacite']),
-                            'building': room['batiment'],
-                            'department': room['filier']
-                        })
-            
-            return info_rooms
-        except Exception as e:
-            print(f"Erreur lors du chargement des salles: {str(e)}")
-            return []
+    def _build_room_domains(self):
+        """Calculer une fois pour toutes les salles candidates de chaque matière.
+        
+        Une salle est écartée avant toute création de variable si sa capacité est
+        inférieure à l'effectif de la classe, si son bâtiment est exclu pour la
+        classe, ou si son type n'est pas compatible avec le type du cours.
+        """
+        self.room_domains = room_domains(self.rooms, self.subjects, self.class_info, self.room_compatibility)
+        for s, domain in zip(self.subjects, self.room_domains):
+            if not domain:
+                print(f"Attention: aucune salle compatible pour {s['code']} ({s['class']})")
+        
+        kept = sum(len(d) for d in self.room_domains)
+        total = len(self.subjects) * len(self.rooms)
+        if kept < total:
+            print(f"Couples (matière, salle) conservés: {kept}/{total}")
     
-    def _load_subjects(self, filename):
-        """Charger les données des cours et des classes depuis le fichier JSON."""
-        try:
-            with open(filename, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-            
-            subjects = []
-            classes = set()
+    def slot_of(self, period, day):
+        """Identifiant du créneau correspondant à une période et un jour."""
+        return day * len(self.periods) + period
+    
+    def block_room_slot(self, room_num, slot):
+        """Rendre une salle indisponible à un créneau."""
+        for r_id, r in enumerate(self.rooms):
+            if r['num'] == room_num:
+                self.blocked_room_slots.add((r_id, slot))
+    
+    def block_lecturer_slot(self, lecturer, slot):
+        """Rendre un enseignant indisponible à un créneau (sans effet s'il n'enseigne pas ici)."""
+        if lecturer in self.lecturer_ids:
+            self.blocked_lecturer_slots.add((self.lecturer_ids[lecturer], slot))
+    
+    def _room_domain(self, subject_id):
+        """Identifiants des salles candidates pour une matière."""
+        return self.room_domains[subject_id]
+    
+    def build_indexed_model(self, with_names=False):
+        """Construire le modèle à partir d'identifiants entiers et d'une table plate de variables.
+        
+        Seules les combinaisons (matière, salle candidate, créneau) reçoivent une
+        variable, et les contraintes sont posées sur les listes d'index de la table
+        avec les contraintes natives AddAtMostOne. Les noms de variables, coûteux à
+        formater, ne sont générés que si with_names est vrai.
+        """
+        model = cp_model.CpModel()
+        table = self._joint_table(model, with_names)
+        self._add_table_constraints(model, table)
+        return model, table
+    
+    def _joint_table(self, model, with_names=False, subject_ids=None):
+        """Créer dans model les variables (matière, salle candidate, créneau) et leur table.
+        
+        Si subject_ids est donné, seules ces matières reçoivent des variables.
+        """
+        table = VariableTable(
+            len(self.subjects), len(self.classes), len(self.lecturers),
+            len(self.rooms), self.n_slots
+        )
+        
+        # Variables de décision: une par (matière, salle, créneau)
+        for s_id in (range(len(self.subjects)) if subject_ids is None else subject_ids):
+            s = self.subjects[s_id]
+            c_id = self.subject_class[s_id]
+            l_id = self.subject_lecturer[s_id]
+            for r_id in self._room_domain(s_id):
+                for t in range(self.n_slots):
+                    if (r_id, t) in self.blocked_room_slots or (l_id, t) in self.blocked_lecturer_slots:
+                        continue
+                    name = f'x_{s["class"]}_{s["code"]}_{self.rooms[r_id]["num"]}_{t}' if with_names else ''
+                    table.add(model.NewBoolVar(name), s_id, r_id, t, c_id, l_id)
+        return table
+    
+    def build_slot_model(self, with_names=False):
+        """Construire le modèle de la première phase: affectation des créneaux sans les salles.
+        
+        Une variable par (matière, créneau); les salles n'interviennent que par des
+        bornes par créneau: pas plus de cours simultanés que de salles utilisables,
+        y compris pour chaque ensemble de salles candidates partagé par des cours.
+        """
+        model = cp_model.CpModel()
+        table = VariableTable(
+            len(self.subjects), len(self.classes), len(self.lecturers), 0, self.n_slots
+        )
+        
+        for s_id, s in enumerate(self.subjects):
+            if not self._room_domain(s_id):
+                continue
+            c_id = self.subject_class[s_id]
+            l_id = self.subject_lecturer[s_id]
+            for t in range(self.n_slots):
+                name = f'y_{s["class"]}_{s["code"]}_{t}' if with_names else ''
+                table.add(model.NewBoolVar(name), s_id, -1, t, c_id, l_id)
+        
+        self._add_table_constraints(model, table)
+        
+        # Bornes par créneau (conditions de Hall): les cours dont toutes les salles
+        # candidates appartiennent à un ensemble D ne peuvent être plus de |D|
+        domain_sets = {frozenset(d) for d in self.room_domains if d}
+        domain_sets.add(frozenset(r_id for d in self.room_domains for r_id in d))
+        for rooms in domain_sets:
+            members = [
+                s_id for s_id, d in enumerate(self.room_domains)
+                if d and rooms.issuperset(d)
+            ]
+            # Les variables d'une matière sont créées dans l'ordre des créneaux
+            for t in range(self.n_slots):
+                available = sum(1 for r_id in rooms if (r_id, t) not in self.blocked_room_slots)
+                if len(members) > available:
+                    model.Add(sum(table.literals[table.by_subject[s_id][t]] for s_id in members) <= available)
+        
+        return model, table
+    
+    def _cached_build(self, builder, use_cache=True):
+        """Construire un modèle via le cache disque (voir cache_modele.ModelCache).
+        
+        builder est le nom de la méthode de construction ('build_indexed_model' ou
+        'build_slot_model'). Avec use_cache=False, le modèle est toujours reconstruit.
+        """
+        with instrumentation.phase('construction_modele'):
+            return self._cached_build_timed(builder, use_cache)
+    
+    def _cached_build_timed(self, builder, use_cache):
+        start = time.perf_counter()
+        if not use_cache:
+            return self._record_build(builder, *getattr(self, builder)(), start)
+        
+        cache = ModelCache()
+        key = cache.key(self, builder)
+        entry = cache.load(key)
+        if entry is None:
+            model, table = getattr(self, builder)()
+            self._record_build(builder, model, table, start)
+            cache.store(key, model, table)
+            return model, table
+        
+        print("Modèle chargé depuis le cache")
+        model = cp_model.CpModel()
+        model.Proto().parse_text_format(entry['model'])
+        table = VariableTable(
+            len(self.subjects), len(self.classes), len(self.lecturers),
+            len(self.rooms) if builder == 'build_indexed_model' else 0, self.n_slots
+        )
+        # Les variables ont été créées dans l'ordre de la table: k est aussi leur index dans le modèle
+        for k, (s_id, r_id, t) in enumerate(zip(entry['subject'], entry['room'], entry['slot'])):
+            table.add(
+                model.GetBoolVarFromProtoIndex(k), s_id, r_id, t,
+                self.subject_class[s_id], self.subject_lecturer[s_id]
+            )
+        return self._record_build(builder, model, table, start)
+    
+    def _record_build(self, builder, model, table, start):
+        """Enregistrer le temps de construction et la taille d'un modèle."""
+        self.stats[builder] = {
+            'build_time': time.perf_counter() - start,
+            'variables': len(table),
+            'constraints': len(model.Proto().constraints),
+        }
+        return model, table
+    
+    def _add_table_constraints(self, model, table):
+        """Poser les contraintes de non-conflit et l'objectif sur une table de variables."""
+        literals = table.literals
+        
+        def at_most_one(indexes):
+            if len(indexes) > 1:
+                model.AddAtMostOne([literals[k] for k in indexes])
+        
+        # Contrainte 1: une classe a au plus un cours par créneau
+        for per_slot in table.by_class_slot:
+            for indexes in per_slot:
+                at_most_one(indexes)
+        
+        # Contrainte 2: chaque séance est programmée au plus une fois par semaine
+        for indexes in table.by_subject:
+            at_most_one(indexes)
+        
+        # Contrainte 3: un enseignant donne au plus un cours par créneau, aucun s'il est indisponible
+        for per_slot in table.by_lecturer_slot:
+            for indexes in per_slot:
+                at_most_one(indexes)
+        for l_id, t in self.blocked_lecturer_slots:
+            indexes = table.by_lecturer_slot[l_id][t]
+            if indexes:
+                model.AddBoolAnd([literals[k].Not() for k in indexes])
+        
+        # Contrainte 4: une salle accueille au plus un cours par créneau
+        for per_slot in table.by_room_slot:
+            for indexes in per_slot:
+                at_most_one(indexes)
+        
+        # Contrainte 5: au plus une séance d'une même matière par jour
+        n_periods = len(self.periods)
+        for members in self.session_groups:
+            by_day = defaultdict(list)
+            for s_id in members:
+                for k in table.by_subject[s_id]:
+                    by_day[table.slot[k] // n_periods].append(k)
+            for indexes in by_day.values():
+                at_most_one(indexes)
+            self._break_session_symmetry(model, table, members)
+        
+        # Fonction objectif: le poids d'une variable ne dépend que de sa période
+        weights = [self.period_weights[t % n_periods] for t in table.slot]
+        if literals:
+            model.Maximize(cp_model.LinearExpr.WeightedSum(literals, weights))
+    
+    def _break_session_symmetry(self, model, table, members):
+        """Ordonner les séances interchangeables d'une matière (même type, enseignant et salles).
+        
+        La séance i + 1 n'est programmée que si la séance i l'est, et à un créneau
+        postérieur: les permutations d'une même solution sont éliminées.
+        """
+        literals = table.literals
+        for previous, current in zip(members, members[1:]):
+            a, b = self.subjects[previous], self.subjects[current]
+            if (a['session_kind'], a['lecturer'], a['kind']) != (b['session_kind'], b['lecturer'], b['kind']):
+                continue
+            previous_vars = [literals[k] for k in table.by_subject[previous]]
+            current_vars = [literals[k] for k in table.by_subject[current]]
+            if not previous_vars or not current_vars:
+                continue
+            model.Add(sum(current_vars) <= sum(previous_vars))
+            # créneau(courante) >= créneau(précédente) + 1 si la séance courante est programmée:
+            # sum((t - n_slots - 1) x_courante) - sum(t x_précédente) >= -n_slots
+            model.Add(cp_model.LinearExpr.WeightedSum(
+                current_vars + previous_vars,
+                [table.slot[k] - self.n_slots - 1 for k in table.by_subject[current]]
+                + [-table.slot[k] for k in table.by_subject[previous]]
+            ) >= -self.n_slots)
+    
+    def _assign_rooms(self, slot_placements, previous_placements=()):
+        """Deuxième phase: affecter une salle à chaque cours, créneau par créneau.
+        
+        slot_placements associe à chaque créneau la liste des matières qui y sont
+        programmées. Pour chaque créneau, on cherche un couplage parfait
+        matières -> salles candidates par chemins augmentants, en essayant d'abord
+        la salle de la solution précédente si elle est connue. Retourne la liste
+        des triplets (matière, salle, créneau), ou None si un créneau n'admet pas
+        de couplage.
+        """
+        previous_room = {s_id: r_id for s_id, r_id, _ in previous_placements}
+        
+        def candidates(s_id, t):
+            domain = [r_id for r_id in self._room_domain(s_id) if (r_id, t) not in self.blocked_room_slots]
+            if s_id in previous_room and previous_room[s_id] in domain:
+                return [previous_room[s_id]] + [r_id for r_id in domain if r_id != previous_room[s_id]]
+            return domain
+        
+        placements = []
+        for t, subject_ids in slot_placements.items():
+            room_owner = {}
             
-            for level, level_data in data['niveau'].items():
-                for semester, semester_data in level_data.items():
-                    class_name = f"INFO{level}{semester}"
-                    classes.add(class_name)
-                    
-                    for subject in semester_data.get('subjects', []):
-                        subject_name = subject.get('name', '')
-                        if isinstance(subject_name, list):
-                            subject_name = next((name for name in subject_name if name), "")
-                        
-                        if subject_name:  # Ignorer les cours sans nom
-                            course_lecturer = subject.get('Course Lecturer', ["", ""])
-                            assistant_lecturer = subject.get('Assitant lecturer', ["", ""])
-                            
-                            if not isinstance(course_lecturer, list):
-                                course_lecturer = [course_lecturer, ""]
-                            if not isinstance(assistant_lecturer, list):
-                                assistant_lecturer = [assistant_lecturer, ""]
-                            
-                            subjects.append({
-                                'name': subject_name,
-                                'code': subject.get('code', ''),
-                                'credits': subject.get('credit', 0),
-                                'class': class_name,
-                                'lecturer': course_lecturer[0] if course_lecturer else "",
-                                'assistant': assistant_lecturer[0] if assistant_lecturer else ""
-                            })
+            def augment(s_id, visited):
+                for r_id in candidates(s_id, t):
+                    if r_id in visited:
+                        continue
+                    visited.add(r_id)
+                    if r_id not in room_owner or augment(room_owner[r_id], visited):
+                        room_owner[r_id] = s_id
+                        return True
+                return False
             
-            return subjects, list(classes)
-        except Exception as e:
-            print(f"Erreur lors du chargement des matières: {str(e)}")
-            return [], []
+            for s_id in subject_ids:
+                if not augment(s_id, set()):
+                    return None
+            placements.extend((s_id, r_id, t) for r_id, s_id in room_owner.items())
+        return placements
     
     def build_model(self):
         """Construire le modèle de programmation par contraintes."""
         model = cp_model.CpModel()
-    
+        
         
         # Variables de décision
         # x[c][s][r][p][d] = 1 si la classe c suit le sujet s dans la salle r à la période p le jour d
@@ -215,107 +603,425 @@ class TimetableGenerator:
         
         return model, x
     
-    def solve(self):
-        """Résoudre le modèle d'emploi du temps."""
-        model, x = self.build_model()
-        
+    def _new_solver(self):
+        """Créer un solveur CP-SAT configuré."""
         solver = cp_model.CpSolver()
         
         # Paramètres du solveur pour améliorer les chances de trouver une solution
-        solver.parameters.max_time_in_seconds = 300  # 5 minutes maximum
-        solver.parameters.num_search_workers = 8  # Utiliser plus de threads
-        solver.parameters.log_search_progress = True  # Activer les logs
+        solver.parameters.max_time_in_seconds = self.time_limit
+        solver.parameters.num_search_workers = self.num_workers
+        apply_parameters(solver, self.solver_parameters)
+        solver.parameters.log_search_progress = self.log_search
+        if self.gap_limit is not None:
+            solver.parameters.relative_gap_limit = self.gap_limit
+        return solver
+    
+    def _run_solver(self, model, phase, decode=None):
+        """Résoudre un modèle et enregistrer les mesures de la recherche dans self.stats.
+        
+        decode(callback) doit renvoyer les placements (matière, salle, créneau) de
+        la solution courante du callback, ou None; il sert à écrire chaque solution
+        améliorante dans self.anytime_file.
+        """
+        solver = self._new_solver()
+        listener = self._anytime_listener(decode) if self.anytime_file and decode else None
+        progress = SolutionProgress(listener)
+        log = instrumentation.SolverLogCapture(echo=self.log_search)
+        log.attach(solver)
+        
+        watchdog = None
+        if self.stall_time:
+            stop = threading.Event()
+            watchdog = threading.Thread(target=self._watch_stall, args=(solver, progress, stop), daemon=True)
+            watchdog.start()
+        try:
+            status = solver.Solve(model, progress)
+        finally:
+            if watchdog:
+                stop.set()
+                watchdog.join()
+        
+        found = status == cp_model.OPTIMAL or status == cp_model.FEASIBLE
+        self.stats[phase] = {
+            'status': solver.StatusName(status),
+            'solve_time': solver.WallTime(),
+            'user_time': solver.UserTime(),
+            'presolve_time': log.presolve_time,
+            'first_solution_time': progress.history[0][0] if progress.history else None,
+            'objective': solver.ObjectiveValue() if found else None,
+            'best_bound': solver.BestObjectiveBound() if found else None,
+            'conflicts': solver.NumConflicts(),
+            'branches': solver.NumBranches(),
+            'deterministic_time': solver.ResponseProto().deterministic_time,
+            # (temps, objectif, borne) à chaque solution et (temps, borne) à chaque amélioration de la borne
+            'progress': progress.history,
+            'bound_progress': log.bounds,
+        }
+        instrumentation.get_report().record_solver(phase, self.stats[phase])
+        return solver, status
+    
+    def _watch_stall(self, solver, progress, stop):
+        """Arrêter la recherche après self.stall_time secondes sans nouvelle solution."""
+        while not stop.wait(0.1):
+            if progress.last_improvement and time.perf_counter() - progress.last_improvement > self.stall_time:
+                print(f"Aucune amélioration depuis {self.stall_time} s, arrêt de la recherche")
+                solver.StopSearch()
+                return
+    
+    def _anytime_listener(self, decode):
+        """Écrire chaque solution améliorante dans self.anytime_file avec son numéro et son temps."""
+        def write(callback):
+            placements = decode(callback)
+            if placements is None:
+                return
+            solution = self._solution_dict('intermediate', self._placement_objective(placements), placements)
+            solution['sequence'] = len(callback.history)
+            solution['elapsed'] = callback.history[-1][0]
+            _write_json_atomic(solution, self.anytime_file)
+        return write
+    
+    def _store_solution(self, status, objective_value, placements):
+        """Stocker la solution à partir de triplets (matière, salle, créneau)."""
+        self.solution = self._solution_dict(
+            'optimal' if status == cp_model.OPTIMAL else 'feasible', objective_value, placements
+        )
+        if self.anytime_file:
+            _write_json_atomic(self.solution, self.anytime_file)
+    
+    def _solution_dict(self, status, objective_value, placements):
+        """Construire le dictionnaire de solution à partir de triplets (matière, salle, créneau)."""
+        solution = {
+            'status': status,
+            'objective_value': objective_value,
+            'assignments': []
+        }
+        
+        n_periods = len(self.periods)
+        for s_id, r_id, t in placements:
+            s = self.subjects[s_id]
+            solution['assignments'].append({
+                'class': s['class'],
+                'subject_code': s['code'],
+                'subject_name': s['name'],
+                'room': self.rooms[r_id]['num'],
+                'period': t % n_periods,
+                'day': t // n_periods,
+                'lecturer': s['lecturer'],
+                'session': s.get('session', '')
+            })
+        return solution
+    
+    def load_previous_placements(self, solution_file):
+        """Lire une solution précédente (JSON ou .edtb) en triplets (matière, salle, créneau).
+        
+        solution_file peut aussi être directement un dictionnaire de solution.
+        Les affectations dont la classe, la matière ou la salle n'existent plus
+        dans les données actuelles sont ignorées.
+        """
+        if isinstance(solution_file, dict):
+            previous = solution_file
+        else:
+            previous = read_solution(solution_file)
+        
+        # Séance retrouvée par (classe, code, séance), sinon par (classe, code): les ids sont consommés dans l'ordre
+        session_ids = defaultdict(list)
+        subject_ids = defaultdict(list)
+        for s_id, s in enumerate(self.subjects):
+            session_ids[(s['class'], s['code'], s.get('session', ''))].append(s_id)
+            subject_ids[(s['class'], s['code'])].append(s_id)
+        room_ids = {r['num']: r_id for r_id, r in enumerate(self.rooms)}
+        
+        placements = []
+        used = set()
+        for a in previous.get('assignments', []):
+            if a['room'] not in room_ids:
+                continue
+            candidates = session_ids.get((a['class'], a['subject_code'], a.get('session', '')), [])
+            s_id = next((i for i in candidates if i not in used), None)
+            if s_id is None:
+                s_id = next((i for i in subject_ids.get((a['class'], a['subject_code']), []) if i not in used), None)
+            if s_id is not None:
+                used.add(s_id)
+                placements.append((s_id, room_ids[a['room']], self.slot_of(a['period'], a['day'])))
+        return placements
+    
+    def _previous_literals(self, table, placements):
+        """Index dans la table des variables correspondant à des placements précédents."""
+        # Dans le modèle des créneaux (sans salles), seule la paire (matière, créneau) compte
+        slot_only = not table.by_room_slot
+        wanted = {(s_id, -1 if slot_only else r_id, t) for s_id, r_id, t in placements}
+        found = []
+        for s_id in {p[0] for p in placements}:
+            for k in table.by_subject[s_id]:
+                if (s_id, table.room[k], table.slot[k]) in wanted:
+                    found.append(k)
+        return found
+    
+    def _add_hints(self, model, table, placements):
+        """Transmettre une solution précédente au solveur comme point de départ."""
+        previous = set(self._previous_literals(table, placements))
+        for k, literal in enumerate(table.literals):
+            model.AddHint(literal, k in previous)
+    
+    def _add_repair_objective(self, model, table, placements):
+        """Remplacer l'objectif par une réparation à perturbation minimale.
         
-        status = solver.Solve(model)
+        Ordre lexicographique: programmer le plus de cours possible, puis conserver
+        le plus d'affectations précédentes, puis favoriser les périodes du matin.
+        """
+        kept = [table.literals[k] for k in self._previous_literals(table, placements)]
+        n_periods = len(self.periods)
+        weights = [self.period_weights[t % n_periods] for t in table.slot]
+        
+        keep_weight = max(self.period_weights) * len(self.subjects) + 1
+        schedule_weight = keep_weight * (len(kept) + 1)
+        model.Maximize(
+            schedule_weight * sum(table.literals)
+            + keep_weight * sum(kept)
+            + cp_model.LinearExpr.WeightedSum(table.literals, weights)
+        )
+    
+    def _placement_objective(self, placements):
+        """Valeur de l'objectif des périodes pour une liste de placements."""
+        n_periods = len(self.periods)
+        return sum(self.period_weights[t % n_periods] for _, _, t in placements)
+    
+    def solve(self, mode='joint', previous_solution=None, repair=False, use_cache=True,
+              time_limit=None, num_workers=None, anytime_file=None, gap_limit=None, stall_time=None,
+              check_feasibility=True, strict_feasibility=False):
+        """Résoudre le modèle d'emploi du temps.
+        
+        mode='joint' résout le modèle complet (matière, salle, créneau).
+        mode='two_phase' affecte d'abord les créneaux puis les salles par couplage,
+        et revient au modèle complet si l'affectation des salles échoue.
+        mode='decomposed' résout en parallèle les composantes indépendantes du
+        graphe de conflits (voir decomposition.py), puis le modèle complet si
+        l'une d'elles échoue.
+        mode='lns' part d'un emploi du temps glouton (ou de la solution
+        précédente) et réoptimise des voisinages en parallèle (voir
+        recherche_lns.py), sans jamais construire le modèle complet.
+        
+        previous_solution est le chemin d'une solution précédente (par exemple
+        output/timetable_solution.json), ou la solution elle-même, utilisée comme
+        point de départ du solveur.
+        Avec repair=True, le modèle complet minimise en plus le nombre
+        d'affectations modifiées par rapport à cette solution.
+        
+        Les modèles construits sont conservés dans un cache disque indexé par le
+        contenu des données; use_cache=False force leur reconstruction.
+        
+        time_limit (secondes) et num_workers remplacent les valeurs par défaut
+        (300 s, 8 threads). Si self.solver_profile contient un réglage pour cette
+        machine, cette taille d'instance et ce mode (voir reglage_solveur.py), ses
+        paramètres sont appliqués, sauf le nombre de threads si num_workers est
+        donné. En mode « anytime », chaque solution améliorante est
+        écrite atomiquement dans anytime_file avec son numéro, son objectif et le
+        temps écoulé; la recherche s'arrête dès que l'écart relatif à la borne
+        passe sous gap_limit ou après stall_time secondes sans amélioration.
+        
+        Une analyse de faisabilité (quelques millisecondes) est faite d'abord
+        (sauf check_feasibility=False) et ses dépassements de capacité sont
+        signalés. Chaque cours étant programmé au plus une fois, la résolution
+        est lancée quand même et laisse de côté les cours qui ne tiennent pas;
+        avec strict_feasibility=True, elle est annulée en cas de dépassement.
+        """
+        for name, value in (('time_limit', time_limit), ('num_workers', num_workers),
+                            ('anytime_file', anytime_file), ('gap_limit', gap_limit),
+                            ('stall_time', stall_time)):
+            if value is not None:
+                setattr(self, name, value)
+        if self.solver_profile:
+            self.solver_parameters = profile_parameters(self, mode, self.solver_profile)
+            if num_workers is not None:
+                self.solver_parameters.pop('num_search_workers', None)
+            if self.solver_parameters:
+                print(f"Réglage du solveur: {', '.join(f'{k}={v}' for k, v in self.solver_parameters.items())}")
+        self.stats = {}
+        if check_feasibility:
+            with instrumentation.phase('analyse_faisabilite'):
+                report = analyze(self)
+            report.print()
+            self.stats['feasibility'] = report.to_dict()
+            if not report.feasible:
+                if strict_feasibility:
+                    print("Résolution annulée: corrigez les données ou relancez sans vérification stricte")
+                    return False
+                print("Résolution lancée quand même: des cours resteront non programmés")
+        placements = self.load_previous_placements(previous_solution) if previous_solution else []
+        if repair and not previous_solution:
+            raise ValueError("Le mode réparation nécessite une solution précédente")
+        
+        if mode == 'lns' and not repair:
+            from recherche_lns import solve_lns
+            return solve_lns(self, placements)
+        if mode == 'decomposed' and not repair:
+            from decomposition import solve_decomposed
+            if solve_decomposed(self, placements=placements):
+                return True
+            print("Résolution décomposée impossible, résolution du modèle complet...")
+        elif mode == 'two_phase' and not repair:
+            if self._solve_two_phase(placements, use_cache):
+                return True
+            print("Affectation des salles impossible, résolution du modèle complet...")
+        elif mode not in ('joint', 'two_phase', 'decomposed', 'lns'):
+            raise ValueError(f"Mode de résolution inconnu: {mode}")
+        
+        model, table = self._cached_build('build_indexed_model', use_cache)
+        if placements:
+            self._add_hints(model, table, placements)
+        if repair:
+            self._add_repair_objective(model, table, placements)
+        solver, status = self._run_solver(
+            model, 'solve', lambda callback: self._decode_joint(table, true_indices(table, callback.Response()))
+        )
         
         if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
             print(f"Solution {'optimale' if status == cp_model.OPTIMAL else 'faisable'} trouvée!")
             
-            # Stocker la solution
-            self.solution = {
-                'status': 'optimal' if status == cp_model.OPTIMAL else 'feasible',
-                'objective_value': solver.ObjectiveValue(),
-                'assignments': []
-            }
-            
             # Extraire les affectations
-            for c in self.classes:
-                subjects_for_class = [s for s in self.subjects if s['class'] == c]
-                
-                for s in subjects_for_class:
-                    for r in self.rooms:
-                        for p in range(len(self.periods)):
-                            for d in range(len(self.days)):
-                                if (s['code'] in x[c] and r['num'] in x[c][s['code']] and 
-                                    p in x[c][s['code']][r['num']] and d in x[c][s['code']][r['num']][p] and
-                                    solver.Value(x[c][s['code']][r['num']][p][d]) == 1):
-                                    
-                                    self.solution['assignments'].append({
-                                        'class': c,
-                                        'subject_code': s['code'],
-                                        'subject_name': s['name'],
-                                        'room': r['num'],
-                                        'period': p,
-                                        'day': d,
-                                        'lecturer': s['lecturer']
-                                    })
-            
+            with instrumentation.phase('extraction'):
+                solution_placements = self._decode_joint(table, true_indices(table, solver.ResponseProto()))
+                self._store_solution(status, self._placement_objective(solution_placements), solution_placements)
+            if placements:
+                changed = len(set(placements) - set(solution_placements))
+                print(f"Affectations modifiées par rapport à la solution précédente: {changed}/{len(placements)}")
             return True
         else:
             print(f"Aucune solution trouvée! Status: {status}")
             return False
     
+    def _solve_two_phase(self, previous_placements=(), use_cache=True):
+        """Résoudre en deux phases: créneaux d'abord, salles ensuite."""
+        model, table = self._cached_build('build_slot_model', use_cache)
+        if previous_placements:
+            self._add_hints(model, table, previous_placements)
+        solver, status = self._run_solver(
+            model, 'solve_slots',
+            lambda callback: self._assign_rooms(
+                self._decode_slots(table, true_indices(table, callback.Response())), previous_placements
+            )
+        )
+        
+        if status != cp_model.OPTIMAL and status != cp_model.FEASIBLE:
+            print(f"Phase 1 (créneaux): aucune solution! Status: {status}")
+            return False
+        
+        with instrumentation.phase('extraction'):
+            slot_placements = self._decode_slots(table, true_indices(table, solver.ResponseProto()))
+        
+        start = time.perf_counter()
+        with instrumentation.phase('affectation_salles'):
+            placements = self._assign_rooms(slot_placements, previous_placements)
+        self.stats['room_matching'] = {'time': time.perf_counter() - start, 'success': placements is not None}
+        if placements is None:
+            return False
+        
+        print(f"Solution {'optimale' if status == cp_model.OPTIMAL else 'faisable'} trouvée en deux phases!")
+        self._store_solution(status, solver.ObjectiveValue(), placements)
+        return True
+    
+    def _decode_joint(self, table, indices):
+        """Placements (matière, salle, créneau) des variables vraies du modèle complet."""
+        return [(table.subject[k], table.room[k], table.slot[k]) for k in indices]
+    
+    def _decode_slots(self, table, indices):
+        """Matières programmées à chaque créneau dans le modèle des créneaux."""
+        slot_placements = defaultdict(list)
+        for k in indices:
+            slot_placements[table.slot[k]].append(table.subject[k])
+        return slot_placements
+    
     def generate_timetable(self):
         """Générer l'emploi du temps sous forme de tableau."""
         if not self.solution:
             print("Veuillez d'abord résoudre le modèle!")
             return None
         
-        # Créer un emploi du temps vide pour chaque classe
-        timetables = {}
-        
-        for c in self.classes:
-            # Créer un DataFrame vide
-            timetable = pd.DataFrame(
-                index=self.periods,
-                columns=self.days
-            )
-            timetables[c] = timetable
-        
-        # Remplir les emplois du temps avec les affectations
-        for assignment in self.solution['assignments']:
-            cls = assignment['class']
-            day = self.days[assignment['day']]
-            period = self.periods[assignment['period']]
-            
-            cell_content = (
-                f"{assignment['subject_code']} - {assignment['subject_name']}\n"
-                f"Salle: {assignment['room']}\n"
-                f"Prof: {assignment['lecturer']}"
-            )
-            
-            timetables[cls].at[period, day] = cell_content
-        
-        self.timetable = timetables
-        return timetables
+        with instrumentation.phase('generation_tableaux'):
+            self.timetable = build_timetables(self.solution['assignments'], self.classes, self.days, self.periods)
+        return self.timetable
     
-    def save_timetables(self, output_dir):
-        """Sauvegarder les emplois du temps au format Excel."""
-        if not self.timetable:
-            print("Veuillez d'abord générer l'emploi du temps!")
-            return
-        
-        # Créer un fichier Excel avec une feuille par classe
-        os.makedirs(output_dir, exist_ok=True)
-        with pd.ExcelWriter(f"{output_dir}/emplois_du_temps.xlsx") as writer:
-            for cls, timetable in self.timetable.items():
-                timetable.to_excel(writer, sheet_name=cls)
+    def save_timetables(self, output_dir, formats=('excel',)):
+        """Sauvegarder les emplois du temps (Excel par défaut) directement depuis la solution."""
+        if not self.solution:
+            print("Veuillez d'abord résoudre le modèle!")
+            return []
         
-        print(f"Emplois du temps sauvegardés dans {output_dir}/emplois_du_temps.xlsx")
+        return export_solution(self.solution['assignments'], output_dir, formats, classes=self.classes)
+
+
+def true_indices(table, response):
+    """Index k des variables vraies de la table, lus en une fois dans la réponse du solveur.
+    
+    Le vecteur solution est copié en bloc (sans appel Python par variable) puis
+    filtré par numpy: seules les variables vraies sont ensuite décodées.
+    """
+    import numpy as np
+    
+    values = np.frombuffer(array('q', response.solution), dtype=np.int64)
+    return np.flatnonzero(values[:len(table)]).tolist()
+
+
+def build_timetables(assignments, classes, days, periods):
+    """Construire un DataFrame (périodes x jours) par classe à partir des affectations."""
+    import pandas as pd
+    
+    by_class = group_assignments(assignments, 'class')
+    timetables = {}
+    for c in classes:
+        rows = grid_rows(by_class.get(c, ()), class_cell, days, periods)
+        timetables[c] = pd.DataFrame([row[1:] for row in rows], index=periods, columns=days)
+    return timetables
+
+
+def _measure_builder(rooms_file, subjects_file, builder, queue):
+    """Mesurer dans un processus dédié la construction d'un modèle (temps, taille, RSS max)."""
+    import resource
+    generator = TimetableGenerator(rooms_file, subjects_file)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    model, _ = getattr(generator, builder)()
+    elapsed = time.perf_counter() - start
+    proto = model.Proto()
+    queue.put({
+        'builder': builder,
+        'build_time': elapsed,
+        'variables': len(proto.variables),
+        'constraints': len(proto.constraints),
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'rss_growth_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    })
+
+
+def compare_builders(rooms_file, subjects_file, builders=('build_model', 'build_indexed_model')):
+    """Comparer le temps de construction et la mémoire des constructeurs de modèle.
+    
+    Chaque constructeur est exécuté dans un processus neuf pour que le pic de
+    mémoire résidente mesuré ne dépende pas des exécutions précédentes.
+    """
+    import multiprocessing
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for builder in builders:
+        queue = ctx.Queue()
+        process = ctx.Process(target=_measure_builder, args=(rooms_file, subjects_file, builder, queue))
+        process.start()
+        results.append(queue.get())
+        process.join()
+    
+    print(f"\n{'Constructeur':<22}{'Temps (s)':>11}{'Variables':>11}{'Contraintes':>13}{'RSS max (Mo)':>14}{'Croissance (Mo)':>17}")
+    for r in results:
+        print(f"{r['builder']:<22}{r['build_time']:>11.3f}{r['variables']:>11}{r['constraints']:>13}"
+              f"{r['peak_rss_kb'] / 1024:>14.1f}{r['rss_growth_kb'] / 1024:>17.1f}")
+    return results
 
 
 # Programme principal pour tester la génération
 if __name__ == "__main__":
+    if '--comparer' in sys.argv:
+        compare_builders('rooms.json', 'subjects.json')
+        sys.exit(0)
+    
     # Initialiser le générateur
     generator = TimetableGenerator('rooms.json', 'subjects.json')
     
@@ -0,0 +1,131 @@
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+
+# Lignes de progression du journal CP-SAT, par exemple "#Bound  10.10s best:182 next:[183,23393] ..."
+_PROGRESS_LINE = re.compile(r'^#(\w+)\s+([\d.]+)s(?:\s+best:(\S+))?(?:\s+next:\[([^\]]*)\])?')
+
+
+class RunReport:
+    """Rapport d'exécution: durée de chaque phase et statistiques du solveur.
+    
+    Les phases portant le même nom (par exemple le rendu PNG de chaque classe)
+    sont cumulées. Si un répertoire de profils est fourni, chaque phase Python
+    est aussi profilée avec cProfile et ses statistiques écrites dans
+    <profile_dir>/<phase>.prof.
+    """
+    
+    def __init__(self, profile_dir=None):
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.solver = {}
+        self.profile_dir = profile_dir
+        self._profiling = False
+    
+    @contextmanager
+    def phase(self, name):
+        """Chronométrer (et éventuellement profiler) un bloc de code."""
+        # Un seul profileur à la fois: les phases imbriquées sont profilées avec la phase englobante
+        profiler = None
+        if self.profile_dir and not self._profiling:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+            self._profiling = True
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+            if profiler:
+                profiler.disable()
+                self._profiling = False
+                os.makedirs(self.profile_dir, exist_ok=True)
+                profiler.dump_stats(os.path.join(self.profile_dir, f"{name}.prof"))
+    
+    def add_phase(self, name, duration):
+        """Ajouter une durée mesurée par ailleurs (par exemple le presolve du solveur)."""
+        entry = self.phases.setdefault(name, {'time': 0.0, 'count': 0})
+        entry['time'] += duration
+        entry['count'] += 1
+    
+    def record_solver(self, name, stats):
+        """Enregistrer les statistiques d'une résolution et ses phases presolve/recherche."""
+        self.solver[name] = stats
+        if stats.get('presolve_time') is not None:
+            self.add_phase('presolve', stats['presolve_time'])
+            self.add_phase('recherche', max(0.0, stats['solve_time'] - stats['presolve_time']))
+        else:
+            self.add_phase('recherche', stats['solve_time'])
+    
+    def to_dict(self):
+        return {
+            'total_time': time.perf_counter() - self.start,
+            'phases': self.phases,
+            'solver': self.solver,
+        }
+    
+    def write(self, filename):
+        """Écrire le rapport au format JSON."""
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        with open(filename, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False, indent=2)
+        print(f"Rapport d'exécution sauvegardé dans {filename}")
+
+
+class SolverLogCapture:
+    """Capturer le journal de CP-SAT pour en extraire la fin du presolve et l'évolution de la borne.
+    
+    Le journal est toujours activé pour être capturé; il n'est affiché sur la
+    sortie standard que si echo est vrai.
+    """
+    
+    def __init__(self, echo=False):
+        self.echo = echo
+        self.presolve_time = None
+        self.bounds = []
+    
+    def attach(self, solver):
+        solver.parameters.log_search_progress = True
+        solver.parameters.log_to_stdout = False
+        solver.log_callback = self._on_line
+    
+    def _on_line(self, line):
+        if self.echo:
+            print(line)
+        match = _PROGRESS_LINE.match(line)
+        if not match:
+            return
+        elapsed = float(match.group(2))
+        # La première ligne de progression marque la fin du presolve
+        if self.presolve_time is None:
+            self.presolve_time = elapsed
+        # Intervalle [min, max] restant pour l'objectif: la borne est le max (maximisation)
+        if match.group(1) == 'Bound' and match.group(4):
+            interval = match.group(4).split(',')
+            try:
+                self.bounds.append((elapsed, float(interval[-1])))
+            except ValueError:
+                pass
+
+
+_current = RunReport()
+
+
+def start_report(profile_dir=None):
+    """Démarrer un nouveau rapport d'exécution global."""
+    global _current
+    _current = RunReport(profile_dir)
+    return _current
+
+
+def get_report():
+    """Rapport d'exécution global en cours."""
+    return _current
+
+
+def phase(name):
+    """Chronométrer un bloc de code dans le rapport global."""
+    return _current.phase(name)
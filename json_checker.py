@@ -1,101 +1,57 @@
-import json
+import sys
 
-def check_json_files():
+from analyse_faisabilite import CapacityView, analyze
+from donnees import DataError, load_dataset
+
+def check_json_files(rooms_file='rooms.json', subjects_file='subjects.json', department='Informatique'):
     """Vérifie et affiche les informations des fichiers JSON pour le débogage."""
     
+    # Lecture, validation et normalisation communes au générateur (voir donnees.py)
+    print(f"\n=== Vérification des fichiers {rooms_file} et {subjects_file} ===")
     try:
-        with open('rooms.json', 'r', encoding='utf-8') as file:
-            rooms_data = json.load(file)
-        
-        print("\n=== Vérification du fichier rooms.json ===")
-        if "Informatique" in rooms_data:
-            informatique_rooms = rooms_data["Informatique"]
-            print(f"Nombre de salles d'informatique: {len(informatique_rooms)}")
-            
-            print("Exemples de salles:")
-            for i, room in enumerate(informatique_rooms[:3]):
-                print(f"  {i+1}. Numéro: {room.get('num', 'N/A')}, Capacité: {room.get('capacite', 'N/A')}, Bâtiment: {room.get('batiment', 'N/A')}")
-        else:
-            print("ERREUR: Clé 'Informatique' manquante dans rooms.json")
-    except Exception as e:
-        print(f"ERREUR lors de la vérification de rooms.json: {str(e)}")
+        dataset = load_dataset(rooms_file, subjects_file, department)
+    except (OSError, DataError) as e:
+        print(f"ERREUR: {str(e)}")
+        return False
+    for warning in dataset.warnings:
+        print(f"Attention: {warning}")
     
-    try:
-        with open('subjects.json', 'r', encoding='utf-8') as file:
-            subjects_data = json.load(file)
-        
-        print("\n=== Vérification du fichier subjects.json ===")
-        if "niveau" in subjects_data:
-            niveaux = subjects_data["niveau"]
-            print(f"Nombre de niveaux: {len(niveaux)}")
-            
-            total_subjects = 0
-            for level, level_data in niveaux.items():
-                for semester, semester_data in level_data.items():
-                    if "subjects" in semester_data:
-                        total_subjects += len(semester_data["subjects"])
-            
-            print(f"Nombre total de matières: {total_subjects}")
-            
-            print("Exemples de matières par niveau:")
-            for level, level_data in niveaux.items():
-                for semester, semester_data in level_data.items():
-                    if "subjects" in semester_data and semester_data["subjects"]:
-                        subject = semester_data["subjects"][0]
-                        subject_name = subject.get("name", "N/A")
-                        if isinstance(subject_name, list):
-                            subject_name = ", ".join(filter(None, subject_name))
-                        print(f"  Niveau {level}, Semestre {semester}: {subject.get('code', 'N/A')} - {subject_name}")
-        else:
-            print("ERREUR: Clé 'niveau' manquante dans subjects.json")
-    except Exception as e:
-        print(f"ERREUR lors de la vérification de subjects.json: {str(e)}")
+    rooms = dataset.room_records()
+    print(f"Nombre de salles du département {department}: {len(rooms)}")
+    print("Exemples de salles:")
+    for i, room in enumerate(rooms[:3]):
+        print(f"  {i+1}. Numéro: {room['num']}, Capacité: {room['capacity']}, Bâtiment: {room['building']}")
+    
+    levels = sorted({dataset.pool[i] for i in dataset.classes.columns['level']})
+    print(f"Nombre de niveaux: {len(levels)}")
+    print(f"Nombre total de matières: {len(dataset.subjects_by_code)} ({len(dataset.subjects)} séances)")
+    
+    print("Exemples de matières par classe:")
+    subjects = dataset.subject_records()
+    for class_name in dataset.class_names():
+        subject_ids = dataset.subjects_by_class[dataset.class_ids[class_name]]
+        if subject_ids:
+            subject = subjects[subject_ids[0]]
+            print(f"  {class_name}: {subject['code']} - {subject['name']}")
     
     print("\n=== Analyse des contraintes potentielles ===")
     
-    classes = []
-    subjects_per_class = {}
-    all_lecturers = set()
+    total_periods = 5 * 6  # 5 périodes par jour, 6 jours
+    print(f"Nombre de classes: {len(dataset.class_ids)}")
+    print(f"Nombre de salles disponibles: {len(rooms)}")
+    print(f"Nombre total de créneaux horaires: {total_periods}")
+    print(f"Nombre d'enseignants uniques: {len(dataset.lecturers)}")
     
-    try:
-        if "niveau" in subjects_data:
-            for level, level_data in niveaux.items():
-                for semester, semester_data in level_data.items():
-                    class_name = f"INFO{level}{semester}"
-                    classes.append(class_name)
-                    
-                    if "subjects" in semester_data:
-                        subjects_per_class[class_name] = len(semester_data["subjects"])
-                        
-                        for subject in semester_data["subjects"]:
-                            if "Course Lecturer" in subject:
-                                lecturer = subject["Course Lecturer"]
-                                if isinstance(lecturer, list) and lecturer:
-                                    all_lecturers.add(lecturer[0])
-                                elif isinstance(lecturer, str):
-                                    all_lecturers.add(lecturer)
-        
-        total_rooms = len(informatique_rooms) if "Informatique" in rooms_data else 0
-        total_periods = 5 * 6  # 5 périodes par jour, 6 jours
-        
-        print(f"Nombre de classes: {len(classes)}")
-        print(f"Nombre de salles disponibles: {total_rooms}")
-        print(f"Nombre total de créneaux horaires: {total_periods}")
-        print(f"Nombre d'enseignants uniques: {len(all_lecturers)}")
-        
-        max_subjects = max(subjects_per_class.values()) if subjects_per_class else 0
-        print(f"Nombre maximum de matières par classe: {max_subjects}")
-        
-        if max_subjects > total_periods:
-            print("\nALERTE: Certaines classes ont plus de matières que de créneaux horaires disponibles!")
-            print("C'est une contrainte insoluble qui empêchera de trouver une solution valide.")
-        
-        if len(classes) * max_subjects > total_rooms * total_periods:
-            print("\nALERTE: Le nombre total de cours à programmer pourrait dépasser la capacité disponible.")
-            print("Cela pourrait rendre difficile ou impossible de trouver une solution.")
+    max_subjects = max((len(ids) for ids in dataset.subjects_by_class), default=0)
+    print(f"Nombre maximum de séances par classe: {max_subjects}")
     
-    except Exception as e:
-        print(f"ERREUR lors de l'analyse des contraintes: {str(e)}")
+    # Capacités exactes (classes, enseignants, salles) calculées sur les données normalisées
+    print("\n=== Analyse de faisabilité ===")
+    report = analyze(CapacityView.from_dataset(dataset))
+    report.print()
+    return report.feasible
 
 if __name__ == "__main__":
-    check_json_files()
\ No newline at end of file
+    rooms_file = sys.argv[1] if len(sys.argv) > 1 else 'rooms.json'
+    subjects_file = sys.argv[2] if len(sys.argv) > 2 else 'subjects.json'
+    sys.exit(0 if check_json_files(rooms_file, subjects_file) else 1)
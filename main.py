@@ -1,65 +1,343 @@
+import argparse
+import importlib
 import os
-import json
-from timetable_generator import TimetableGenerator
-from timetable_visualizer import TimetableVisualizer
+import sys
+import time
 
-def main():
-    """Programme principal pour générer et visualiser les emplois du temps."""
-    print("=== Générateur d'Emploi du Temps - Université de Yaoundé I ===")
-    print("Chargement des données...")
-    
-    if not os.path.exists('rooms.json') or not os.path.exists('subjects.json'):
-        print("Erreur: Les fichiers de données 'rooms.json' et 'subjects.json' doivent être dans le répertoire courant.")
-        return
-    
-    output_dir = 'output'
-    os.makedirs(output_dir, exist_ok=True)
+import instrumentation
+
+# Début du programme: sert à mesurer le temps de démarrage de chaque sous-commande
+_START = time.perf_counter()
+
+# Bibliothèques lourdes dont le chargement est signalé par --temps
+HEAVY_LIBRARIES = ['ortools', 'pandas', 'numpy', 'matplotlib', 'openpyxl']
+
+
+def _load(module_name):
+    """Importer un module à la demande, en chronométrant l'import dans le rapport d'exécution."""
+    with instrumentation.phase('imports'):
+        return importlib.import_module(module_name)
+
+
+def _read_solution(solution_file):
+    """Lire une solution JSON ou binaire (.edtb)."""
+    solution_binaire = _load('solution_binaire')
+    return solution_binaire.read_solution(solution_file)
+
+
+def _write_solution(solution, solution_file):
+    """Écrire la solution au format binaire (.edtb) et en JSON.
     
-    generator = TimetableGenerator('rooms.json', 'subjects.json')
+    Le JSON est écrit atomiquement: service_requetes.py ne lit jamais un fichier à moitié écrit.
+    """
+    solution_binaire = _load('solution_binaire')
+    generateur = _load('generateur')
+    with instrumentation.phase('export_binaire'):
+        solution_binaire.write_solution_binary(solution, solution_binaire.binary_path(solution_file))
+    with instrumentation.phase('export_json'):
+        generateur._write_json_atomic(solution, solution_file)
+
+
+def _check_files(args):
+    if not os.path.exists(args.salles) or not os.path.exists(args.matieres):
+        print(f"Erreur: Les fichiers de données '{args.salles}' et '{args.matieres}' sont introuvables.")
+        return False
+    return True
+
+
+def _generator(args):
+    """Construire le générateur à partir des fichiers de données, ou None si elles sont invalides."""
+    generateur = _load('generateur')
+    donnees = _load('donnees')
+    try:
+        return generateur.TimetableGenerator(args.salles, args.matieres)
+    except donnees.DataError as error:
+        print(f"Erreur: données invalides dans {error}")
+        return None
+
+
+def _solve(args, write=True):
+    """Construire le générateur et résoudre; renvoie le générateur ou None en cas d'échec.
     
-    print("Construction du modèle mathématique...")
+    Avec write=False, la solution n'est pas écrite (le programme complet la confie au pipeline d'export).
+    """
+    generator = _generator(args)
+    if generator is None:
+        return None
+    if args.sans_reglage:
+        generator.solver_profile = None
     
     print("Résolution du problème d'optimisation...")
-    if generator.solve():
-        print(f"Solution trouvée avec valeur objectif: {generator.solution['objective_value']}")
-        
-        print("Génération des emplois du temps...")
-        timetables = generator.generate_timetable()
-        
-        print("Sauvegarde des emplois du temps au format Excel...")
-        generator.save_timetables(output_dir)
-        
-        solution_file = f"{output_dir}/timetable_solution.json"
-        with open(solution_file, 'w', encoding='utf-8') as file:
-            json.dump(generator.solution, file, ensure_ascii=False, indent=2)
-        
-        print("Génération des visualisations...")
-        visualizer = TimetableVisualizer(generator.solution)
-        
-        classes = set(a['class'] for a in generator.solution['assignments'])
-        
-        images_dir = f"{output_dir}/images"
-        os.makedirs(images_dir, exist_ok=True)
-        
-        for class_name in sorted(classes):
-            visualizer.plot_timetable(class_name, images_dir)
-        
-        pdf_file = f"{output_dir}/emplois_du_temps.pdf"
-        visualizer.export_to_pdf(pdf_file)
-        
-        print(f"\nProcessus terminé avec succès!")
-        print(f"Les résultats ont été sauvegardés dans le répertoire '{output_dir}':")
-        print(f"- Excel: {output_dir}/emplois_du_temps.xlsx")
-        print(f"- Images: {output_dir}/images/")
-        print(f"- PDF: {pdf_file}")
-    else:
+    solved = generator.solve(
+        args.mode,
+        previous_solution=args.precedente,
+        repair=args.reparer,
+        use_cache=not args.sans_cache,
+        time_limit=args.temps_limite,
+        num_workers=args.threads,
+        anytime_file=args.solution if args.anytime else None,
+        gap_limit=args.ecart,
+        stall_time=args.stagnation,
+        check_feasibility=not args.sans_verification,
+        strict_feasibility=args.verification_stricte,
+    )
+    if not solved:
         print("Échec: Impossible de trouver une solution valide pour l'emploi du temps.")
         
+        # L'analyse de faisabilité a déjà nommé le dépassement; sinon, chercher les contraintes incompatibles
+        if not generator.stats.get('feasibility', {}).get('feasible', True) or args.sans_diagnostic:
+            return None
+        diagnostic = _load('diagnostic')
+        print("\nDiagnostic des contraintes incompatibles...")
+        result = diagnostic.diagnose(generator)
+        result.print()
+        if result.status == 'infaisable':
+            return None
+        
         print("\nSuggestions pour résoudre le problème:")
         print("1. Vérifiez que les fichiers JSON sont correctement formatés")
         print("2. Assurez-vous qu'il y a suffisamment de salles pour tous les cours")
-        print("3. Vérifiez qu'il n'y a pas de conflits insolubles dans les contraintes")
-        print("4. Essayez d'assouplir temporairement certaines contraintes")
+        print("3. Augmentez la limite de temps (--temps-limite) ou essayez --mode two_phase")
+        return None
+    
+    print(f"Solution trouvée avec valeur objectif: {generator.solution['objective_value']}")
+    missing = len(generator.subjects) - len(generator.solution['assignments'])
+    if missing:
+        print(f"{missing} cours non programmé(s)")
+        if args.sans_diagnostic:
+            print("`python3 main.py diagnostic` indique si des contraintes incompatibles l'imposent "
+                  "ou si le temps de résolution a manqué")
+        else:
+            # Chaque cours étant programmé au plus une fois, les cours laissés de côté sont le
+            # symptôme d'une incompatibilité: le diagnostic la nomme, ou conclut au manque de temps
+            diagnostic = _load('diagnostic')
+            print("\nDiagnostic des cours non programmés...")
+            diagnostic.diagnose(generator).print()
+    if write:
+        _write_solution(generator.solution, args.solution)
+    return generator
+
+
+def _dataset(args, solution):
+    """Jeu de données de la solution (instantané binaire si les fichiers n'ont pas changé), ou None.
+    
+    Les données ne sont utilisées que si elles contiennent toutes les classes de la solution.
+    """
+    donnees = _load('donnees')
+    try:
+        dataset = donnees.load_dataset(args.salles, args.matieres)
+    except (OSError, donnees.DataError):
+        return None
+    if not {a['class'] for a in solution['assignments']} <= set(dataset.class_ids):
+        return None
+    return dataset
+
+
+def _export_pipeline(solution, args, stages, dataset=None, images_dir=None, pdf_file=None):
+    """Exécuter les étapes d'export en parallèle (voir pipeline_export.py); vrai si aucune n'a échoué."""
+    pipeline_export = _load('pipeline_export')
+    return pipeline_export.export_all(
+        solution, stages, output_dir=args.sortie, solution_file=args.solution,
+        images_dir=images_dir, pdf_file=pdf_file, dataset=dataset
+    )
+
+
+def command_check(args):
+    """Vérifier les fichiers de données et analyser leur faisabilité, sans charger le solveur."""
+    json_checker = _load('json_checker')
+    return json_checker.check_json_files(args.salles, args.matieres)
+
+
+def command_info(args):
+    """Résumer une solution existante (statut, objectif, charge par classe, salle et enseignant)."""
+    solution = _read_solution(args.solution)
+    assignments = solution['assignments']
+    
+    print(f"Solution {args.solution}: {solution.get('status')}, valeur objectif {solution.get('objective_value')}")
+    print(f"{len(assignments)} affectations")
+    for label, key in (('Classes', 'class'), ('Salles', 'room'), ('Enseignants', 'lecturer')):
+        counts = {}
+        for assignment in assignments:
+            counts[assignment[key]] = counts.get(assignment[key], 0) + 1
+        print(f"{label} ({len(counts)}):")
+        for name, count in sorted(counts.items(), key=lambda item: (-item[1], str(item[0]))):
+            print(f"  {name or '-'}: {count} cours")
+    return True
+
+
+def command_solve(args):
+    """Résoudre et écrire la solution JSON."""
+    if not _check_files(args):
+        return False
+    return _solve(args) is not None
+
+
+def command_diagnostic(args):
+    """Expliquer en quelques secondes pourquoi tous les cours ne peuvent pas être programmés ensemble."""
+    if not _check_files(args):
+        return False
+    generator = _generator(args)
+    if generator is None:
+        return False
+    diagnostic = _load('diagnostic')
+    result = diagnostic.diagnose(generator, time_limit=args.temps_limite)
+    result.print()
+    return result.status != 'infaisable'
+
+
+def command_render(args):
+    """Dessiner les emplois du temps (PNG et PDF) à partir d'une solution JSON."""
+    solution = _read_solution(args.solution)
+    return _export_pipeline(solution, args, ['images', 'pdf'], _dataset(args, solution), args.images, args.pdf)
+
+
+def command_export(args):
+    """Écrire les emplois du temps dans les formats demandés à partir d'une solution JSON."""
+    solution = _read_solution(args.solution)
+    return _export_pipeline(solution, args, args.formats, _dataset(args, solution))
+
+
+def command_analyse(args):
+    """Mesurer l'occupation des salles et la charge d'une solution, comparée à d'autres si demandé."""
+    analytique = _load('analytique')
+    solution = _read_solution(args.solution)
+    with instrumentation.phase('analyse'):
+        analytique.analyze_files([args.solution] + args.comparer, _dataset(args, solution),
+                                 f"{args.sortie}/analyse", not args.sans_cartes)
+    return True
+
+
+def command_all(args):
+    """Programme complet: résolution, export Excel, images et PDF."""
+    print("=== Générateur d'Emploi du Temps - Université de Yaoundé I ===")
+    print("Chargement des données...")
+    if not _check_files(args):
+        return False
+    
+    generator = _solve(args, write=False)
+    if generator is None:
+        return False
+    
+    # Solution, exports et visualisations écrits en parallèle
+    print("Sauvegarde de la solution, des emplois du temps et des visualisations...")
+    stages = args.etapes or ['json', 'binaire'] + args.formats + ['images', 'pdf']
+    if not _export_pipeline(generator.solution, args, stages, generator.dataset):
+        print("\nCertaines étapes d'export ont échoué (voir ci-dessus); les autres fichiers ont été écrits.")
+        return False
+    images_dir = f"{args.sortie}/images"
+    pdf_file = f"{args.sortie}/emplois_du_temps.pdf"
+    
+    print(f"\nProcessus terminé avec succès!")
+    print(f"Les résultats ont été sauvegardés dans le répertoire '{args.sortie}':")
+    print(f"- Excel: {args.sortie}/emplois_du_temps.xlsx")
+    print(f"- Images: {images_dir}/")
+    print(f"- PDF: {pdf_file}")
+    print(f"- Solution: {args.solution} (et format binaire .edtb)")
+    print(f"- Rapport d'exécution: {args.sortie}/run_report.json")
+    return True
+
+
+COMMANDS = {
+    'check': command_check,
+    'info': command_info,
+    'solve': command_solve,
+    'diagnostic': command_diagnostic,
+    'render': command_render,
+    'export': command_export,
+    'analyse': command_analyse,
+    None: command_all,
+}
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--salles', default='rooms.json', help="Fichier des salles")
+    common.add_argument('--matieres', default='subjects.json', help="Fichier des matières")
+    common.add_argument('--sortie', default='output', help="Répertoire de sortie")
+    common.add_argument('--solution',
+                        help="Fichier de la solution, JSON ou binaire .edtb (défaut: <sortie>/timetable_solution.json)")
+    common.add_argument('--temps', action='store_true',
+                        help="Afficher le temps de démarrage et les bibliothèques chargées")
+    common.add_argument('--profil', action='store_true', help="Profiler chaque phase avec cProfile")
+    
+    solving = argparse.ArgumentParser(add_help=False)
+    solving.add_argument('--mode', default='joint', choices=['joint', 'two_phase', 'decomposed', 'lns'])
+    solving.add_argument('--temps-limite', type=float, help="Limite de temps du solveur en secondes (défaut: 300)")
+    solving.add_argument('--threads', type=int, help="Nombre de threads du solveur (défaut: 8)")
+    solving.add_argument('--precedente', help="Solution précédente utilisée comme point de départ")
+    solving.add_argument('--reparer', action='store_true',
+                         help="Minimiser les changements par rapport à la solution précédente")
+    solving.add_argument('--sans-cache', action='store_true', help="Reconstruire le modèle sans le cache")
+    solving.add_argument('--anytime', action='store_true',
+                         help="Écrire chaque solution améliorante dans le fichier de solution")
+    solving.add_argument('--ecart', type=float, help="Arrêter dès que l'écart relatif à la borne est atteint")
+    solving.add_argument('--stagnation', type=float, help="Arrêter après N secondes sans amélioration")
+    solving.add_argument('--sans-reglage', action='store_true',
+                         help="Ignorer le profil de réglage du solveur (reglage_solveur.json)")
+    solving.add_argument('--sans-verification', action='store_true',
+                         help="Ne pas faire l'analyse de faisabilité avant la résolution")
+    solving.add_argument('--sans-diagnostic', action='store_true',
+                         help="Ne pas lancer le diagnostic quand des cours restent non programmés")
+    solving.add_argument('--verification-stricte', action='store_true',
+                         help="Annuler la résolution si l'analyse de faisabilité détecte un dépassement de capacité")
+    
+    exporting = argparse.ArgumentParser(add_help=False)
+    exporting.add_argument('--formats', nargs='+', default=['excel'],
+                           choices=['excel', 'csv', 'enseignants', 'salles', 'parquet'],
+                           help="Formats d'export (défaut: excel)")
+    
+    rendering = argparse.ArgumentParser(add_help=False)
+    rendering.add_argument('--images', help="Répertoire des images (défaut: <sortie>/images)")
+    rendering.add_argument('--pdf', help="Fichier PDF (défaut: <sortie>/emplois_du_temps.pdf)")
+    
+    parser = argparse.ArgumentParser(
+        description="Générateur d'emplois du temps; sans sous-commande, exécute le programme complet",
+        parents=[common, solving, exporting]
+    )
+    parser.add_argument('--etapes', nargs='+',
+                        choices=['json', 'binaire', 'excel', 'csv', 'enseignants', 'salles', 'parquet', 'images', 'pdf'],
+                        help="Étapes d'export du programme complet, exécutées en parallèle "
+                             "(défaut: json binaire, les --formats, images et pdf)")
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('check', parents=[common], help="Vérifier les fichiers de données")
+    subparsers.add_parser('info', parents=[common], help="Résumer une solution existante")
+    subparsers.add_parser('solve', parents=[common, solving], help="Résoudre et écrire la solution JSON")
+    diagnosing = subparsers.add_parser('diagnostic', parents=[common],
+                                       help="Expliquer pourquoi tous les cours ne peuvent pas être programmés")
+    diagnosing.add_argument('--temps-limite', type=float, default=60,
+                            help="Durée maximale du diagnostic en secondes (défaut: 60)")
+    subparsers.add_parser('render', parents=[common, rendering], help="Dessiner les emplois du temps (PNG, PDF)")
+    subparsers.add_parser('export', parents=[common, exporting],
+                          help="Exporter les emplois du temps (Excel, CSV, par enseignant, par salle, Parquet)")
+    analysing = subparsers.add_parser('analyse', parents=[common],
+                                      help="Occupation des salles, charge des enseignants et trous des classes")
+    analysing.add_argument('--comparer', nargs='+', default=[], help="Autres solutions à comparer")
+    analysing.add_argument('--sans-cartes', action='store_true', help="Ne pas dessiner les cartes de chaleur")
+    return parser
+
+
+def main(argv=None):
+    """Point d'entrée en ligne de commande."""
+    args = build_parser().parse_args(argv)
+    if args.solution is None:
+        args.solution = f"{args.sortie}/timetable_solution.json"
+    
+    # Rapport d'exécution (durée des phases, statistiques du solveur); --profil active cProfile
+    report = instrumentation.start_report(f"{args.sortie}/profils" if args.profil else None)
+    report.add_phase('demarrage', time.perf_counter() - _START)
+    
+    succeeded = COMMANDS[args.command](args)
+    
+    if args.command in (None, 'solve'):
+        report.write(f"{args.sortie}/run_report.json")
+    if args.temps:
+        imports = report.phases.get('imports', {}).get('time', 0.0)
+        loaded = [name for name in HEAVY_LIBRARIES if name in sys.modules]
+        print(f"Temps total: {time.perf_counter() - _START:.3f} s "
+              f"(démarrage {report.phases['demarrage']['time']:.3f} s, imports à la demande {imports:.3f} s); "
+              f"bibliothèques chargées: {', '.join(loaded) or 'aucune'}")
+    return 0 if succeeded else 1
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from exportation import PERIODS, export_solution
+from generateur import TimetableGenerator, _write_json_atomic
+from solution_binaire import write_solution_binary
+
+
+def discover_departments(rooms_file, subjects_dir='.'):
+    """Associer à chaque département de rooms.json son fichier de matières.
+    
+    Le fichier d'un département est subjects_<Département>.json; pour
+    l'Informatique, subjects.json est utilisé à défaut.
+    """
+    with open(rooms_file, 'r', encoding='utf-8') as file:
+        departments = list(json.load(file))
+    
+    subject_files = {}
+    for department in departments:
+        candidate = os.path.join(subjects_dir, f"subjects_{department}.json")
+        fallback = os.path.join(subjects_dir, 'subjects.json')
+        if os.path.exists(candidate):
+            subject_files[department] = candidate
+        elif department == 'Informatique' and os.path.exists(fallback):
+            subject_files[department] = fallback
+        else:
+            print(f"Aucun fichier de matières pour le département {department}, ignoré")
+    return subject_files
+
+
+def _solve_department(task):
+    """Résoudre un département dans un processus de travail."""
+    start = time.perf_counter()
+    generator = TimetableGenerator(task['rooms_file'], task['subjects_file'], task['department'])
+    generator.log_search = False
+    if task['time_limit']:
+        generator.time_limit = task['time_limit']
+    for room_num, slot in task['blocked']:
+        generator.block_room_slot(room_num, slot)
+    for lecturer, slot in task['blocked_lecturers']:
+        generator.block_lecturer_slot(lecturer, slot)
+    
+    # Threads répartis entre les départements: le profil de réglage ne les remplace pas.
+    # Les créneaux bloqués peuvent dépasser la capacité: le département est alors
+    # programmé en partie, sans analyse de faisabilité préalable
+    solved = generator.solve(task['mode'], previous_solution=task['previous'], num_workers=task['num_workers'],
+                             check_feasibility=False)
+    solution = generator.solution if solved else None
+    if solution:
+        for assignment in solution['assignments']:
+            assignment['department'] = task['department']
+    return {
+        'department': task['department'],
+        'classes': generator.classes,
+        'solution': solution,
+        'solve_time': time.perf_counter() - start,
+    }
+
+
+def _occupancy(solution):
+    """Couples (salle, créneau) et (enseignant, créneau) occupés par une solution."""
+    rooms = set()
+    lecturers = set()
+    for a in solution['assignments']:
+        slot = a['day'] * len(PERIODS) + a['period']
+        rooms.add((a['room'], slot))
+        if a['lecturer']:
+            lecturers.add((a['lecturer'], slot))
+    return rooms, lecturers
+
+
+class MultiDepartmentScheduler:
+    """Planifier plusieurs départements en parallèle, un processus par département.
+    
+    Chaque département est d'abord résolu indépendamment. Une passe de
+    coordination détecte ensuite les salles partagées (par exemple les
+    amphithéâtres) et les enseignants communs (désignés par le même nom)
+    occupés au même créneau par plusieurs départements: les départements sont
+    acceptés par ordre de taille, et ceux en conflit avec les départements déjà
+    acceptés sont résolus à nouveau, en parallèle, avec les créneaux occupés de
+    ces salles et enseignants bloqués et leur solution précédente comme point
+    de départ.
+    """
+    
+    def __init__(self, rooms_file, subject_files, mode='two_phase', time_limit=None, max_processes=None):
+        self.rooms_file = rooms_file
+        self.subject_files = subject_files
+        self.mode = mode
+        self.time_limit = time_limit
+        self.max_processes = max_processes or os.cpu_count() or 1
+        self.results = {}
+        self.solution = None
+    
+    def _tasks(self, departments, blocked_by_department, processes):
+        """Tâches de résolution; blocked_by_department: créneaux occupés (salles, enseignants) par département."""
+        # Répartir les cœurs entre les processus pour éviter la sursouscription
+        num_workers = max(1, (os.cpu_count() or 1) // processes)
+        tasks = []
+        for department in departments:
+            previous = self.results.get(department, {}).get('solution')
+            rooms, lecturers = blocked_by_department.get(department, ((), ()))
+            tasks.append({
+                'department': department,
+                'rooms_file': self.rooms_file,
+                'subjects_file': self.subject_files[department],
+                'mode': self.mode,
+                'time_limit': self.time_limit,
+                'num_workers': num_workers,
+                'blocked': sorted(rooms),
+                'blocked_lecturers': sorted(lecturers),
+                'previous': previous,
+            })
+        return tasks
+    
+    def _run(self, departments, blocked_by_department=None):
+        processes = min(self.max_processes, len(departments))
+        tasks = self._tasks(departments, blocked_by_department or {}, processes)
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            for result in pool.map(_solve_department, tasks):
+                self.results[result['department']] = result
+                status = 'résolu' if result['solution'] else 'échec'
+                print(f"Département {result['department']}: {status} en {result['solve_time']:.1f} s")
+    
+    def solve(self):
+        """Résoudre tous les départements puis coordonner les salles et enseignants partagés."""
+        departments = list(self.subject_files)
+        self._run(departments)
+        
+        accepted = []
+        occupied_rooms = set()
+        occupied_lecturers = set()
+        pending = [d for d in departments if self.results[d]['solution']]
+        pending.sort(key=lambda d: -len(self.results[d]['solution']['assignments']))
+        
+        round_number = 0
+        while pending:
+            still_conflicting = []
+            for department in pending:
+                rooms, lecturers = _occupancy(self.results[department]['solution'])
+                if rooms & occupied_rooms or lecturers & occupied_lecturers:
+                    still_conflicting.append(department)
+                else:
+                    accepted.append(department)
+                    occupied_rooms |= rooms
+                    occupied_lecturers |= lecturers
+            if not still_conflicting:
+                break
+            
+            round_number += 1
+            print(f"Coordination (passe {round_number}): salles ou enseignants partagés en conflit pour "
+                  f"{', '.join(still_conflicting)}")
+            blocked = (set(occupied_rooms), set(occupied_lecturers))
+            self._run(still_conflicting, {d: blocked for d in still_conflicting})
+            pending = [d for d in still_conflicting if self.results[d]['solution']]
+        
+        failed = [d for d in departments if d not in accepted]
+        if failed:
+            print(f"Départements sans solution: {', '.join(failed)}")
+        
+        solutions = [self.results[d]['solution'] for d in accepted]
+        self.solution = {
+            'status': 'optimal' if solutions and all(s['status'] == 'optimal' for s in solutions) else 'feasible',
+            'objective_value': sum(s['objective_value'] for s in solutions),
+            'departments': {
+                d: {
+                    'status': self.results[d]['solution']['status'] if d in accepted else 'failed',
+                    'solve_time': self.results[d]['solve_time'],
+                }
+                for d in departments
+            },
+            'assignments': [a for s in solutions for a in s['assignments']]
+        }
+        return not failed
+    
+    def save(self, output_dir):
+        """Sauvegarder la solution combinée (JSON et binaire) et les emplois du temps (Excel)."""
+        os.makedirs(output_dir, exist_ok=True)
+        _write_json_atomic(self.solution, f"{output_dir}/timetable_solution.json")
+        write_solution_binary(self.solution, f"{output_dir}/timetable_solution.edtb")
+        
+        classes = [c for d in self.subject_files if d in self.results for c in self.results[d]['classes']]
+        export_solution(self.solution['assignments'], output_dir, classes=classes)
+
+
+if __name__ == "__main__":
+    rooms_file = sys.argv[1] if len(sys.argv) > 1 else 'rooms.json'
+    scheduler = MultiDepartmentScheduler(rooms_file, discover_departments(rooms_file))
+    if scheduler.solve():
+        print(f"Solution combinée trouvée avec valeur objectif: {scheduler.solution['objective_value']}")
+    scheduler.save('output')
@@ -0,0 +1,191 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentation
+from exportation import FORMATS
+
+# Étapes disponibles et leur mode d'exécution: un thread pour les écritures de fichiers,
+# le pool de processus partagé pour le rendu matplotlib
+STAGES = {
+    'json': 'thread',
+    'binaire': 'thread',
+    **{name: 'thread' for name in FORMATS},
+    'images': 'processus',
+    'pdf': 'processus',
+}
+DEFAULT_STAGES = ['json', 'binaire', 'excel', 'images', 'pdf']
+
+
+class ExportPipeline:
+    """Exporter une solution dans plusieurs formats à la fois.
+    
+    Les étapes ne font que lire la solution: elles sont lancées ensemble, chacune
+    dans son thread, et le rendu des figures est confié à un pool de processus
+    partagé par les images et le PDF. Chaque étape écrit dans un répertoire
+    temporaire voisin de sa destination; ses fichiers ne remplacent les
+    précédents (par renommage atomique) qu'une fois l'étape terminée. Une étape
+    en échec est signalée sans interrompre les autres ni toucher à leurs fichiers.
+    """
+    
+    def __init__(self, solution, output_dir='output', solution_file=None, images_dir=None, pdf_file=None,
+                 dataset=None, max_processes=None):
+        self.solution = solution
+        self.output_dir = output_dir
+        self.solution_file = solution_file or f"{output_dir}/timetable_solution.json"
+        self.images_dir = images_dir or f"{output_dir}/images"
+        self.pdf_file = pdf_file or f"{output_dir}/emplois_du_temps.pdf"
+        self.dataset = dataset
+        # Avec les données, une feuille par classe du programme, même sans cours
+        self.classes = dataset.class_names() if dataset is not None else None
+        self.max_processes = max_processes or os.cpu_count() or 1
+        self.visualizer = None
+        self.rendered = threading.Event()
+    
+    def _destination(self, name):
+        """Répertoire de destination d'une étape (le répertoire temporaire y est créé)."""
+        if name in ('json', 'binaire'):
+            return os.path.dirname(self.solution_file) or '.'
+        if name == 'images':
+            return self.images_dir
+        if name == 'pdf':
+            return os.path.dirname(self.pdf_file) or '.'
+        return self.output_dir
+    
+    # Étapes: chacune écrit dans work et renvoie les couples (fichier temporaire, destination)
+    
+    def _stage_json(self, work, pool):
+        filename = os.path.join(work, os.path.basename(self.solution_file))
+        with open(filename, 'w', encoding='utf-8') as file:
+            json.dump(self.solution, file, ensure_ascii=False, indent=2)
+        return [(filename, self.solution_file)]
+    
+    def _stage_binaire(self, work, pool):
+        from solution_binaire import binary_path, write_solution_binary
+        
+        destination = binary_path(self.solution_file)
+        filename = os.path.join(work, os.path.basename(destination))
+        write_solution_binary(self.solution, filename)
+        return [(filename, destination)]
+    
+    def _stage_format(self, name, work, pool):
+        filename = FORMATS[name](self.solution['assignments'], work, self.classes)
+        if filename is None:
+            return []
+        return [(filename, os.path.join(self.output_dir, os.path.basename(filename)))]
+    
+    def _stage_images(self, work, pool):
+        try:
+            self.visualizer.render_all(work, executor=pool)
+        finally:
+            self.rendered.set()
+        return [
+            (os.path.join(work, name), os.path.join(self.images_dir, name))
+            for name in sorted(os.listdir(work))
+        ]
+    
+    def _stage_pdf(self, work, pool):
+        from visualiseur import _render_pdf
+        
+        filename = os.path.join(work, os.path.basename(self.pdf_file))
+        # Les figures dessinées pour les images sont reprises du cache plutôt que redessinées
+        self.rendered.wait()
+        task = self.visualizer.pdf_task(filename)
+        if pool is None:
+            _render_pdf(task)
+        else:
+            pool.submit(_render_pdf, task).result()
+        return [(filename, self.pdf_file)]
+    
+    def _run_stage(self, name, pool):
+        """Exécuter une étape, chronométrée et isolée: ses erreurs sont renvoyées, pas propagées."""
+        start = time.perf_counter()
+        result = {'stage': name, 'mode': STAGES[name], 'status': 'ok', 'files': [], 'error': None}
+        work = None
+        try:
+            destination = self._destination(name)
+            os.makedirs(destination, exist_ok=True)
+            work = tempfile.mkdtemp(prefix=f".{name}-", dir=destination)
+            if name in FORMATS:
+                moves = self._stage_format(name, work, pool)
+            else:
+                moves = getattr(self, f"_stage_{name}")(work, pool)
+            for filename, final in moves:
+                os.makedirs(os.path.dirname(final) or '.', exist_ok=True)
+                os.replace(filename, final)
+                result['files'].append(final)
+            if not moves:
+                result['status'] = 'ignoree'
+        except Exception as error:
+            result['status'] = 'erreur'
+            result['error'] = f"{type(error).__name__}: {error}"
+        finally:
+            if work:
+                shutil.rmtree(work, ignore_errors=True)
+        result['time'] = time.perf_counter() - start
+        return result
+    
+    def run(self, stages=DEFAULT_STAGES):
+        """Exécuter les étapes demandées en parallèle; renvoie le résultat de chacune."""
+        unknown = [name for name in stages if name not in STAGES]
+        if unknown:
+            raise ValueError(f"Étapes inconnues: {', '.join(unknown)} (disponibles: {', '.join(STAGES)})")
+        stages = list(dict.fromkeys(stages))
+        self.rendered.clear()
+        if 'images' not in stages:
+            self.rendered.set()
+        
+        pool = None
+        if any(STAGES[name] == 'processus' for name in stages):
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            from visualiseur import TimetableVisualizer
+            
+            # Couleurs et regroupement par classe calculés avant de lancer les threads qui les lisent
+            self.visualizer = TimetableVisualizer(self.solution, dataset=self.dataset)
+            self.visualizer._ensure_colors()
+            self.visualizer.assignments_by_class()
+            # Processus lancés par « spawn »: pas de fork d'un processus dont des threads écrivent des fichiers.
+            # Sur une machine à un seul cœur, le lancement des processus coûterait plus qu'il ne rapporte:
+            # le rendu reste dans son thread (le PDF attend les images, les deux ne dessinent pas en même temps)
+            if self.max_processes > 1:
+                pool = ProcessPoolExecutor(max_workers=self.max_processes,
+                                           mp_context=multiprocessing.get_context('spawn'))
+        
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=len(stages) or 1) as threads:
+                futures = [threads.submit(self._run_stage, name, pool) for name in stages]
+                results = [future.result() for future in futures]
+        finally:
+            if pool:
+                pool.shutdown()
+        elapsed = time.perf_counter() - start
+        
+        report = instrumentation.get_report()
+        for result in results:
+            report.add_phase(f"export_{result['stage']}", result['time'])
+        report.add_phase('pipeline_export', elapsed)
+        self._print(results, elapsed)
+        return results
+    
+    @staticmethod
+    def _print(results, elapsed):
+        print(f"{'Étape':<13}{'Mode':<11}{'Temps (s)':>10}  Statut")
+        for result in results:
+            detail = result['error'] or ', '.join(result['files'][:3])
+            more = len(result['files']) - 3
+            if not result['error'] and more > 0:
+                detail += f" (+{more})"
+            print(f"{result['stage']:<13}{result['mode']:<11}{result['time']:>10.2f}  {result['status']}  {detail}")
+        print(f"Export terminé en {elapsed:.2f} s (somme des étapes: {sum(r['time'] for r in results):.2f} s)")
+
+
+def export_all(solution, stages=DEFAULT_STAGES, **options):
+    """Exporter une solution avec ExportPipeline; renvoie vrai si aucune étape n'a échoué."""
+    results = ExportPipeline(solution, **options).run(stages)
+    return all(result['status'] != 'erreur' for result in results)
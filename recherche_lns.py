@@ -0,0 +1,419 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ortools.sat.python import cp_model
+
+import instrumentation
+from generateur import TimetableGenerator, VariableTable, true_indices
+
+# Voisinages libérés à chaque tour: les cours d'une classe, d'un enseignant,
+# d'un jour ou d'un groupe de salles (ensemble de salles candidates d'une matière)
+NEIGHBOURHOODS = ['classe', 'enseignant', 'jour', 'salles']
+
+
+def greedy_placements(generator):
+    """Emploi du temps glouton: chaque séance au meilleur créneau libre, dans la plus petite salle libre.
+    
+    Les séances les plus contraintes (peu de salles candidates) sont placées en
+    premier. Une séance sans créneau compatible reste non programmée.
+    """
+    n_periods = len(generator.periods)
+    slot_order = sorted(range(generator.n_slots), key=lambda t: (-generator.period_weights[t % n_periods], t))
+    room_busy = set(generator.blocked_room_slots)
+    class_busy = set()
+    lecturer_busy = set(generator.blocked_lecturer_slots)
+    group_days = set()
+    
+    placements = []
+    order = sorted(range(len(generator.subjects)), key=lambda s_id: (len(generator.room_domains[s_id]), s_id))
+    for s_id in order:
+        domain = sorted(generator.room_domains[s_id], key=lambda r_id: generator.rooms[r_id]['capacity'])
+        c_id = generator.subject_class[s_id]
+        l_id = generator.subject_lecturer[s_id]
+        group = generator.subjects[s_id].get('group', ('seule', s_id))
+        for t in slot_order:
+            if (c_id, t) in class_busy or (l_id, t) in lecturer_busy or (group, t // n_periods) in group_days:
+                continue
+            r_id = next((r_id for r_id in domain if (r_id, t) not in room_busy), None)
+            if r_id is None:
+                continue
+            placements.append((s_id, r_id, t))
+            room_busy.add((r_id, t))
+            class_busy.add((c_id, t))
+            if l_id >= 0:
+                lecturer_busy.add((l_id, t))
+            group_days.add((group, t // n_periods))
+            break
+    return placements
+
+
+def _occupancy(generator, placements, freed):
+    """Salles, classes, enseignants et jours de matière occupés par les séances fixées (hors freed)."""
+    n_periods = len(generator.periods)
+    room_busy = set(generator.blocked_room_slots)
+    class_busy = set()
+    lecturer_busy = set(generator.blocked_lecturer_slots)
+    group_days = set()
+    for s_id, (r_id, t) in placements.items():
+        if s_id in freed:
+            continue
+        room_busy.add((r_id, t))
+        class_busy.add((generator.subject_class[s_id], t))
+        if generator.subject_lecturer[s_id] >= 0:
+            lecturer_busy.add((generator.subject_lecturer[s_id], t))
+        group_days.add((generator.subjects[s_id].get('group', ('seule', s_id)), t // n_periods))
+    return room_busy, class_busy, lecturer_busy, group_days
+
+
+def build_neighbourhood_model(generator, placements, freed):
+    """Sous-modèle des créneaux où seules les séances de freed sont libres, les autres restant à leur place.
+    
+    placements associe chaque séance programmée à son couple (salle, créneau).
+    Comme pour la résolution en deux phases, le sous-modèle ne choisit que les
+    créneaux: les salles n'interviennent que par des bornes par créneau sur les
+    salles restées libres, et sont affectées ensuite par couplage. Les
+    variables incompatibles avec les séances fixées (classe, enseignant ou jour
+    d'une autre séance de la matière déjà occupés) ne sont pas créées.
+    Retourne le modèle, sa table et les couples (salle, créneau) occupés.
+    """
+    n_periods = len(generator.periods)
+    room_busy, class_busy, lecturer_busy, group_days = _occupancy(generator, placements, freed)
+    free_rooms = {}
+    
+    def available(rooms, t):
+        key = (rooms, t)
+        if key not in free_rooms:
+            free_rooms[key] = sum(1 for r_id in rooms if (r_id, t) not in room_busy)
+        return free_rooms[key]
+    
+    model = cp_model.CpModel()
+    table = VariableTable(
+        len(generator.subjects), len(generator.classes), len(generator.lecturers), 0, generator.n_slots
+    )
+    index = {}
+    for s_id in sorted(freed):
+        domain = frozenset(generator.room_domains[s_id])
+        c_id = generator.subject_class[s_id]
+        l_id = generator.subject_lecturer[s_id]
+        group = generator.subjects[s_id].get('group', ('seule', s_id))
+        for t in range(generator.n_slots):
+            if (c_id, t) in class_busy or (l_id, t) in lecturer_busy or (group, t // n_periods) in group_days:
+                continue
+            if available(domain, t):
+                index[s_id, t] = table.add(model.NewBoolVar(''), s_id, -1, t, c_id, l_id)
+    
+    generator._add_table_constraints(model, table)
+    
+    # Bornes par créneau (conditions de Hall, voir build_slot_model) sur les salles libres
+    domain_sets = {frozenset(generator.room_domains[s_id]) for s_id in freed if generator.room_domains[s_id]}
+    domain_sets.add(frozenset(r_id for rooms in domain_sets for r_id in rooms))
+    for rooms in domain_sets:
+        members = [
+            s_id for s_id in freed
+            if generator.room_domains[s_id] and rooms.issuperset(generator.room_domains[s_id])
+        ]
+        for t in range(generator.n_slots):
+            literals = [table.literals[index[s_id, t]] for s_id in members if (s_id, t) in index]
+            if len(literals) > available(rooms, t):
+                model.Add(sum(literals) <= available(rooms, t))
+    return model, table, room_busy
+
+
+# Générateur propre à chaque processus de travail, construit une seule fois
+_worker_generator = None
+
+
+def _init_worker(data):
+    global _worker_generator
+    generator = TimetableGenerator.from_records(
+        data['rooms'], data['subjects'], data['classes'],
+        data['class_info'], data['room_compatibility'], data['department']
+    )
+    generator.blocked_room_slots = set(data['blocked'])
+    generator.blocked_lecturer_slots = set(data['blocked_lecturers'])
+    generator.solver_parameters = data['solver_parameters']
+    generator.num_workers = data['num_workers']
+    generator.log_search = False
+    _worker_generator = generator
+
+
+def _solve_neighbourhood(task):
+    """Réoptimiser un voisinage dans un processus de travail."""
+    start = time.perf_counter()
+    generator = _worker_generator
+    placements = {s_id: (r_id, t) for s_id, r_id, t in task['placements']}
+    freed = set(task['freed'])
+    model, table, room_busy = build_neighbourhood_model(generator, placements, freed)
+    
+    # Point de départ: le créneau actuel des séances libérées. Indice partiel (variables
+    # vraies seulement): un indice complet ralentit fortement CP-SAT sur ces sous-modèles
+    current = [(s_id, placements[s_id][0], placements[s_id][1]) for s_id in freed if s_id in placements]
+    current_slots = {(s_id, t) for s_id, _, t in current}
+    for k, literal in enumerate(table.literals):
+        if (table.subject[k], table.slot[k]) in current_slots:
+            model.AddHint(literal, True)
+    
+    generator.time_limit = task['time_limit']
+    solver = generator._new_solver()
+    solver.parameters.random_seed = task['seed']
+    status = solver.Solve(model)
+    
+    result = {'kind': task['kind'], 'freed': task['freed'], 'placements': None, 'gain': 0,
+              'variables': len(table), 'time': 0.0}
+    if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
+        gain = solver.ObjectiveValue() - generator._placement_objective(current)
+        if gain > 0:
+            # Salles: couplage sur les salles restées libres, en gardant si possible la salle actuelle
+            blocked = generator.blocked_room_slots
+            generator.blocked_room_slots = room_busy
+            try:
+                new = generator._assign_rooms(
+                    generator._decode_slots(table, true_indices(table, solver.ResponseProto())), current
+                )
+            finally:
+                generator.blocked_room_slots = blocked
+            if new is not None:
+                result['placements'] = new
+                result['gain'] = generator._placement_objective(new) - generator._placement_objective(current)
+    result['time'] = time.perf_counter() - start
+    return result
+
+
+def _choose_neighbourhood(generator, placements, kind, rng, max_size):
+    """Séances programmées libérées par un voisinage tiré au hasard (au plus max_size)."""
+    n_periods = len(generator.periods)
+    if kind == 'classe':
+        candidates = generator.subjects_by_class[rng.randrange(len(generator.classes))]
+    elif kind == 'enseignant' and generator.lecturers:
+        l_id = rng.randrange(len(generator.lecturers))
+        candidates = [s_id for s_id, lecturer in enumerate(generator.subject_lecturer) if lecturer == l_id]
+    elif kind == 'jour':
+        day = rng.randrange(len(generator.days))
+        candidates = [s_id for s_id, (_, t) in placements.items() if t // n_periods == day]
+    else:
+        domain = set(generator.room_domains[rng.randrange(len(generator.subjects))])
+        candidates = [s_id for s_id, (r_id, _) in placements.items() if r_id in domain]
+    candidates = [s_id for s_id in candidates if s_id in placements]
+    if len(candidates) > max_size:
+        candidates = rng.sample(candidates, max_size)
+    return set(candidates)
+
+
+def _compatible(generator, placements, freed, new):
+    """Vrai si les nouveaux placements de freed sont cohérents entre eux et avec les autres séances."""
+    n_periods = len(generator.periods)
+    room_busy, class_busy, lecturer_busy, group_days = _occupancy(generator, placements, freed)
+    for s_id, r_id, t in new:
+        c_id = generator.subject_class[s_id]
+        l_id = generator.subject_lecturer[s_id]
+        group_day = (generator.subjects[s_id].get('group', ('seule', s_id)), t // n_periods)
+        if (r_id not in generator.room_domains[s_id] or (r_id, t) in room_busy or (c_id, t) in class_busy
+                or (l_id, t) in lecturer_busy or group_day in group_days):
+            return False
+        room_busy.add((r_id, t))
+        class_busy.add((c_id, t))
+        if l_id >= 0:
+            lecturer_busy.add((l_id, t))
+        group_days.add(group_day)
+    return True
+
+
+def solve_lns(generator, initial_placements=(), time_limit=None, max_processes=None,
+              neighbourhood_time=10, max_size=150, stall_rounds=20, seed=0):
+    """Recherche à grand voisinage (LNS) à partir d'un emploi du temps glouton.
+    
+    À chaque tour, un voisinage par processus de travail (les cours d'une classe,
+    d'un enseignant, d'un jour ou d'un groupe de salles) est libéré puis
+    réoptimisé avec CP-SAT, le reste de l'emploi du temps étant fixé. Les
+    améliorations compatibles entre elles sont acceptées. La recherche s'arrête
+    après time_limit secondes (par défaut celle du générateur) ou stall_rounds
+    tours sans amélioration.
+    
+    initial_placements (par exemple une solution précédente) remplace le point
+    de départ glouton. La solution est stockée dans generator.solution et
+    l'évolution de l'objectif dans generator.stats['lns'].
+    """
+    start = time.perf_counter()
+    time_limit = time_limit or generator.time_limit
+    rng = random.Random(seed)
+    
+    with instrumentation.phase('lns_depart'):
+        if initial_placements and not _compatible(generator, {}, set(), initial_placements):
+            print("Solution de départ incohérente avec les données, départ glouton")
+            initial_placements = ()
+        placements = {s_id: (r_id, t) for s_id, r_id, t in initial_placements or greedy_placements(generator)}
+    objective = generator._placement_objective([(s, r, t) for s, (r, t) in placements.items()])
+    history = [(time.perf_counter() - start, objective)]
+    print(f"Solution de départ: {len(placements)}/{len(generator.subjects)} séances, objectif {objective}")
+    
+    processes = max_processes or os.cpu_count() or 1
+    data = {
+        'rooms': generator.rooms,
+        'subjects': generator.subjects,
+        'classes': generator.classes,
+        'class_info': generator.class_info,
+        'room_compatibility': generator.room_compatibility,
+        'department': generator.department,
+        'blocked': sorted(generator.blocked_room_slots),
+        'blocked_lecturers': sorted(generator.blocked_lecturer_slots),
+        'solver_parameters': {
+            name: value for name, value in generator.solver_parameters.items() if name != 'num_search_workers'
+        },
+        'num_workers': max(1, generator.num_workers // processes),
+    }
+    
+    by_kind = {kind: {'tried': 0, 'improved': 0, 'gain': 0} for kind in NEIGHBOURHOODS + ['non_programmees']}
+    rounds = stall = 0
+    with instrumentation.phase('lns'), \
+            ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(data,)) as pool:
+        while stall < stall_rounds:
+            remaining = time_limit - (time.perf_counter() - start)
+            if remaining <= 0.5:
+                break
+            
+            # Voisinages disjoints: leurs améliorations sont en général compatibles
+            neighbourhoods = []
+            taken = set()
+            for _ in range(processes * 3):
+                if len(neighbourhoods) == processes:
+                    break
+                kind = rng.choice(NEIGHBOURHOODS)
+                freed = _choose_neighbourhood(generator, placements, kind, rng, max_size)
+                if freed and not freed & taken:
+                    taken |= freed
+                    neighbourhoods.append((kind, freed))
+            # Les séances non programmées sont réparties entre les voisinages du tour
+            unscheduled = [s_id for s_id in range(len(generator.subjects)) if s_id not in placements]
+            rng.shuffle(unscheduled)
+            if not neighbourhoods and unscheduled:
+                # Aucun voisinage tiré (départ vide ou presque): les séances non programmées forment le
+                # voisinage, avec les séances placées de leurs classes et de leurs enseignants
+                seeds = unscheduled[:max_size]
+                unscheduled = unscheduled[max_size:]
+                classes = {generator.subject_class[s_id] for s_id in seeds}
+                lecturers = {generator.subject_lecturer[s_id] for s_id in seeds} - {-1}
+                related = sorted(
+                    s_id for s_id in placements
+                    if generator.subject_class[s_id] in classes or generator.subject_lecturer[s_id] in lecturers
+                )
+                related = rng.sample(related, min(len(related), max_size - len(seeds)))
+                neighbourhoods.append(('non_programmees', set(seeds) | set(related)))
+            for i, s_id in enumerate(unscheduled[:max_size * len(neighbourhoods)]):
+                neighbourhoods[i % len(neighbourhoods)][1].add(s_id)
+            
+            state = [(s_id, r_id, t) for s_id, (r_id, t) in placements.items()]
+            tasks = [
+                {'kind': kind, 'freed': sorted(freed), 'placements': state,
+                 'time_limit': min(neighbourhood_time, remaining), 'seed': rng.randrange(1 << 30)}
+                for kind, freed in neighbourhoods
+            ]
+            
+            improved = False
+            for result in sorted(pool.map(_solve_neighbourhood, tasks), key=lambda r: -r['gain']):
+                by_kind[result['kind']]['tried'] += 1
+                freed = set(result['freed'])
+                if result['placements'] is None or not _compatible(generator, placements, freed, result['placements']):
+                    continue
+                for s_id in freed:
+                    placements.pop(s_id, None)
+                for s_id, r_id, t in result['placements']:
+                    placements[s_id] = (r_id, t)
+                objective += result['gain']
+                by_kind[result['kind']]['improved'] += 1
+                by_kind[result['kind']]['gain'] += result['gain']
+                improved = True
+            
+            rounds += 1
+            stall = 0 if improved else stall + 1
+            if improved:
+                history.append((time.perf_counter() - start, objective))
+                print(f"Tour {rounds}: objectif {objective} ({history[-1][0]:.1f} s)")
+    
+    final = [(s_id, r_id, t) for s_id, (r_id, t) in placements.items()]
+    generator.stats['lns'] = {
+        'status': 'FEASIBLE',
+        'solve_time': time.perf_counter() - start,
+        'first_solution_time': history[0][0],
+        'objective': objective,
+        'scheduled': len(final),
+        'rounds': rounds,
+        'processes': processes,
+        'neighbourhoods': by_kind,
+        # (temps, objectif) à chaque amélioration
+        'progress': history,
+    }
+    instrumentation.get_report().record_solver('lns', generator.stats['lns'])
+    generator._store_solution(cp_model.FEASIBLE, objective, final)
+    return True
+
+
+def compare_with_solve(rooms_file, subjects_file, time_limit=60, mode='two_phase', output_file=None, **options):
+    """Comparer l'évolution de l'objectif de la LNS et de la résolution complète, à durée égale."""
+    curves = {}
+    for name in ('lns', mode):
+        generator = TimetableGenerator(rooms_file, subjects_file)
+        generator.log_search = False
+        if name == 'lns':
+            solved = solve_lns(generator, time_limit=time_limit, **options)
+            stats, offset = generator.stats['lns'], 0.0
+        else:
+            solved = generator.solve(name, use_cache=False, time_limit=time_limit, check_feasibility=False)
+            stats = generator.stats.get('solve_slots') or generator.stats.get('solve', {})
+            # Les temps du solveur partent de la fin de la construction du modèle
+            offset = sum(v['build_time'] for k, v in generator.stats.items() if k.startswith('build_'))
+        curves[name] = {
+            'objective': generator.solution['objective_value'] if solved else None,
+            'progress': [(entry[0] + offset, entry[1]) for entry in stats.get('progress', [])],
+        }
+    
+    checkpoints = [t for t in (1, 2, 5, 10, 20, 30, 60, 120, 300, 600) if t <= time_limit] + [time_limit]
+    print(f"\nObjectif atteint au cours du temps (LNS / résolution {mode}):")
+    print(f"{'Temps (s)':>10}{'LNS':>12}{mode:>12}")
+    for checkpoint in sorted(set(checkpoints)):
+        values = []
+        for name in ('lns', mode):
+            reached = [value for t, value in curves[name]['progress'] if t <= checkpoint]
+            values.append(f"{round(reached[-1]):>12}" if reached else f"{'-':>12}")
+        print(f"{checkpoint:>10}{''.join(values)}")
+    
+    if output_file:
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        with open(output_file, 'w', encoding='utf-8') as file:
+            json.dump({'time_limit': time_limit, 'mode': mode, 'curves': curves}, file, ensure_ascii=False, indent=2)
+        print(f"Comparaison sauvegardée dans {output_file}")
+    return curves
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recherche à grand voisinage (LNS) pour les grandes instances")
+    parser.add_argument('--salles', default='rooms.json')
+    parser.add_argument('--matieres', default='subjects.json')
+    parser.add_argument('--echelle', type=int, help="Instance synthétique N fois plus grande (voir benchmark.py)")
+    parser.add_argument('--temps-limite', type=float, default=60)
+    parser.add_argument('--processus', type=int, help="Processus de travail (défaut: nombre de cœurs)")
+    parser.add_argument('--temps-voisinage', type=float, default=10, help="Limite de temps par voisinage")
+    parser.add_argument('--taille-voisinage', type=int, default=150, help="Nombre maximal de séances libérées")
+    parser.add_argument('--mode', default='two_phase', choices=['joint', 'two_phase', 'decomposed'],
+                        help="Mode de la résolution complète comparée")
+    parser.add_argument('--sortie', default='output/lns_comparaison.json')
+    args = parser.parse_args(argv)
+    
+    options = {'max_processes': args.processus, 'neighbourhood_time': args.temps_voisinage,
+               'max_size': args.taille_voisinage}
+    if args.echelle:
+        from benchmark import generate_instance, scaled_parameters
+        with tempfile.TemporaryDirectory() as tmp:
+            files = generate_instance(tmp, **scaled_parameters(args.echelle))
+            compare_with_solve(*files, args.temps_limite, args.mode, args.sortie, **options)
+    else:
+        compare_with_solve(args.salles, args.matieres, args.temps_limite, args.mode, args.sortie, **options)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,279 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Profil des meilleurs réglages, lu automatiquement par TimetableGenerator.solve
+PROFILE_FILE = 'reglage_solveur.json'
+
+# Classes de taille des instances, selon le nombre de séances à placer
+SIZE_CLASSES = [(100, 'petite'), (500, 'moyenne'), (2000, 'grande')]
+LARGEST_CLASS = 'tres_grande'
+
+# Paramètres CP-SAT explorés (noms des champs de SatParameters)
+PARAMETER_SPACE = {
+    'num_search_workers': [1, 2, 4, 8, 16],
+    'search_branching': ['AUTOMATIC_SEARCH', 'FIXED_SEARCH', 'PORTFOLIO_SEARCH', 'LP_SEARCH',
+                         'PSEUDO_COST_SEARCH', 'PORTFOLIO_WITH_QUICK_RESTART_SEARCH'],
+    'linearization_level': [0, 1, 2],
+    'symmetry_level': [0, 1, 2, 4],
+    'cp_model_presolve': [True, False],
+    'cp_model_probing_level': [0, 1, 2],
+    'random_seed': [0, 1, 2],
+}
+
+# Constructeur de modèle réglé selon le mode de résolution
+MODE_BUILDERS = {'two_phase': 'build_slot_model', 'joint': 'build_indexed_model'}
+
+
+def size_class(n_subjects):
+    """Classe de taille d'une instance à partir de son nombre de séances."""
+    for limit, name in SIZE_CLASSES:
+        if n_subjects < limit:
+            return name
+    return LARGEST_CLASS
+
+
+def _machine():
+    return platform.node() or 'inconnue'
+
+
+def parameters_text(parameters):
+    """Paramètres au format texte protobuf (« search_branching: FIXED_SEARCH »)."""
+    lines = []
+    for name, value in parameters.items():
+        if isinstance(value, bool):
+            value = 'true' if value else 'false'
+        lines.append(f"{name}: {value}")
+    return '\n'.join(lines)
+
+
+def apply_parameters(solver, parameters):
+    """Appliquer un dictionnaire de paramètres (valeurs d'énumération par leur nom) à un solveur."""
+    if parameters:
+        solver.parameters.merge_text_format(parameters_text(parameters))
+
+
+def load_profile(filename=PROFILE_FILE):
+    """Lire le profil de réglage, ou un profil vide s'il n'existe pas."""
+    try:
+        with open(filename, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {'machines': {}}
+
+
+def profile_parameters(generator, mode, filename=PROFILE_FILE):
+    """Meilleurs paramètres enregistrés pour cette machine, la taille de l'instance et le mode de résolution.
+    
+    Un réglage n'est valable que pour le modèle sur lequel il a été fait:
+    renvoie un dictionnaire vide si aucun réglage n'a été fait pour cette
+    combinaison.
+    """
+    machine = load_profile(filename).get('machines', {}).get(_machine(), {})
+    entry = machine.get('classes', {}).get(size_class(len(generator.subjects)), {}).get(mode)
+    return dict(entry['parameters']) if entry and 'parameters' in entry else {}
+
+
+def sample_configurations(space=PARAMETER_SPACE, samples=None, seed=0):
+    """Configurations à essayer: la grille complète, ou samples configurations tirées au hasard.
+    
+    La configuration par défaut du générateur (8 threads, réglages CP-SAT par
+    défaut) est toujours essayée en premier, comme référence.
+    """
+    reference = {'num_search_workers': 8}
+    names = list(space)
+    if samples is None:
+        configurations = [dict(zip(names, values)) for values in itertools.product(*space.values())]
+    else:
+        rng = random.Random(seed)
+        seen = set()
+        configurations = []
+        # Au plus samples tirages distincts (l'espace peut être plus petit)
+        for _ in range(samples * 20):
+            if len(configurations) >= samples:
+                break
+            values = tuple(rng.choice(space[name]) for name in names)
+            if values not in seen:
+                seen.add(values)
+                configurations.append(dict(zip(names, values)))
+    return [reference] + [c for c in configurations if c != reference]
+
+
+def _run_configuration(task):
+    """Résoudre le modèle avec une configuration dans un processus de travail."""
+    from ortools.sat.python import cp_model
+    from generateur import SolutionProgress
+    
+    model = cp_model.CpModel()
+    model.Proto().parse_text_format(task['model'])
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = task['time_limit']
+    apply_parameters(solver, task['parameters'])
+    progress = SolutionProgress()
+    status = solver.Solve(model, progress)
+    
+    found = status == cp_model.OPTIMAL or status == cp_model.FEASIBLE
+    objective = solver.ObjectiveValue() if found else None
+    return {
+        'parameters': task['parameters'],
+        'status': solver.StatusName(status),
+        'objective': objective,
+        'best_bound': solver.BestObjectiveBound() if found else None,
+        'time_to_feasible': progress.history[0][0] if progress.history else None,
+        # Premier instant où l'objectif final est atteint
+        'time_to_best': next((t for t, value, _ in progress.history if value == objective), None),
+        'wall_time': solver.WallTime(),
+        'progress': progress.history,
+    }
+
+
+def _rank(result):
+    """Clé de tri: solution trouvée, puis meilleur objectif (maximisé), puis le plus rapide à l'atteindre."""
+    if result['objective'] is None:
+        return (1, 0, float('inf'))
+    return (0, -result['objective'], result['time_to_best'])
+
+
+def tune(generator, mode='two_phase', samples=30, time_limit=30, processes=None, seed=0,
+         profile_file=PROFILE_FILE, output_dir='reglages', instance=None):
+    """Essayer des configurations du solveur sur le modèle d'un générateur et enregistrer la meilleure.
+    
+    Le modèle est construit une fois puis résolu avec chaque configuration,
+    plusieurs à la fois si les cœurs le permettent: un essai est lancé tant que
+    la somme des num_search_workers des essais en cours ne dépasse pas le
+    nombre de cœurs (un essai seul peut le dépasser). processes limite en plus
+    le nombre d'essais simultanés.
+    Pour chaque essai sont relevés le temps jusqu'à la première solution et
+    l'évolution de l'objectif. La meilleure configuration est enregistrée dans
+    profile_file pour cette machine, la classe de taille de l'instance et le mode.
+    """
+    model, _ = getattr(generator, MODE_BUILDERS[mode])()
+    model_text = str(model.Proto())
+    configurations = sample_configurations(samples=samples, seed=seed)
+    cores = os.cpu_count() or 1
+    processes = processes or cores
+    instance_class = size_class(len(generator.subjects))
+    print(f"Réglage sur {len(generator.subjects)} séances (classe {instance_class}, mode {mode}): "
+          f"{len(configurations)} configurations, {cores} cœurs (au plus {processes} essais à la fois), "
+          f"{time_limit} s chacune")
+    
+    pending = [{'model': model_text, 'parameters': c, 'time_limit': time_limit} for c in configurations]
+    pending.reverse()
+    running = {}
+    results = []
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        while pending or running:
+            # Lancer les essais suivants tant que leurs threads tiennent dans les cœurs libres
+            while pending and len(running) < processes:
+                threads = _threads(pending[-1]['parameters'])
+                if running and sum(running.values()) + threads > cores:
+                    break
+                task = pending.pop()
+                running[pool.submit(_run_configuration, task)] = threads
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                result = future.result()
+                results.append(result)
+                print(f"  {result['status']:<9} objectif {_fmt(result['objective'], 0)}, "
+                      f"1re solution {_fmt(result['time_to_feasible'])} s, "
+                      f"meilleure {_fmt(result['time_to_best'])} s  {_summary(result['parameters'])}")
+    
+    results.sort(key=_rank)
+    best = results[0]
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    if best['objective'] is not None:
+        profile = load_profile(profile_file)
+        machine = profile.setdefault('machines', {}).setdefault(_machine(), {})
+        machine['cpus'] = cores
+        machine['platform'] = platform.platform()
+        classes = machine.setdefault('classes', {})
+        if 'parameters' in classes.get(instance_class, {}):
+            # Ancien format, sans distinction de mode: réglage remplacé
+            del classes[instance_class]
+        classes.setdefault(instance_class, {})[mode] = {
+            'parameters': best['parameters'],
+            'subjects': len(generator.subjects),
+            'objective': best['objective'],
+            'time_to_feasible': best['time_to_feasible'],
+            'time_to_best': best['time_to_best'],
+            'time_limit': time_limit,
+            'instance': instance,
+            'date': stamp,
+        }
+        with open(profile_file, 'w', encoding='utf-8') as file:
+            json.dump(profile, file, ensure_ascii=False, indent=2)
+        print(f"Meilleure configuration ({instance_class}, {mode}) enregistrée dans {profile_file}: "
+              f"{_summary(best['parameters'])}")
+    else:
+        print("Aucune configuration n'a trouvé de solution: profil inchangé")
+    
+    os.makedirs(output_dir, exist_ok=True)
+    filename = os.path.join(output_dir, f"reglage_{instance_class}_{mode}_{stamp}.json")
+    with open(filename, 'w', encoding='utf-8') as file:
+        json.dump({
+            'machine': {'name': _machine(), 'platform': platform.platform(), 'cpus': cores},
+            'instance': instance,
+            'subjects': len(generator.subjects),
+            'size_class': instance_class,
+            'settings': {'mode': mode, 'time_limit': time_limit, 'processes': processes, 'seed': seed},
+            'results': results,
+        }, file, ensure_ascii=False, indent=2)
+    print(f"Résultats détaillés sauvegardés dans {filename}")
+    return results
+
+
+def _threads(parameters):
+    """Threads utilisés par un essai (8 par défaut, comme le générateur)."""
+    return parameters.get('num_search_workers', 8)
+
+
+def _summary(parameters):
+    return ', '.join(f"{name}={value}" for name, value in parameters.items())
+
+
+def _fmt(value, digits=2):
+    return '-' if value is None else f"{value:.{digits}f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Réglage des paramètres du solveur CP-SAT")
+    parser.add_argument('--salles', default='rooms.json')
+    parser.add_argument('--matieres', default='subjects.json')
+    parser.add_argument('--echelles', type=int, nargs='+',
+                        help="Régler sur des instances synthétiques (voir benchmark.py) plutôt que sur les fichiers")
+    parser.add_argument('--mode', default='two_phase', choices=list(MODE_BUILDERS))
+    parser.add_argument('--essais', type=int, default=30,
+                        help="Nombre de configurations tirées au hasard (0: grille complète)")
+    parser.add_argument('--temps-limite', type=float, default=30, help="Limite de temps par essai (secondes)")
+    parser.add_argument('--processus', type=int, help="Essais simultanés (défaut: selon les cœurs)")
+    parser.add_argument('--graine', type=int, default=0)
+    parser.add_argument('--profil', default=PROFILE_FILE, help="Fichier du profil de réglage")
+    parser.add_argument('--sortie', default='reglages', help="Répertoire des résultats détaillés")
+    args = parser.parse_args(argv)
+    
+    from generateur import TimetableGenerator
+    
+    def run(rooms_file, subjects_file, instance):
+        generator = TimetableGenerator(rooms_file, subjects_file)
+        tune(generator, args.mode, args.essais or None, args.temps_limite, args.processus, args.graine,
+             args.profil, args.sortie, instance)
+    
+    if args.echelles:
+        from benchmark import generate_instance, scaled_parameters
+        for scale in args.echelles:
+            with tempfile.TemporaryDirectory() as tmp:
+                run(*generate_instance(tmp, seed=args.graine, **scaled_parameters(scale)), f"synthetique x{scale}")
+    else:
+        run(args.salles, args.matieres, os.path.basename(args.matieres))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,484 @@
+import argparse
+import json
+import sys
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from ortools.sat.python import cp_model
+
+from diagnostic import shrink_core
+from donnees import DataError
+from generateur import TimetableGenerator, _write_json_atomic, true_indices
+from service_requetes import parse_day, parse_period
+
+# Types de modifications acceptés et filtres qui désignent les variables concernées
+EDIT_TYPES = ('interdire', 'imposer', 'enseignant')
+FILTERS = ('classe', 'matiere', 'seance', 'enseignant', 'salle', 'jour', 'periode')
+
+# Paramètres des résolutions successives: la dernière solution est passée en indication, le
+# prétraitement (plusieurs secondes sur le modèle complet) n'accélère plus la recherche
+RESOLVE_PARAMETERS = {'cp_model_presolve': False, 'symmetry_level': 0}
+
+
+class Edit:
+    """Modification « et si » enregistrée par le serveur.
+    
+    'interdire' exclut toutes les affectations désignées par les filtres (une
+    salle fermée, un enseignant indisponible le samedi, un créneau supprimé),
+    'imposer' oblige une séance à être placée dans l'une d'elles, et
+    'enseignant' confie les séances désignées à un autre enseignant.
+    Les deux premiers types sont portés par un littéral de garde, passé en
+    hypothèse au solveur tant que la modification est active; le changement
+    d'enseignant réécrit les contraintes des enseignants concernés.
+    """
+    
+    def __init__(self, edit_id, spec):
+        self.id = edit_id
+        self.spec = spec
+        self.kind = spec['type']
+        self.active = False
+        self.indexes = []  # variables de la table désignées ('interdire', 'imposer')
+        self.subjects = []  # séances réaffectées ('enseignant')
+        self.lecturer = None
+        self.guard = None
+        self.superseded = []  # réaffectations désactivées par la dernière activation ('enseignant')
+    
+    def to_dict(self):
+        return {'id': self.id, 'active': self.active, **self.spec}
+
+
+class WhatIfSolver:
+    """Modèle complet gardé en mémoire, résolu à nouveau à chaque modification.
+    
+    Le modèle (matière, salle, créneau) est construit une seule fois. Chaque
+    résolution part de la dernière solution (passée en indication au solveur)
+    et minimise les changements par rapport à elle, avec l'objectif de
+    réparation du générateur: le plus de cours programmés, puis le plus
+    d'affectations conservées, puis les périodes du matin.
+    """
+    
+    def __init__(self, generator, placements=(), time_limit=10, stall_time=3, output_file=None):
+        self.generator = generator
+        generator.time_limit = time_limit
+        generator.stall_time = stall_time
+        generator.log_search = False
+        generator.anytime_file = None
+        generator.solver_parameters = {**generator.solver_parameters, **RESOLVE_PARAMETERS}
+        self.output_file = output_file
+        self.model, self.table = generator._cached_build('build_indexed_model')
+        
+        self.edits = {}
+        self._next_id = 1
+        self._guards = {}  # (type, variables) -> littéral de garde, réutilisé si la modification revient
+        self._lock = threading.Lock()
+        
+        # Enseignants courants des séances; les contraintes 3 du modèle sont retrouvées pour être réécrites
+        self.lecturers = list(generator.lecturers)
+        self.lecturer_ids = dict(generator.lecturer_ids)
+        self.lecturer_of = list(generator.subject_lecturer)
+        self._lecturer_constraints = self._find_lecturer_constraints()
+        
+        self.placements = list(placements)
+        self.solution = None
+        self.last_result = None
+        if self.placements:
+            self.solution = self._solution('feasible', self.placements)
+        else:
+            self.last_result = self._resolve()
+    
+    def _find_lecturer_constraints(self):
+        """Index dans le modèle de la contrainte AddAtMostOne de chaque couple (enseignant, créneau)."""
+        by_literals = defaultdict(list)
+        for i, constraint in enumerate(self.model.Proto().constraints):
+            if constraint.has_at_most_one():
+                by_literals[tuple(sorted(constraint.at_most_one.literals))].append(i)
+        found = {}
+        # Variable k de la table = littéral k du modèle; une contrainte identique (même classe) reste en place
+        for l_id, per_slot in enumerate(self.table.by_lecturer_slot):
+            for t, indexes in enumerate(per_slot):
+                if len(indexes) > 1:
+                    found[(l_id, t)] = by_literals[tuple(sorted(indexes))].pop()
+        return found
+    
+    # Désignation des variables concernées par une modification
+    
+    def _subjects(self, spec):
+        """Séances désignées par les filtres classe, matiere, seance et enseignant."""
+        generator = self.generator
+        if 'classe' in spec and spec['classe'] not in generator.class_ids:
+            raise ValueError(f"Classe inconnue: {spec['classe']}")
+        if 'enseignant' in spec and spec['type'] != 'enseignant' and spec['enseignant'] not in self.lecturer_ids:
+            raise ValueError(f"Enseignant inconnu: {spec['enseignant']}")
+        
+        subject_ids = []
+        for s_id, s in enumerate(generator.subjects):
+            if 'classe' in spec and s['class'] != spec['classe']:
+                continue
+            if 'matiere' in spec and s['code'] != spec['matiere']:
+                continue
+            if 'seance' in spec and s.get('session', '') != spec['seance']:
+                continue
+            if spec['type'] != 'enseignant' and 'enseignant' in spec \
+                    and self.lecturer_of[s_id] != self.lecturer_ids[spec['enseignant']]:
+                continue
+            subject_ids.append(s_id)
+        return subject_ids
+    
+    def _indexes(self, spec, subject_ids):
+        """Variables de la table des séances désignées, restreintes à la salle, au jour et à la période."""
+        room_id = None
+        if 'salle' in spec:
+            room_id = next((r_id for r_id, r in enumerate(self.generator.rooms) if r['num'] == spec['salle']), None)
+            if room_id is None:
+                raise ValueError(f"Salle inconnue: {spec['salle']}")
+        day = parse_day(str(spec['jour'])) if 'jour' in spec else None
+        period = parse_period(str(spec['periode'])) if 'periode' in spec else None
+        
+        n_periods = len(self.generator.periods)
+        table = self.table
+        return [
+            k for s_id in subject_ids for k in table.by_subject[s_id]
+            if (room_id is None or table.room[k] == room_id)
+            and (day is None or table.slot[k] // n_periods == day)
+            and (period is None or table.slot[k] % n_periods == period)
+        ]
+    
+    def _prepare(self, spec, edit_id):
+        """Valider une modification et calculer ses variables, sans toucher au modèle."""
+        if not isinstance(spec, dict) or spec.get('type') not in EDIT_TYPES:
+            raise ValueError(f"Type de modification attendu parmi {', '.join(EDIT_TYPES)}")
+        unknown = set(spec) - set(FILTERS) - {'type'}
+        if unknown:
+            raise ValueError(f"Champs inconnus: {', '.join(sorted(unknown))}")
+        
+        edit = Edit(edit_id, dict(spec))
+        subject_ids = self._subjects(spec)
+        if not subject_ids:
+            raise ValueError("La modification ne désigne aucune séance")
+        if edit.kind == 'enseignant':
+            if not spec.get('enseignant') or {'salle', 'jour', 'periode'} & set(spec):
+                raise ValueError("Un changement d'enseignant désigne des séances et le nouvel enseignant")
+            edit.subjects = subject_ids
+            edit.lecturer = spec['enseignant']
+            return edit
+        
+        edit.indexes = self._indexes(spec, subject_ids)
+        if edit.kind == 'imposer':
+            if len(subject_ids) > 1:
+                raise ValueError("'imposer' doit désigner une seule séance (préciser classe, matiere et seance)")
+            if not edit.indexes:
+                raise ValueError("Aucune affectation possible ne correspond aux filtres")
+        return edit
+    
+    # Activation et désactivation
+    
+    def _activate(self, edit):
+        if edit.kind == 'enseignant':
+            # Une seule réaffectation active par séance: la plus récente remplace les autres
+            edit.superseded = [other for other in self.edits.values()
+                               if other.active and other.kind == 'enseignant' and set(other.subjects) & set(edit.subjects)]
+            for other in edit.superseded:
+                self._deactivate(other)
+            if edit.lecturer not in self.lecturer_ids:
+                self.lecturer_ids[edit.lecturer] = len(self.lecturers)
+                self.lecturers.append(edit.lecturer)
+            self._set_lecturers(edit.subjects, self.lecturer_ids[edit.lecturer])
+        elif edit.indexes:
+            key = (edit.kind, tuple(edit.indexes))
+            if key not in self._guards:
+                guard = self.model.NewBoolVar(f"modification_{edit.id}")
+                literals = [self.table.literals[k] for k in edit.indexes]
+                if edit.kind == 'interdire':
+                    self.model.AddBoolAnd([literal.Not() for literal in literals]).OnlyEnforceIf(guard)
+                else:
+                    self.model.AddBoolOr(literals).OnlyEnforceIf(guard)
+                self._guards[key] = guard
+            edit.guard = self._guards[key]
+        edit.active = True
+    
+    def _deactivate(self, edit):
+        if edit.kind == 'enseignant' and edit.active:
+            self._set_lecturers(edit.subjects, None)
+        edit.active = False
+    
+    def _set_lecturers(self, subject_ids, l_id):
+        """Changer l'enseignant de séances (None: celui des données) et réécrire les contraintes touchées."""
+        touched = set()
+        for s_id in subject_ids:
+            new = self.generator.subject_lecturer[s_id] if l_id is None else l_id
+            touched.update((self.lecturer_of[s_id], new))
+            self.lecturer_of[s_id] = new
+        for lecturer in touched - {-1}:
+            self._rewrite_lecturer(lecturer)
+    
+    def _rewrite_lecturer(self, l_id):
+        """Contrainte 3 d'un enseignant, réécrite sur place à partir de ses séances courantes."""
+        per_slot = defaultdict(list)
+        for s_id, lecturer in enumerate(self.lecturer_of):
+            if lecturer == l_id:
+                for k in self.table.by_subject[s_id]:
+                    per_slot[self.table.slot[k]].append(k)
+        constraints = self.model.Proto().constraints
+        for t in range(self.generator.n_slots):
+            indexes = per_slot.get(t, [])
+            index = self._lecturer_constraints.get((l_id, t))
+            if index is not None:
+                literals = constraints[index].at_most_one.literals
+                literals.clear()
+                literals.extend(indexes)
+            elif len(indexes) > 1:
+                constraint = self.model.AddAtMostOne([self.table.literals[k] for k in indexes])
+                self._lecturer_constraints[(l_id, t)] = constraint.Index()
+    
+    # Requêtes
+    
+    def apply(self, specs):
+        """Ajouter et activer des modifications, puis résoudre à nouveau.
+        
+        Si le problème devient infaisable, les modifications sont annulées et
+        le résultat indique celles qui sont en conflit.
+        """
+        with self._lock:
+            edits = [self._prepare(spec, self._next_id + i) for i, spec in enumerate(specs)]
+            for edit in edits:
+                self.edits[edit.id] = edit
+                self._next_id = edit.id + 1
+                self._activate(edit)
+            return self._resolve_or_rollback(edits, active=False)
+    
+    def toggle(self, edit_id, active):
+        """Activer ou désactiver une modification déjà enregistrée, puis résoudre à nouveau."""
+        with self._lock:
+            if edit_id not in self.edits:
+                raise LookupError(f"Modification inconnue: {edit_id}")
+            edit = self.edits[edit_id]
+            if edit.active == active:
+                return {'statut': 'INCHANGE', 'appliquee': True, 'retirees': [], 'ajoutees': [],
+                        'modifications_actives': sorted(e.id for e in self.edits.values() if e.active)}
+            if active:
+                # La désignation des séances (enseignant courant) est recalculée à la réactivation
+                prepared = self._prepare(edit.spec, edit.id)
+                edit.indexes, edit.subjects = prepared.indexes, prepared.subjects
+                self._activate(edit)
+            else:
+                self._deactivate(edit)
+            return self._resolve_or_rollback([edit], active=not active)
+    
+    def _restore(self, edit):
+        """Réactiver une réaffectation remplacée, sans toucher à celles qu'elle avait elle-même remplacées."""
+        self._set_lecturers(edit.subjects, self.lecturer_ids[edit.lecturer])
+        edit.active = True
+    
+    def _resolve_or_rollback(self, edits, active):
+        result = self._resolve()
+        if not result['appliquee']:
+            if active:
+                for edit in edits:
+                    self._activate(edit)
+            else:
+                # Dans l'ordre inverse, pour rétablir aussi les réaffectations remplacées au sein du lot
+                for edit in reversed(edits):
+                    self._deactivate(edit)
+                    for other in edit.superseded:
+                        if not other.active:
+                            self._restore(other)
+                    edit.superseded = []
+            # Modifications actives après l'annulation, et non celles essayées
+            result['modifications_actives'] = sorted(edit.id for edit in self.edits.values() if edit.active)
+        self.last_result = result
+        return result
+    
+    def _resolve(self):
+        """Résoudre sous les hypothèses des modifications actives, à partir de la dernière solution."""
+        generator = self.generator
+        model, table = self.model, self.table
+        model.ClearAssumptions()
+        guards = {edit.guard.Index(): edit for edit in self.edits.values() if edit.active and edit.guard is not None}
+        model.AddAssumptions([edit.guard for edit in guards.values()])
+        
+        # Indication: seulement les variables vraies de la dernière solution
+        model.ClearHints()
+        for k in generator._previous_literals(table, self.placements):
+            model.AddHint(table.literals[k], True)
+        generator._add_repair_objective(model, table, self.placements)
+        
+        solver, status = generator._run_solver(model, 'modification')
+        result = {
+            'statut': solver.StatusName(status),
+            'temps': solver.WallTime(),
+            'modifications_actives': sorted(edit.id for edit in self.edits.values() if edit.active),
+        }
+        if status == cp_model.INFEASIBLE:
+            # Ensemble suffisant du solveur, réduit aux seules modifications incompatibles
+            sufficient = set(solver.SufficientAssumptionsForInfeasibility())
+            core, _, _ = shrink_core(model, [edit.guard for i, edit in guards.items() if i in sufficient])
+            result['conflits'] = sorted(guards[guard.Index()].id for guard in core)
+        if status != cp_model.OPTIMAL and status != cp_model.FEASIBLE:
+            result['appliquee'] = False
+            return result
+        
+        placements = generator._decode_joint(table, true_indices(table, solver.ResponseProto()))
+        before = self._labelled(self.placements, self.solution)
+        self.placements = placements
+        self.solution = self._solution('optimal' if status == cp_model.OPTIMAL else 'feasible', placements)
+        after = self._labelled(placements, self.solution)
+        
+        result.update({
+            'appliquee': True,
+            'objectif': self.solution['objective_value'],
+            'non_programmees': len(generator.subjects) - len(placements),
+            # Seules les affectations modifiées (placement ou enseignant) sont renvoyées
+            'retirees': [a for key, a in before.items() if key not in after],
+            'ajoutees': [a for key, a in after.items() if key not in before],
+        })
+        if self.output_file:
+            _write_json_atomic(self.solution, self.output_file)
+        return result
+    
+    def _solution(self, status, placements):
+        """Dictionnaire de solution du générateur, avec les enseignants courants."""
+        solution = self.generator._solution_dict(status, self.generator._placement_objective(placements), placements)
+        for (s_id, _, _), assignment in zip(placements, solution['assignments']):
+            l_id = self.lecturer_of[s_id]
+            assignment['lecturer'] = self.lecturers[l_id] if l_id >= 0 else ''
+        return solution
+    
+    @staticmethod
+    def _labelled(placements, solution):
+        if solution is None:
+            return {}
+        return {
+            (s_id, r_id, t, a['lecturer']): a
+            for (s_id, r_id, t), a in zip(placements, solution['assignments'])
+        }
+    
+    def status(self):
+        return {
+            'status': self.solution['status'] if self.solution else None,
+            'objective_value': self.solution['objective_value'] if self.solution else None,
+            'assignments': len(self.placements),
+            'variables': len(self.table),
+            'modifications': len(self.edits),
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    solver = None
+    
+    def do_GET(self):
+        self._respond(self._get)
+    
+    def do_POST(self):
+        self._respond(self._post)
+    
+    def do_DELETE(self):
+        self._respond(self._delete)
+    
+    def _parts(self):
+        return [unquote(p) for p in urlparse(self.path).path.strip('/').split('/') if p]
+    
+    def _get(self, parts):
+        if parts == ['sante']:
+            return 200, self.solver.status()
+        if parts == ['modifications']:
+            return 200, [edit.to_dict() for edit in self.solver.edits.values()]
+        if parts == ['solution']:
+            return 200, self.solver.solution
+        raise LookupError(f"Chemin inconnu: {self.path}")
+    
+    def _post(self, parts):
+        if parts == ['modifications']:
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                body = json.loads(self.rfile.read(length) or b'null')
+            except ValueError as error:
+                raise ValueError(f"Corps JSON invalide: {error}")
+            result = self.solver.apply(body if isinstance(body, list) else [body])
+        elif len(parts) == 2 and parts[0] == 'modifications' and parts[1].isdigit():
+            result = self.solver.toggle(int(parts[1]), True)
+        else:
+            raise LookupError(f"Chemin inconnu: {self.path}")
+        return (200 if result['appliquee'] else 409), result
+    
+    def _delete(self, parts):
+        if len(parts) == 2 and parts[0] == 'modifications' and parts[1].isdigit():
+            result = self.solver.toggle(int(parts[1]), False)
+            return (200 if result['appliquee'] else 409), result
+        raise LookupError(f"Chemin inconnu: {self.path}")
+    
+    def _respond(self, handler):
+        try:
+            status, data = handler(self._parts())
+        except LookupError as error:
+            status, data = 404, {'erreur': str(error)}
+        except ValueError as error:
+            status, data = 400, {'erreur': str(error)}
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(solver, host='127.0.0.1', port=8001):
+    """Démarrer le serveur de résolution HTTP local (bloquant)."""
+    handler = type('Handler', (_Handler,), {'solver': solver})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Serveur de résolution sur http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serveur de résolution « et si » gardant le modèle en mémoire")
+    parser.add_argument('--salles', default='rooms.json')
+    parser.add_argument('--matieres', default='subjects.json')
+    parser.add_argument('--departement', default='Informatique')
+    parser.add_argument('--solution', help="Solution de départ (JSON ou .edtb); à défaut, une résolution initiale")
+    parser.add_argument('--mode', default='two_phase', help="Mode de la résolution initiale")
+    parser.add_argument('--temps-initial', type=float, default=120, help="Limite de la résolution initiale (secondes)")
+    parser.add_argument('--temps-limite', type=float, default=10, help="Limite par modification (secondes)")
+    parser.add_argument('--stagnation', type=float, default=3,
+                        help="Arrêt après ce nombre de secondes sans amélioration")
+    parser.add_argument('--threads', type=int)
+    parser.add_argument('--ecrire', help="Fichier de solution réécrit après chaque modification "
+                                         "(lu par service_requetes.py)")
+    parser.add_argument('--hote', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    args = parser.parse_args(argv)
+    
+    try:
+        generator = TimetableGenerator(args.salles, args.matieres, args.departement)
+    except DataError as error:
+        print(f"Erreur: données invalides dans {error}")
+        return 1
+    if args.threads:
+        generator.num_workers = args.threads
+    
+    if args.solution:
+        placements = generator.load_previous_placements(args.solution)
+    elif generator.solve(args.mode, time_limit=args.temps_initial, num_workers=args.threads):
+        placements = generator.load_previous_placements(generator.solution)
+    else:
+        print("Résolution initiale impossible")
+        return 1
+    
+    solver = WhatIfSolver(generator, placements, args.temps_limite, args.stagnation, args.ecrire)
+    print(f"Modèle en mémoire: {len(solver.table)} variables, {len(placements)} affectations de départ")
+    serve(solver, args.hote, args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,319 @@
+import argparse
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from exportation import DAYS, PERIODS
+from solution_binaire import BinarySolution, is_binary_solution, read_solution
+
+
+class TimetableIndex:
+    """Index d'une solution: affectations par classe, enseignant, salle et créneau.
+    
+    Le créneau t vaut day * len(PERIODS) + period, comme dans le générateur.
+    rooms (numéros de salles) fixe l'ensemble des salles dont on cherche les
+    créneaux libres; à défaut, les salles utilisées par la solution.
+    Les affectations sont lues par assignment(k); from_binary construit l'index
+    sur les colonnes d'une solution binaire, sans créer leurs dictionnaires.
+    """
+    
+    def __init__(self, solution, rooms=None):
+        assignments = solution['assignments']
+        self.metadata = {key: value for key, value in solution.items() if key != 'assignments'}
+        self.count = len(assignments)
+        self.assignment = assignments.__getitem__
+        self._build(
+            [a['class'] for a in assignments], [a['lecturer'] for a in assignments], [a['room'] for a in assignments],
+            [a['day'] for a in assignments], [a['period'] for a in assignments], rooms
+        )
+    
+    @classmethod
+    def from_binary(cls, binary, rooms=None):
+        """Index d'une solution binaire ouverte (BinarySolution), qui peut être fermée ensuite.
+        
+        Chaque chaîne est décodée une seule fois; une affectation n'est mise sous
+        forme de dictionnaire que lorsqu'une requête la renvoie.
+        """
+        strings = binary.strings()
+        columns = {}
+        for name in binary.int_columns + binary.string_columns:
+            view = binary.column(name)
+            columns[name] = view.tolist()
+            view.release()
+        
+        def assignment(k):
+            result = {name: strings[columns[name][k]] for name in binary.string_columns}
+            for name in binary.int_columns:
+                result[name] = columns[name][k]
+            return result
+        
+        index = cls.__new__(cls)
+        index.metadata = dict(binary.metadata)
+        index.count = len(binary)
+        index.assignment = assignment
+        index._build(
+            *([strings[i] for i in columns[name]] for name in ('class', 'lecturer', 'room')),
+            columns['day'], columns['period'], rooms
+        )
+        return index
+    
+    @classmethod
+    def from_file(cls, filename, rooms=None):
+        """Index d'un fichier de solution JSON ou binaire."""
+        if is_binary_solution(filename):
+            with BinarySolution(filename) as binary:
+                return cls.from_binary(binary, rooms)
+        return cls(read_solution(filename), rooms)
+    
+    def _build(self, classes, lecturers, room_nums, days, periods, rooms):
+        self.days = days
+        self.periods = periods
+        self.by_class = defaultdict(list)
+        self.by_lecturer = defaultdict(list)
+        self.by_room = defaultdict(list)
+        self.by_slot = [[] for _ in range(len(DAYS) * len(PERIODS))]
+        for k in range(self.count):
+            self.by_class[classes[k]].append(k)
+            if lecturers[k]:
+                self.by_lecturer[lecturers[k]].append(k)
+            self.by_room[room_nums[k]].append(k)
+            self.by_slot[self.slot(days[k], periods[k])].append(k)
+        
+        # Bitmap des salles occupées par créneau: le bit i correspond à self.rooms[i]
+        self.rooms = sorted(set(rooms) if rooms is not None else set(self.by_room))
+        room_bits = {num: 1 << i for i, num in enumerate(self.rooms)}
+        self.occupied = [0] * len(self.by_slot)
+        for t, indices in enumerate(self.by_slot):
+            for k in indices:
+                self.occupied[t] |= room_bits.get(room_nums[k], 0)
+        self.all_rooms = (1 << len(self.rooms)) - 1
+    
+    @staticmethod
+    def slot(day, period):
+        return day * len(PERIODS) + period
+    
+    def _select(self, indices, day=None, period=None):
+        return [
+            self.assignment(k) for k in indices
+            if (day is None or self.days[k] == day) and (period is None or self.periods[k] == period)
+        ]
+    
+    def for_class(self, name, day=None):
+        """Cours d'une classe (toute la semaine, ou un jour)."""
+        return self._select(self.by_class.get(name, ()), day)
+    
+    def for_lecturer(self, name, day=None):
+        """Cours d'un enseignant (toute la semaine, ou un jour)."""
+        return self._select(self.by_lecturer.get(name, ()), day)
+    
+    def for_room(self, num, day=None):
+        """Cours dans une salle (toute la semaine, ou un jour)."""
+        return self._select(self.by_room.get(num, ()), day)
+    
+    def at(self, day, period):
+        """Cours programmés à un créneau."""
+        return self._select(self.by_slot[self.slot(day, period)])
+    
+    def free_rooms(self, day, period):
+        """Salles libres à un créneau, lues dans le bitmap."""
+        free = self.all_rooms & ~self.occupied[self.slot(day, period)]
+        return [num for i, num in enumerate(self.rooms) if free >> i & 1]
+
+
+def parse_day(value):
+    """Jour donné par son nom (« Mardi », sans casse) ou son indice."""
+    if value is None:
+        return None
+    if value.isdigit() and int(value) < len(DAYS):
+        return int(value)
+    names = [d.lower() for d in DAYS]
+    if value.lower() in names:
+        return names.index(value.lower())
+    raise ValueError(f"Jour inconnu: {value}")
+
+
+def parse_period(value):
+    """Période donnée par son indice ou le début de son libellé (« 13h05 »)."""
+    if value is None:
+        return None
+    if value.isdigit() and int(value) < len(PERIODS):
+        return int(value)
+    for p, label in enumerate(PERIODS):
+        if label.startswith(value):
+            return p
+    raise ValueError(f"Période inconnue: {value}")
+
+
+class SolutionUnavailable(Exception):
+    """Aucune solution n'a encore pu être chargée."""
+
+
+class QueryService:
+    """Service de requêtes sur un fichier de solution, rechargé lorsqu'il change.
+    
+    Les réponses (déjà sérialisées en JSON) sont conservées dans un cache LRU
+    vidé à chaque rechargement du fichier. Si le fichier est absent ou
+    illisible (en cours de remplacement), le dernier index chargé continue
+    d'être servi.
+    """
+    
+    def __init__(self, solution_file, rooms=None, cache_size=4096):
+        self.solution_file = solution_file
+        self.rooms = rooms
+        self.cache_size = cache_size
+        self.index = None
+        self.version = None
+        self._error = None  # dernière erreur de lecture signalée
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.reload_if_changed()
+    
+    def reload_if_changed(self):
+        """Reconstruire les index si le fichier de solution a été modifié.
+        
+        Renvoie False si le fichier est inchangé ou n'a pas pu être lu; la
+        lecture est retentée à la requête suivante.
+        """
+        try:
+            stat = os.stat(self.solution_file)
+        except OSError as error:
+            self._unreadable(error)
+            return False
+        version = (stat.st_mtime_ns, stat.st_size)
+        if version == self.version:
+            return False
+        with self._lock:
+            if version != self.version:
+                try:
+                    index = TimetableIndex.from_file(self.solution_file, self.rooms)
+                except (OSError, ValueError) as error:
+                    self._unreadable(error)
+                    return False
+                self.index = index
+                self._error = None
+                self._cache.clear()
+                self.version = version
+                print(f"Solution chargée: {self.solution_file} ({self.index.count} affectations)")
+        return True
+    
+    def _unreadable(self, error):
+        # Signalée une seule fois, et non à chaque requête
+        if str(error) == self._error:
+            return
+        self._error = str(error)
+        if self.index is None:
+            print(f"Solution illisible: {self.solution_file} ({error})")
+        else:
+            print(f"Solution illisible, l'index précédent reste servi: {self.solution_file} ({error})")
+    
+    def query(self, path, params):
+        """Répondre à une requête; renvoie le corps JSON encodé.
+        
+        Lève SolutionUnavailable tant qu'aucune solution n'a pu être chargée.
+        """
+        self.reload_if_changed()
+        if self.index is None:
+            raise SolutionUnavailable(f"Aucune solution disponible: {self.solution_file}")
+        key = (path, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+        with self._lock:
+            body = self._cache.get(key)
+            if body is not None:
+                self._cache.move_to_end(key)
+                return body
+            index = self.index
+        
+        body = json.dumps(self._answer(index, path, params), ensure_ascii=False).encode('utf-8')
+        with self._lock:
+            if index is self.index:
+                self._cache[key] = body
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return body
+    
+    def _answer(self, index, path, params):
+        parts = [unquote(p) for p in path.strip('/').split('/') if p]
+        day = parse_day(params.get('jour', [None])[0])
+        period = parse_period(params.get('periode', [None])[0])
+        
+        if parts == ['sante']:
+            return {'status': index.metadata.get('status'), 'assignments': index.count}
+        if len(parts) == 1 and parts[0] in ('classes', 'enseignants', 'salles'):
+            names = {'classes': index.by_class, 'enseignants': index.by_lecturer, 'salles': index.by_room}
+            return sorted(names[parts[0]])
+        if len(parts) == 2 and parts[0] == 'classes':
+            return index.for_class(parts[1], day)
+        if len(parts) == 2 and parts[0] == 'enseignants':
+            return index.for_lecturer(parts[1], day)
+        if len(parts) == 2 and parts[0] == 'salles':
+            return index.for_room(parts[1], day)
+        if parts in (['creneau'], ['salles-libres']):
+            if day is None or period is None:
+                raise ValueError("Paramètres jour et periode requis")
+            if parts == ['creneau']:
+                return index.at(day, period)
+            return index.free_rooms(day, period)
+        raise LookupError(f"Chemin inconnu: {path}")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None
+    
+    def do_GET(self):
+        url = urlparse(self.path)
+        try:
+            body = self.service.query(url.path, parse_qs(url.query))
+            status = 200
+        except SolutionUnavailable as error:
+            body, status = json.dumps({'erreur': str(error)}, ensure_ascii=False).encode('utf-8'), 503
+        except LookupError as error:
+            body, status = json.dumps({'erreur': str(error)}, ensure_ascii=False).encode('utf-8'), 404
+        except ValueError as error:
+            body, status = json.dumps({'erreur': str(error)}, ensure_ascii=False).encode('utf-8'), 400
+        
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # Pas de journal par requête: le service doit tenir des débits élevés
+        pass
+
+
+def serve(service, host='127.0.0.1', port=8000):
+    """Démarrer le serveur HTTP local (bloquant)."""
+    handler = type('Handler', (_Handler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Service de requêtes sur http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Service de requêtes sur les emplois du temps")
+    parser.add_argument('--solution', default='output/timetable_solution.json',
+                        help="Fichier de solution (JSON ou .edtb)")
+    parser.add_argument('--salles', help="rooms.json, pour connaître toutes les salles libres")
+    parser.add_argument('--departement', default='Informatique')
+    parser.add_argument('--hote', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args(argv)
+    
+    rooms = None
+    if args.salles:
+        with open(args.salles, 'r', encoding='utf-8') as file:
+            rooms = [room['num'] for room in json.load(file).get(args.departement, [])]
+    serve(QueryService(args.solution, rooms), args.hote, args.port)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,255 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+# Format binaire des solutions (.edtb):
+#   en-tête fixe   : signature, version, longueur de l'en-tête JSON
+#   en-tête JSON   : nombre d'affectations, colonnes, position des sections, métadonnées
+#   chaînes        : table des positions (uint32, n + 1) puis texte UTF-8 concaténé
+#   colonnes       : un tableau int32 de n valeurs par colonne
+# Les chaînes (classes, matières, salles, enseignants) ne sont stockées qu'une
+# fois; les colonnes textuelles contiennent leur indice dans la table.
+MAGIC = b'EDTB'
+FORMAT_VERSION = 1
+_FIXED_HEADER = struct.Struct('<4sII')
+_ALIGN = 8
+
+# Colonnes entières et colonnes textuelles (internées) d'une affectation
+INT_COLUMNS = ['period', 'day']
+STRING_COLUMNS = ['class', 'subject_code', 'subject_name', 'room', 'lecturer']
+
+
+def binary_path(solution_file):
+    """Chemin du fichier binaire associé à un fichier de solution JSON."""
+    return f"{os.path.splitext(solution_file)[0]}.edtb"
+
+
+def _pad(size):
+    return (-size) % _ALIGN
+
+
+def write_solution_binary(solution, filename):
+    """Écrire une solution au format binaire, de façon atomique.
+    
+    Les clés de la solution autres que les affectations (statut, objectif,
+    rapports) sont conservées dans les métadonnées de l'en-tête. Une colonne
+    textuelle supplémentaire (par exemple department) est ajoutée si toutes
+    les affectations la portent.
+    """
+    assignments = solution['assignments']
+    string_columns = list(STRING_COLUMNS)
+    extra = set.intersection(*(set(a) for a in assignments)) if assignments else set()
+    string_columns += sorted(
+        key for key in extra - set(STRING_COLUMNS) - set(INT_COLUMNS)
+        if all(isinstance(a[key], str) for a in assignments)
+    )
+    
+    # Internement des chaînes
+    strings = {}
+    columns = {name: array('i') for name in INT_COLUMNS + string_columns}
+    for a in assignments:
+        for name in INT_COLUMNS:
+            columns[name].append(a[name])
+        for name in string_columns:
+            value = a[name] or ''
+            columns[name].append(strings.setdefault(value, len(strings)))
+    
+    blob = bytearray()
+    offsets = array('I', [0])
+    for value in strings:
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+    
+    # Position des sections, relatives au début des données (après l'en-tête)
+    sections = {}
+    position = 0
+    sections['string_offsets'] = position
+    position += len(offsets) * offsets.itemsize
+    sections['string_data'] = position
+    position += len(blob) + _pad(len(blob))
+    for name, column in columns.items():
+        sections[name] = position
+        position += len(column) * column.itemsize
+    
+    header = {
+        'count': len(assignments),
+        'strings': len(strings),
+        'int_columns': INT_COLUMNS,
+        'string_columns': string_columns,
+        'byteorder': sys.byteorder,
+        'sections': sections,
+        'metadata': {key: value for key, value in solution.items() if key != 'assignments'},
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    header_bytes += b' ' * _pad(_FIXED_HEADER.size + len(header_bytes))
+    
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+    tmp_file = f"{filename}.tmp"
+    with open(tmp_file, 'wb') as file:
+        file.write(_FIXED_HEADER.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        file.write(header_bytes)
+        file.write(offsets.tobytes())
+        file.write(blob)
+        file.write(b'\0' * _pad(len(blob)))
+        for column in columns.values():
+            file.write(column.tobytes())
+    os.replace(tmp_file, filename)
+    return filename
+
+
+class BinarySolution:
+    """Solution binaire ouverte par projection mémoire (mmap), sans analyse du fichier.
+    
+    Les colonnes sont des memoryview int32 lues directement dans le fichier; les
+    chaînes ne sont décodées qu'à la demande. S'utilise de préférence comme
+    gestionnaire de contexte pour libérer la projection.
+    """
+    
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        try:
+            self._open()
+        except (struct.error, KeyError, TypeError) as error:
+            # Fichier tronqué (par exemple en cours d'écriture) ou en-tête incomplet
+            self.close()
+            raise ValueError(f"{filename}: solution binaire tronquée ou invalide ({error})") from error
+        except ValueError:
+            self.close()
+            raise
+    
+    def _open(self):
+        magic, version, header_size = _FIXED_HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{self.filename} n'est pas une solution binaire (version {FORMAT_VERSION})")
+        
+        start = _FIXED_HEADER.size
+        header = json.loads(bytes(self._map[start:start + header_size]))
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError(f"{self.filename} a été écrit sur une machine d'ordre des octets {header['byteorder']}")
+        
+        self.metadata = header['metadata']
+        self.count = header['count']
+        self.int_columns = header['int_columns']
+        self.string_columns = header['string_columns']
+        data = start + header_size
+        sections = header['sections']
+        # Les colonnes sont écrites en dernier: la fin de la dernière donne la taille attendue
+        end = max(sections[name] for name in self.int_columns + self.string_columns) + self.count * 4
+        if len(self._map) < data + end:
+            raise ValueError(f"{self.filename}: solution binaire tronquée ({len(self._map)} octets sur {data + end})")
+        view = memoryview(self._map)
+        self._views.append(view)
+        self._offsets = self._cast(view, data + sections['string_offsets'], header['strings'] + 1, 'I')
+        self._string_data = data + sections['string_data']
+        self._columns = {
+            name: self._cast(view, data + sections[name], self.count, 'i')
+            for name in self.int_columns + self.string_columns
+        }
+        self._strings = {}
+        self._index = None
+    
+    def _cast(self, view, offset, length, typecode):
+        column = view[offset:offset + length * 4].cast(typecode)
+        self._views.append(column)
+        return column
+    
+    def __len__(self):
+        return self.count
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def close(self):
+        """Libérer les vues puis la projection mémoire."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._map.close()
+    
+    def string(self, index):
+        """Chaîne d'indice donné dans la table (décodée une seule fois)."""
+        value = self._strings.get(index)
+        if value is None:
+            start = self._string_data + self._offsets[index]
+            end = self._string_data + self._offsets[index + 1]
+            value = self._strings[index] = self._map[start:end].decode('utf-8')
+        return value
+    
+    def strings(self):
+        """Table complète des chaînes, décodées (chacune une seule fois)."""
+        return [self.string(i) for i in range(len(self._offsets) - 1)]
+    
+    def string_index(self, value):
+        """Indice d'une chaîne dans la table, ou -1 si elle n'y figure pas."""
+        if self._index is None:
+            self._index = {value: i for i, value in enumerate(self.strings())}
+        return self._index.get(value, -1)
+    
+    def column(self, name, start=0, stop=None):
+        """Tranche brute (memoryview int32) d'une colonne, sans copie.
+        
+        La tranche doit être libérée (release) avant la fermeture de la solution.
+        """
+        return self._columns[name][start:stop]
+    
+    def assignment(self, k):
+        """Affectation k sous forme de dictionnaire (même format que la solution JSON)."""
+        result = {name: self.string(self._columns[name][k]) for name in self.string_columns}
+        for name in self.int_columns:
+            result[name] = self._columns[name][k]
+        return result
+    
+    def assignments(self, start=0, stop=None):
+        """Affectations de start à stop."""
+        return [self.assignment(k) for k in range(*slice(start, stop).indices(self.count))]
+    
+    def where(self, name, value):
+        """Index des affectations dont la colonne name vaut value (chaîne ou entier)."""
+        if name in self.string_columns:
+            value = self.string_index(value)
+            if value < 0:
+                return []
+        column = self._columns[name]
+        return [k for k in range(self.count) if column[k] == value]
+    
+    def to_dict(self):
+        """Solution complète au format JSON (métadonnées et affectations)."""
+        solution = dict(self.metadata)
+        solution['assignments'] = self.assignments()
+        return solution
+
+
+def is_binary_solution(filename):
+    """Vrai si le fichier commence par la signature du format binaire."""
+    with open(filename, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def read_solution(filename):
+    """Lire une solution JSON ou binaire (détectée par sa signature) en dictionnaire."""
+    if is_binary_solution(filename):
+        with BinarySolution(filename) as solution:
+            return solution.to_dict()
+    with open(filename, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+if __name__ == "__main__":
+    # Conversion: python3 solution_binaire.py output/timetable_solution.json [sortie.edtb|sortie.json]
+    source = sys.argv[1] if len(sys.argv) > 1 else 'output/timetable_solution.json'
+    if is_binary_solution(source):
+        target = sys.argv[2] if len(sys.argv) > 2 else f"{os.path.splitext(source)[0]}.json"
+        with open(target, 'w', encoding='utf-8') as file:
+            json.dump(read_solution(source), file, ensure_ascii=False, indent=2)
+    else:
+        target = write_solution_binary(read_solution(source), sys.argv[2] if len(sys.argv) > 2 else binary_path(source))
+    print(f"Solution convertie: {source} -> {target}")
@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+# Les modules du projet sont à la racine du dépôt
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ROOMS_FILE = os.path.join(ROOT, 'rooms.json')
+SUBJECTS_FILE = os.path.join(ROOT, 'subjects.json')
+
+
+@pytest.fixture(autouse=True)
+def _work_dir(tmp_path, monkeypatch):
+    """Exécuter chaque test dans un répertoire temporaire (caches, sorties)."""
+    monkeypatch.chdir(tmp_path)
+
+
+def make_generator(rooms_file=ROOMS_FILE, subjects_file=SUBJECTS_FILE):
+    """Générateur sur les données fournies, sans profil de réglage, sur un seul thread."""
+    from generateur import TimetableGenerator
+    
+    generator = TimetableGenerator(rooms_file, subjects_file)
+    generator.solver_profile = None
+    generator.num_workers = 1
+    return generator
+
+
+
+def double_bookings(assignments):
+    """Couples (ressource, créneau) occupés plus d'une fois, pour les classes, enseignants et salles."""
+    conflicts = {}
+    for field in ('class', 'lecturer', 'room'):
+        counts = Counter((a[field], a['day'], a['period']) for a in assignments if a[field])
+        conflicts[field] = [key for key, count in counts.items() if count > 1]
+    return conflicts
+
+
+@pytest.fixture
+def overloaded_subjects(tmp_path):
+    """subjects.json où la classe INFO1s1 a 31 cours pour 30 créneaux."""
+    with open(SUBJECTS_FILE, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    subjects = data['niveau']['1']['s1']['subjects']
+    template = subjects[0]
+    for i in range(31 - len(subjects)):
+        subjects.append({**template, 'name': f"MATIERE {i}", 'code': f"X{i}",
+                         'Course Lecturer': [f"Enseignant X{i}"]})
+    filename = tmp_path / 'subjects_surcharge.json'
+    with open(filename, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False)
+    return str(filename)
@@ -0,0 +1,35 @@
+from analyse_faisabilite import CapacityView, analyze
+from conftest import ROOMS_FILE, SUBJECTS_FILE, double_bookings, make_generator
+from donnees import load_dataset
+
+
+def test_bundled_data_is_feasible():
+    assert analyze(CapacityView.from_dataset(load_dataset(ROOMS_FILE, SUBJECTS_FILE))).feasible
+
+
+def test_overloaded_class_is_flagged(overloaded_subjects):
+    for view in (CapacityView.from_dataset(load_dataset(ROOMS_FILE, overloaded_subjects)),
+                 make_generator(subjects_file=overloaded_subjects)):
+        report = analyze(view)
+        
+        assert not report.feasible
+        issues = [issue for issue in report.issues if issue['type'] == 'classe']
+        assert [(issue['names'], issue['demand'], issue['capacity']) for issue in issues] == [(['INFO1s1'], 31, 30)]
+
+
+def test_overloaded_class_is_scheduled_partially(overloaded_subjects):
+    generator = make_generator(subjects_file=overloaded_subjects)
+    
+    assert generator.solve('two_phase', use_cache=False, time_limit=30)
+    assert not generator.stats['feasibility']['feasible']
+    assignments = generator.solution['assignments']
+    assert 0 < len(assignments) < len(generator.subjects)
+    assert sum(a['class'] == 'INFO1s1' for a in assignments) <= 30
+    assert double_bookings(assignments) == {'class': [], 'lecturer': [], 'room': []}
+
+
+def test_strict_check_stops_on_overloaded_class(overloaded_subjects):
+    generator = make_generator(subjects_file=overloaded_subjects)
+    
+    assert not generator.solve('two_phase', use_cache=False, strict_feasibility=True)
+    assert generator.solution is None
@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from cache_modele import ModelCache
+from conftest import make_generator
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ModelCache(directory=str(tmp_path / 'cache'))
+
+
+def test_key_is_stable(cache):
+    assert cache.key(make_generator(), 'build_indexed_model') == cache.key(make_generator(), 'build_indexed_model')
+
+
+def test_key_changes_with_inputs(cache):
+    generator = make_generator()
+    reference = cache.key(generator, 'build_indexed_model')
+
+    assert cache.key(generator, 'build_slot_model') != reference
+
+    changes = [
+        lambda g: g.period_weights.__setitem__(0, g.period_weights[0] + 1),
+        lambda g: g.subjects.__setitem__(0, {**g.subjects[0], 'lecturer': 'Autre enseignant'}),
+        lambda g: g.rooms.__setitem__(0, {**g.rooms[0], 'capacity': g.rooms[0]['capacity'] + 1}),
+        lambda g: g.blocked_room_slots.add((0, 0)),
+        lambda g: g.block_lecturer_slot(g.lecturers[0], 0),
+    ]
+    keys = set()
+    for change in changes:
+        generator = make_generator()
+        change(generator)
+        keys.add(cache.key(generator, 'build_indexed_model'))
+
+    assert reference not in keys
+    assert len(keys) == len(changes)
+
+
+def test_key_changes_with_generator_version(cache, monkeypatch):
+    import generateur
+
+    generator = make_generator()
+    reference = cache.key(generator, 'build_indexed_model')
+    monkeypatch.setattr(generateur, 'GENERATOR_VERSION', generateur.GENERATOR_VERSION + '-test')
+
+    assert cache.key(generator, 'build_indexed_model') != reference
+
+
+def test_cached_model_gives_same_solution(capsys):
+    first = make_generator()
+    assert first.solve('joint', time_limit=30)
+    assert "Modèle chargé depuis le cache" not in capsys.readouterr().out
+
+    second = make_generator()
+    assert second.solve('joint', time_limit=30)
+    assert "Modèle chargé depuis le cache" in capsys.readouterr().out
+    assert len(second.solution['assignments']) == len(first.solution['assignments'])
+    assert second.solution['objective_value'] == first.solution['objective_value']
+
+
+def test_corrupted_entry_is_ignored(cache):
+    generator = make_generator()
+    key = cache.key(generator, 'build_indexed_model')
+    cache.store(key, *generator.build_indexed_model())
+    with open(cache._path(key), 'wb') as file:
+        file.write(b'tronque')
+
+    assert cache.load(key) is None
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    generator = make_generator()
+    model, table = generator.build_indexed_model()
+    cache.store('a', model, table)
+    size = os.path.getsize(cache._path('a'))
+    cache.max_bytes = 2 * size
+    cache.store('b', model, table)
+    # 'b' est vieilli et 'a' relu: 'b' est l'entrée la moins récemment utilisée
+    os.utime(cache._path('b'), (1, 1))
+    assert cache.load('a') is not None
+    cache.store('c', model, table)
+
+    assert sorted(name for _, _, name in cache._entries()) == ['a.modele', 'c.modele']
+    assert not [name for name in os.listdir(cache.directory) if name.endswith('.tmp')]
@@ -0,0 +1,26 @@
+from conftest import ROOMS_FILE, make_generator
+from diagnostic import diagnose
+
+
+def test_overloaded_class_has_minimal_core(overloaded_subjects):
+    result = diagnose(make_generator(subjects_file=overloaded_subjects), time_limit=120, step_time=5)
+    
+    assert result.status == 'infaisable'
+    assert result.core
+    assert result.minimal
+    # Le noyau porte sur la classe surchargée et ses cours
+    assert {'type': 'classe', 'name': 'INFO1s1'}.items() <= next(
+        item for item in result.core if item['type'] == 'classe'
+    ).items()
+    assert all(item['name'].endswith('(INFO1s1)') for item in result.core if item['type'] == 'cours')
+
+
+def test_solve_diagnoses_unscheduled_courses(overloaded_subjects, capsys):
+    import main
+    
+    main.main(['solve', '--salles', ROOMS_FILE, '--matieres', overloaded_subjects, '--mode', 'two_phase',
+               '--sans-cache', '--sans-reglage', '--threads', '1', '--temps-limite', '30'])
+    
+    out = capsys.readouterr().out
+    assert "1 cours non programmé(s)" in out
+    assert "Diagnostic: 32 contrainte(s) incompatibles" in out
@@ -0,0 +1,28 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from conftest import ROOMS_FILE, SUBJECTS_FILE
+from donnees import SNAPSHOT_DIR, load_dataset
+
+
+def _load(_):
+    return len(load_dataset(ROOMS_FILE, SUBJECTS_FILE).subjects)
+
+
+def test_snapshot_is_written_in_private_dir_and_reused():
+    first = load_dataset(ROOMS_FILE, SUBJECTS_FILE)
+    
+    names = os.listdir(SNAPSHOT_DIR)
+    assert len(names) == 1 and names[0].endswith('.donnees')
+    again = load_dataset(ROOMS_FILE, SUBJECTS_FILE)
+    assert again.subject_records() == first.subject_records()
+    assert os.listdir(SNAPSHOT_DIR) == names
+
+
+def test_concurrent_loads_share_one_snapshot():
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        counts = set(pool.map(_load, range(8)))
+    
+    assert counts == {len(load_dataset(ROOMS_FILE, SUBJECTS_FILE, use_snapshot=False).subjects)}
+    # Aucun fichier temporaire laissé par les écritures concurrentes
+    assert [name for name in os.listdir(SNAPSHOT_DIR) if not name.endswith('.donnees')] == []
@@ -0,0 +1,13 @@
+import pytest
+
+from conftest import double_bookings, make_generator
+
+
+@pytest.mark.parametrize('mode', ['joint', 'two_phase', 'decomposed', 'lns'])
+def test_no_double_booking(mode):
+    generator = make_generator()
+    
+    assert generator.solve(mode, use_cache=False, time_limit=30)
+    assignments = generator.solution['assignments']
+    assert assignments
+    assert double_bookings(assignments) == {'class': [], 'lecturer': [], 'room': []}
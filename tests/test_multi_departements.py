@@ -0,0 +1,32 @@
+import json
+
+from conftest import ROOMS_FILE, SUBJECTS_FILE, double_bookings
+from multi_departements import MultiDepartmentScheduler
+
+
+def test_shared_rooms_and_lecturers_are_coordinated(tmp_path):
+    # Deuxième département: mêmes salles et mêmes enseignants que l'Informatique
+    with open(ROOMS_FILE, 'r', encoding='utf-8') as file:
+        rooms = json.load(file)
+    rooms['Mathematiques'] = rooms['Informatique']
+    with open(SUBJECTS_FILE, 'r', encoding='utf-8') as file:
+        subjects = json.load(file)
+    subjects['prefixe'] = 'MATH'
+    rooms_file = tmp_path / 'rooms.json'
+    math_file = tmp_path / 'subjects_Mathematiques.json'
+    rooms_file.write_text(json.dumps(rooms, ensure_ascii=False), encoding='utf-8')
+    math_file.write_text(json.dumps(subjects, ensure_ascii=False), encoding='utf-8')
+    
+    scheduler = MultiDepartmentScheduler(
+        str(rooms_file), {'Informatique': SUBJECTS_FILE, 'Mathematiques': str(math_file)},
+        time_limit=20, max_processes=1,
+    )
+    
+    assert scheduler.solve()
+    assignments = scheduler.solution['assignments']
+    assert {a['department'] for a in assignments} == {'Informatique', 'Mathematiques'}
+    assert double_bookings(assignments) == {'class': [], 'lecturer': [], 'room': []}
+    
+    scheduler.save(str(tmp_path / 'sortie'))
+    with open(tmp_path / 'sortie' / 'timetable_solution.json', 'r', encoding='utf-8') as file:
+        assert json.load(file) == scheduler.solution
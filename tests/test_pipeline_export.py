@@ -0,0 +1,30 @@
+import json
+import os
+
+import pipeline_export
+from pipeline_export import ExportPipeline
+
+SOLUTION = {'status': 'OPTIMAL', 'objective_value': 3.0, 'assignments': [
+    {'class': 'INFO1s1', 'subject_code': 'INF111', 'subject_name': 'ALGO', 'room': 'A1001',
+     'period': 0, 'day': 0, 'lecturer': 'ATSA', 'session': ''},
+]}
+
+
+def test_failing_stage_is_isolated(tmp_path, monkeypatch):
+    def broken(assignments, output_dir, classes=None):
+        with open(os.path.join(output_dir, 'partiel.csv'), 'w', encoding='utf-8') as file:
+            file.write('classe;')
+        raise RuntimeError("exportateur en panne")
+    
+    monkeypatch.setitem(pipeline_export.FORMATS, 'csv', broken)
+    output_dir = tmp_path / 'sortie'
+    results = ExportPipeline(SOLUTION, output_dir=str(output_dir), max_processes=1).run(['json', 'binaire', 'csv'])
+    
+    status = {result['stage']: result for result in results}
+    assert status['csv']['status'] == 'erreur'
+    assert 'exportateur en panne' in status['csv']['error']
+    assert status['json']['status'] == 'ok' and status['binaire']['status'] == 'ok'
+    with open(output_dir / 'timetable_solution.json', 'r', encoding='utf-8') as file:
+        assert json.load(file) == SOLUTION
+    # Ni fichier partiel ni répertoire temporaire laissés par l'étape en échec
+    assert sorted(os.listdir(output_dir)) == ['timetable_solution.edtb', 'timetable_solution.json']
@@ -0,0 +1,44 @@
+import pytest
+
+from conftest import make_generator
+from serveur_resolution import WhatIfSolver
+
+
+@pytest.fixture
+def solver():
+    generator = make_generator()
+    assert generator.solve('two_phase', use_cache=False, time_limit=30)
+    return WhatIfSolver(generator, generator.load_previous_placements(generator.solution), time_limit=60, stall_time=3)
+
+
+def _conflict(subject):
+    """Deux modifications incompatibles: imposer et interdire la même séance au même créneau."""
+    where = {'classe': subject['class'], 'matiere': subject['code'], 'jour': 0, 'periode': 0}
+    return [{'type': 'imposer', **where}, {'type': 'interdire', **where}]
+
+
+def test_conflicting_edits_are_rolled_back(solver):
+    subject = solver.generator.subjects[0]
+    lecturer = solver.generator.lecturers[solver.generator.subject_lecturer[0]]
+    assert solver.apply([{'type': 'interdire', 'enseignant': lecturer, 'jour': 5}])['appliquee']
+    
+    result = solver.apply(_conflict(subject))
+    
+    assert not result['appliquee']
+    assert result['conflits'] == [2, 3]
+    assert result['modifications_actives'] == [1]
+    assert solver.last_result['modifications_actives'] == [1]
+
+
+def test_superseded_lecturer_edit_is_restored(solver):
+    subject = solver.generator.subjects[0]
+    reassign = {'type': 'enseignant', 'classe': subject['class'], 'matiere': subject['code']}
+    assert solver.apply([{**reassign, 'enseignant': 'Enseignant X'}])['appliquee']
+    lecturers = list(solver.lecturer_of)
+    
+    result = solver.apply([{**reassign, 'enseignant': 'Enseignant Y'}] + _conflict(subject))
+    
+    assert not result['appliquee']
+    assert result['modifications_actives'] == [1]
+    assert solver.edits[1].active and not solver.edits[2].active
+    assert list(solver.lecturer_of) == lecturers
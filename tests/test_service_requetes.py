@@ -0,0 +1,71 @@
+import json
+import os
+
+import pytest
+
+from service_requetes import QueryService, SolutionUnavailable, TimetableIndex
+from solution_binaire import write_solution_binary
+
+SOLUTION = {'status': 'OPTIMAL', 'objective_value': 6.0, 'assignments': [
+    {'class': 'INFO1s1', 'subject_code': 'INF111', 'subject_name': 'ALGO', 'room': 'A1001',
+     'period': 0, 'day': 1, 'lecturer': 'ATSA', 'session': 'CM'},
+    {'class': 'INFO1s1', 'subject_code': 'INF121', 'subject_name': 'ARCHI', 'room': 'A1002',
+     'period': 2, 'day': 1, 'lecturer': '', 'session': ''},
+    {'class': 'INFO2s1', 'subject_code': 'INF211', 'subject_name': 'BD', 'room': 'A1002',
+     'period': 0, 'day': 1, 'lecturer': 'ATSA', 'session': ''},
+]}
+
+
+def _write_json(solution, filename):
+    with open(filename, 'w', encoding='utf-8') as file:
+        json.dump(solution, file, ensure_ascii=False)
+
+
+def _query(service, path, **params):
+    return json.loads(service.query(path, {name: [str(value)] for name, value in params.items()}))
+
+
+def test_binary_index_matches_json_index(tmp_path):
+    filename = write_solution_binary(SOLUTION, str(tmp_path / 'solution.edtb'))
+    rooms = ['A1001', 'A1002', 'A1003']
+    
+    binary = TimetableIndex.from_file(filename, rooms)
+    expected = TimetableIndex(SOLUTION, rooms)
+    
+    assert binary.count == expected.count == 3
+    assert binary.for_class('INFO1s1') == expected.for_class('INFO1s1') == SOLUTION['assignments'][:2]
+    assert binary.for_lecturer('ATSA', day=1) == [SOLUTION['assignments'][0], SOLUTION['assignments'][2]]
+    assert binary.at(1, 0) == expected.at(1, 0)
+    assert binary.free_rooms(1, 0) == expected.free_rooms(1, 0) == ['A1003']
+
+
+def test_reload_keeps_last_index(tmp_path):
+    filename = str(tmp_path / 'solution.json')
+    _write_json(SOLUTION, filename)
+    service = QueryService(filename)
+    assert _query(service, '/sante') == {'status': 'OPTIMAL', 'assignments': 3}
+    
+    # Nouvelle version: rechargée à la requête suivante
+    _write_json({**SOLUTION, 'assignments': SOLUTION['assignments'][:1]}, filename)
+    os.utime(filename, ns=(0, 10 ** 18))
+    assert _query(service, '/sante')['assignments'] == 1
+    
+    # Fichier en cours de remplacement (tronqué), puis absent: le dernier index reste servi
+    write_solution_binary(SOLUTION, filename)
+    with open(filename, 'rb') as file:
+        data = file.read()
+    with open(filename, 'wb') as file:
+        file.write(data[:len(data) // 2])
+    assert _query(service, '/sante')['assignments'] == 1
+    os.remove(filename)
+    assert _query(service, '/classes') == ['INFO1s1']
+
+
+def test_unavailable_until_first_load(tmp_path):
+    filename = str(tmp_path / 'solution.json')
+    service = QueryService(filename)
+    with pytest.raises(SolutionUnavailable):
+        service.query('/sante', {})
+    
+    _write_json(SOLUTION, filename)
+    assert _query(service, '/classes') == ['INFO1s1', 'INFO2s1']
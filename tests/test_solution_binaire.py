@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from conftest import make_generator
+from solution_binaire import BinarySolution, read_solution, write_solution_binary
+
+
+@pytest.fixture
+def solved():
+    generator = make_generator()
+    assert generator.solve('two_phase', use_cache=False, time_limit=30)
+    return generator.solution
+
+
+def _round_trip(solution, tmp_path):
+    filename = write_solution_binary(solution, str(tmp_path / 'solution.edtb'))
+    return read_solution(filename)
+
+
+def test_round_trip_matches_json(solved, tmp_path):
+    expected = json.loads(json.dumps(solved))
+    
+    assert _round_trip(solved, tmp_path) == expected
+
+
+def test_round_trip_keeps_session_column(tmp_path):
+    solution = {'status': 'OPTIMAL', 'objective_value': 3.0, 'assignments': [
+        {'class': 'INFO1s1', 'subject_code': 'INF111', 'subject_name': 'ALGO', 'room': 'A1001',
+         'period': 0, 'day': 0, 'lecturer': 'ATSA', 'session': 'CM'},
+        {'class': 'INFO1s1', 'subject_code': 'INF111', 'subject_name': 'ALGO', 'room': 'A1002',
+         'period': 1, 'day': 2, 'lecturer': 'ATSA', 'session': 'TD'},
+    ]}
+    
+    assert _round_trip(solution, tmp_path) == solution
+    with BinarySolution(str(tmp_path / 'solution.edtb')) as binary:
+        assert [binary.assignment(k)['session'] for k in binary.where('session', 'TD')] == ['TD']
+
+
+def test_round_trip_empty_solution(tmp_path):
+    solution = {'status': 'INFEASIBLE', 'objective_value': None, 'assignments': []}
+    
+    assert _round_trip(solution, tmp_path) == solution
+
+
+def test_truncated_file_raises_value_error(solved, tmp_path):
+    filename = write_solution_binary(solved, str(tmp_path / 'solution.edtb'))
+    with open(filename, 'rb') as file:
+        data = file.read()
+    
+    for size in (4, 40, len(data) // 2, len(data) - 1):
+        with open(filename, 'wb') as file:
+            file.write(data[:size])
+        with pytest.raises(ValueError):
+            read_solution(filename)
@@ -1,141 +1,328 @@
+import hashlib
 import json
-import pandas as pd
 import os
-from ortools.sat.python import cp_model
+import pickle
+import shutil
 from collections import defaultdict
-import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
-import numpy as np
-from matplotlib.backends.backend_pdf import PdfPages
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import version
+
+import instrumentation
+
+# matplotlib et numpy sont importés dans les fonctions qui dessinent: charger ce
+# module (par exemple pour inspecter une solution) reste rapide.
+
+# Répertoire et taille maximale par défaut du cache des rendus (PNG et figure sérialisée par classe)
+RENDER_CACHE_DIR = '.cache_rendus'
+MAX_RENDER_CACHE_BYTES = 200 * 1024 * 1024  # 200 Mo
+RENDER_VERSION = '1'
+
+
+def draw_timetable(class_name, assignments, subject_colors, days, periods):
+    """Dessiner la grille de l'emploi du temps d'une classe et renvoyer la figure.
+    
+    La figure est créée sans pyplot: elle n'a pas à être fermée et peut être
+    dessinée dans un processus de travail.
+    """
+    import numpy as np
+    from matplotlib.figure import Figure
+    from matplotlib.patches import Rectangle
+    
+    fig = Figure(figsize=(15, 8))
+    ax = fig.subplots()
+    ax.set_title(f'Emploi du temps - {class_name}', fontsize=16)
+    
+    # Tracer une cellule par affectation
+    for assignment in assignments:
+        period = assignment['period']
+        day = assignment['day']
+        ax.add_patch(Rectangle(
+            (day, period), 1, 1,
+            facecolor=subject_colors.get(assignment['subject_code'], 'lightgray'),
+            alpha=0.8,
+            edgecolor='black'
+        ))
+        ax.text(
+            day + 0.5, period + 0.5,
+            f"{assignment['subject_code']}\n{assignment['room']}\n{assignment['lecturer']}",
+            ha='center', va='center', fontsize=9
+        )
+    
+    # Configurer les axes
+    ax.set_xticks(np.arange(len(days)) + 0.5)
+    ax.set_yticks(np.arange(len(periods)) + 0.5)
+    ax.set_xticklabels(days)
+    ax.set_yticklabels(periods)
+    
+    # Ajouter une grille de fond
+    ax.set_xticks(np.arange(len(days) + 1), minor=True)
+    ax.set_yticks(np.arange(len(periods) + 1), minor=True)
+    ax.grid(which='minor', color='black', linestyle='-', linewidth=1)
+    
+    # Ajuster les limites des axes
+    ax.set_xlim(0, len(days))
+    ax.set_ylim(0, len(periods))
+    
+    # Ajouter une légende pour les matières de la classe
+    class_subjects = sorted({a['subject_code'] for a in assignments})
+    legend_elements = [
+        Rectangle((0, 0), 1, 1, facecolor=subject_colors.get(subject, 'lightgray'),
+                  alpha=0.8, edgecolor='black', label=subject)
+        for subject in class_subjects
+    ]
+    ax.legend(handles=legend_elements, loc='upper right', bbox_to_anchor=(1.15, 1))
+    
+    fig.tight_layout()
+    return fig
+
+
+def _render_class(task):
+    """Dessiner une classe une seule fois, écrire le PNG et la figure sérialisée dans le cache."""
+    fig = draw_timetable(task['class_name'], task['assignments'], task['colors'], task['days'], task['periods'])
+    
+    # Écritures atomiques: un rendu interrompu ne laisse pas d'entrée partielle dans le cache
+    tmp_png = f"{task['cache_png']}.tmp"
+    fig.savefig(tmp_png, format='png', dpi=task['dpi'], bbox_inches='tight')
+    os.replace(tmp_png, task['cache_png'])
+    tmp_fig = f"{task['cache_fig']}.tmp"
+    with open(tmp_fig, 'wb') as file:
+        pickle.dump(fig, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_fig, task['cache_fig'])
+    return task['class_name']
+
+
+def _render_pdf(task):
+    """Écrire le PDF de toutes les classes: figure du cache si elle existe, sinon dessinée ici.
+    
+    Ne dépend pas des PNG: peut tourner en même temps que render_all (les entrées
+    du cache sont écrites de façon atomique).
+    """
+    from matplotlib.backends.backend_pdf import PdfPages
+    
+    os.makedirs(os.path.dirname(task['pdf_file']) or '.', exist_ok=True)
+    with PdfPages(task['pdf_file']) as pdf:
+        for class_name, assignments, cache_fig in task['classes']:
+            if os.path.exists(cache_fig):
+                with open(cache_fig, 'rb') as file:
+                    fig = pickle.load(file)
+            else:
+                fig = draw_timetable(class_name, assignments, task['colors'], task['days'], task['periods'])
+            pdf.savefig(fig, bbox_inches='tight')
+    return task['pdf_file']
+
 
 class TimetableVisualizer:
-    def __init__(self, timetable_data):
-        """Initialiser le visualiseur d'emploi du temps."""
+    def __init__(self, timetable_data, cache_dir=RENDER_CACHE_DIR, max_processes=None, dataset=None,
+                 max_cache_bytes=MAX_RENDER_CACHE_BYTES):
+        """Initialiser le visualiseur d'emploi du temps.
+        
+        dataset (voir donnees.py), s'il est fourni, donne la liste complète des
+        classes (dessinées même sans cours) et des matières, dont les couleurs
+        restent alors les mêmes d'une solution à l'autre.
+        """
         self.timetable_data = timetable_data
+        self.dataset = dataset
         self.days = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi']
         self.periods = ['7h00-9h55', '10h05-12h55', '13h05-15h55', '16h05-18h55', '19h05-21h55']
+        self.dpi = 300
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.max_processes = max_processes or os.cpu_count() or 1
         
         # Générer une palette de couleurs pour les différentes matières
         self.subject_colors = {}
-        
+        self._by_class = None
+    
     def generate_colors(self, assignments):
         """Générer des couleurs uniques pour chaque matière."""
-        # Extraire toutes les matières uniques
-        subjects = set()
-        for assignment in assignments:
-            subjects.add(assignment['subject_code'])
+        import matplotlib
+        import matplotlib.colors as mcolors
+        
+        # Extraire toutes les matières uniques, triées pour des couleurs stables d'une exécution à l'autre
+        subjects = sorted({assignment['subject_code'] for assignment in assignments})
+        if self.dataset is not None:
+            subjects = sorted(set(subjects) | set(self.dataset.subject_codes()))
         
         # Créer une palette de couleurs
-        color_map = plt.cm.get_cmap('tab20', len(subjects))
+        color_map = matplotlib.colormaps['tab20'].resampled(max(len(subjects), 1))
         colors = [mcolors.rgb2hex(color_map(i)[:3]) for i in range(len(subjects))]
         
         # Assigner des couleurs aux matières
         self.subject_colors = {subject: colors[i] for i, subject in enumerate(subjects)}
     
-    def plot_timetable(self, class_name, output_dir=None):
-        """Visualiser l'emploi du temps d'une classe sous forme de grille."""
-        # Filtrer les affectations pour cette classe
-        assignments = [a for a in self.timetable_data['assignments'] if a['class'] == class_name]
-        
+    def assignments_by_class(self):
+        """Affectations groupées par classe (calculées une seule fois)."""
+        if self._by_class is None:
+            self._by_class = defaultdict(list)
+            for assignment in self.timetable_data['assignments']:
+                self._by_class[assignment['class']].append(assignment)
+        return self._by_class
+    
+    def _ensure_colors(self):
         # Générer des couleurs si ce n'est pas déjà fait
         if not self.subject_colors:
             self.generate_colors(self.timetable_data['assignments'])
+    
+    def plot_timetable(self, class_name, output_dir=None):
+        """Visualiser l'emploi du temps d'une classe sous forme de grille."""
+        self._ensure_colors()
+        fig = draw_timetable(
+            class_name, self.assignments_by_class().get(class_name, []),
+            self.subject_colors, self.days, self.periods
+        )
         
-        # Créer une figure
-        fig, ax = plt.subplots(figsize=(15, 8))
-        plt.title(f'Emploi du temps - {class_name}', fontsize=16)
-        
-        # Créer une grille pour l'emploi du temps
-        grid = np.zeros((len(self.periods), len(self.days)))
-        labels = np.empty((len(self.periods), len(self.days)), dtype=object)
-        
-        # Remplir la grille avec les affectations
-        for assignment in assignments:
-            period = assignment['period']
-            day = assignment['day']
-            grid[period, day] = 1
-            labels[period, day] = (
-                f"{assignment['subject_code']}\n"
-                f"{assignment['room']}\n"
-                f"{assignment['lecturer']}"
-            )
-        
-        # Créer une matrice de couleurs
-        colors = np.empty((len(self.periods), len(self.days)), dtype=object)
-        for assignment in assignments:
-            period = assignment['period']
-            day = assignment['day']
-            colors[period, day] = self.subject_colors.get(assignment['subject_code'], 'lightgray')
-        
-        # Masquer les cellules vides
-        masked_colors = np.ma.masked_where(grid == 0, colors)
-        
-        # Tracer la grille
-        for i in range(len(self.periods)):
-            for j in range(len(self.days)):
-                if grid[i, j] == 1:
-                    rect = plt.Rectangle(
-                        (j, i), 1, 1, 
-                        facecolor=colors[i, j], 
-                        alpha=0.8, 
-                        edgecolor='black'
-                    )
-                    ax.add_patch(rect)
-                    ax.text(
-                        j + 0.5, i + 0.5, labels[i, j],
-                        ha='center', va='center', fontsize=9
-                    )
+        # Sauvegarder l'image si un répertoire de sortie est spécifié
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+            with instrumentation.phase('rendu_png'):
+                fig.savefig(f"{output_dir}/{class_name}_timetable.png", dpi=self.dpi, bbox_inches='tight')
         
-        # Configurer les axes
-        ax.set_xticks(np.arange(len(self.days)) + 0.5)
-        ax.set_yticks(np.arange(len(self.periods)) + 0.5)
-        ax.set_xticklabels(self.days)
-        ax.set_yticklabels(self.periods)
+        return fig
+    
+    def _render_key(self, class_name, assignments):
+        """Empreinte du contenu d'un rendu: toute modification de la classe produit un nouveau rendu."""
+        content = {
+            'version': RENDER_VERSION,
+            'matplotlib': version('matplotlib'),
+            'class': class_name,
+            'assignments': sorted(assignments, key=lambda a: (a['day'], a['period'], a['subject_code'])),
+            'colors': {a['subject_code']: self.subject_colors.get(a['subject_code']) for a in assignments},
+            'days': self.days,
+            'periods': self.periods,
+            'dpi': self.dpi,
+        }
+        payload = json.dumps(content, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _cache_entry(self, class_name, assignments):
+        """Chemins du PNG et de la figure sérialisée d'une classe dans le cache des rendus."""
+        key = self._render_key(class_name, assignments)
+        return os.path.join(self.cache_dir, f"{key}.png"), os.path.join(self.cache_dir, f"{key}.fig")
+    
+    def _evict_cache(self, keep=()):
+        """Supprimer les rendus les moins récemment utilisés au-delà de max_cache_bytes.
         
-        # Ajouter une grille de fond
-        ax.set_xticks(np.arange(len(self.days) + 1), minor=True)
-        ax.set_yticks(np.arange(len(self.periods) + 1), minor=True)
-        ax.grid(which='minor', color='black', linestyle='-', linewidth=1)
+        Les entrées de keep (chemins utilisés par l'exécution en cours) ne sont
+        jamais supprimées.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return
+        keep = {os.path.basename(path) for path in keep}
+        entries = defaultdict(lambda: [0, 0, []])  # clé -> [dernière utilisation, taille, fichiers]
+        for name in os.listdir(self.cache_dir):
+            key, extension = os.path.splitext(name)
+            if extension not in ('.png', '.fig'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entry = entries[key]
+            entry[0] = max(entry[0], stat.st_mtime)
+            entry[1] += stat.st_size
+            entry[2].append(name)
+        total = sum(size for _, size, _ in entries.values())
+        for _, size, names in sorted(entries.values()):
+            if total <= self.max_cache_bytes:
+                break
+            if keep.intersection(names):
+                continue
+            for name in names:
+                os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+    
+    def classes(self):
+        """Classes à dessiner: celles de la solution et, si les données sont fournies, toutes les autres."""
+        classes = set(self.assignments_by_class())
+        if self.dataset is not None:
+            classes |= set(self.dataset.class_names())
+        return sorted(classes)
+    
+    def render_all(self, output_dir=None, pdf_file=None, use_cache=True, executor=None):
+        """Dessiner chaque classe une seule fois, en parallèle, et écrire PNG et PDF.
         
-        # Ajuster les limites des axes
-        ax.set_xlim(0, len(self.days))
-        ax.set_ylim(0, len(self.periods))
+        Chaque classe est dessinée dans un pool de processus; le PNG et la page du
+        PDF sont produits à partir de la même figure. Les rendus sont conservés
+        dans un cache indexé par le contenu de la classe: lors d'une nouvelle
+        exécution, seules les classes modifiées sont redessinées. Le cache est
+        limité à max_cache_bytes (les rendus les moins récemment utilisés sont
+        supprimés). executor, s'il
+        est fourni, est le pool de processus à utiliser (par exemple celui de
+        pipeline_export.py) à la place d'un pool créé pour l'occasion.
+        """
+        self._ensure_colors()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        by_class = self.assignments_by_class()
+        classes = self.classes()
         
-        # Ajouter une légende pour les matières
-        legend_elements = [
-            plt.Rectangle((0, 0), 1, 1, facecolor=color, alpha=0.8, edgecolor='black', label=subject)
-            for subject, color in self.subject_colors.items()
-            if subject in [a['subject_code'] for a in assignments]
-        ]
-        ax.legend(handles=legend_elements, loc='upper right', bbox_to_anchor=(1.15, 1))
+        tasks = []
+        entries = {}
+        for class_name in classes:
+            cache_png, cache_fig = self._cache_entry(class_name, by_class.get(class_name, []))
+            entries[class_name] = (cache_png, cache_fig)
+            if use_cache and os.path.exists(cache_png) and os.path.exists(cache_fig):
+                # Marquer l'entrée comme récemment utilisée pour l'éviction
+                os.utime(cache_png)
+                os.utime(cache_fig)
+                continue
+            tasks.append({
+                'class_name': class_name,
+                'assignments': by_class.get(class_name, []),
+                'colors': self.subject_colors,
+                'days': self.days,
+                'periods': self.periods,
+                'dpi': self.dpi,
+                'cache_png': cache_png,
+                'cache_fig': cache_fig,
+            })
         
-        # Ajuster la mise en page
-        plt.tight_layout()
+        with instrumentation.phase('rendu_classes'):
+            if executor is not None and tasks:
+                list(executor.map(_render_class, tasks))
+            elif len(tasks) > 1 and self.max_processes > 1:
+                with ProcessPoolExecutor(max_workers=min(self.max_processes, len(tasks))) as pool:
+                    list(pool.map(_render_class, tasks))
+            else:
+                for task in tasks:
+                    _render_class(task)
+        print(f"Rendu des emplois du temps: {len(tasks)} classe(s) dessinée(s), "
+              f"{len(classes) - len(tasks)} reprise(s) du cache")
+        self._evict_cache(keep=[path for entry in entries.values() for path in entry])
         
-        # Sauvegarder l'image si un répertoire de sortie est spécifié
         if output_dir:
             os.makedirs(output_dir, exist_ok=True)
-            plt.savefig(f"{output_dir}/{class_name}_timetable.png", dpi=300, bbox_inches='tight')
+            with instrumentation.phase('rendu_png'):
+                for class_name in classes:
+                    shutil.copyfile(entries[class_name][0], f"{output_dir}/{class_name}_timetable.png")
         
-        return fig
+        if pdf_file:
+            from matplotlib.backends.backend_pdf import PdfPages
+            
+            with instrumentation.phase('export_pdf'), PdfPages(pdf_file) as pdf:
+                for class_name in classes:
+                    with open(entries[class_name][1], 'rb') as file:
+                        pdf.savefig(pickle.load(file), bbox_inches='tight')
+            print(f"Emplois du temps exportés dans {pdf_file}")
+    
+    def pdf_task(self, pdf_file):
+        """Tâche de _render_pdf: tout ce qu'il faut pour dessiner le PDF dans un autre processus."""
+        self._ensure_colors()
+        by_class = self.assignments_by_class()
+        classes = []
+        for class_name in self.classes():
+            assignments = by_class.get(class_name, [])
+            classes.append((class_name, assignments, self._cache_entry(class_name, assignments)[1]))
+        return {
+            'pdf_file': pdf_file,
+            'classes': classes,
+            'colors': self.subject_colors,
+            'days': self.days,
+            'periods': self.periods,
+        }
     
     def export_to_pdf(self, output_file):
         """Exporter tous les emplois du temps dans un fichier PDF."""
-        # Extraire toutes les classes uniques
-        classes = set(a['class'] for a in self.timetable_data['assignments'])
-        
-        # Générer des couleurs si ce n'est pas déjà fait
-        if not self.subject_colors:
-            self.generate_colors(self.timetable_data['assignments'])
-        
-        # Créer un fichier PDF
-        with PdfPages(output_file) as pdf:
-            for class_name in sorted(classes):
-                fig = self.plot_timetable(class_name)
-                pdf.savefig(fig, bbox_inches='tight')
-                plt.close(fig)
-        
-        print(f"Emplois du temps exportés dans {output_file}")
+        self.render_all(pdf_file=output_file)
 
 # Fonction principale pour utiliser le visualiseur
 def visualize_timetable(solution_file, output_dir=None, pdf_file=None):
@@ -147,16 +334,8 @@ def visualize_timetable(solution_file, output_dir=None, pdf_file=None):
     # Créer le visualiseur
     visualizer = TimetableVisualizer(solution)
     
-    # Extraire toutes les classes uniques
-    classes = set(a['class'] for a in solution['assignments'])
-    
-    # Visualiser l'emploi du temps pour chaque classe
-    for class_name in sorted(classes):
-        visualizer.plot_timetable(class_name, output_dir)
-    
-    # Exporter en PDF si demandé
-    if pdf_file:
-        visualizer.export_to_pdf(pdf_file)
+    # Dessiner chaque classe une seule fois: images PNG et, si demandé, PDF
+    visualizer.render_all(output_dir, pdf_file)
 
 if __name__ == "__main__":
     # Exemple d'utilisation